@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Runtime shared by the generated clients of every API version.
+
+The clients, transports and pagers of ``dialogflow_v2`` and
+``dialogflow_v2beta1`` differ only in their types and methods. The code
+they have in common lives here once, and the generated code is rewritten
+to use it by ``scripts/use_common_runtime.py``, which ``owlbot.py`` runs
+after each regeneration.
+"""
+
+from .client import ClientBase
+from .client import default_mtls_endpoint
+from .client_info import default_client_info
+from .pagers import AsyncPager
+from .pagers import Pager
+
+__all__ = (
+    "AsyncPager",
+    "ClientBase",
+    "Pager",
+    "default_client_info",
+    "default_mtls_endpoint",
+)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import functools
+from typing import Optional
+
+import pkg_resources
+
+from google.api_core import gapic_v1  # type: ignore
+
+
+@functools.lru_cache(maxsize=None)
+def gapic_version() -> Optional[str]:
+    """Return the installed version of the library, looked up once.
+
+    Every client, asynchronous client and transport module sends this
+    version; looking it up scans the installed distributions, which used
+    to happen once per module.
+    """
+    try:
+        return pkg_resources.get_distribution("google-cloud-dialogflow",).version
+    except pkg_resources.DistributionNotFound:
+        return None
+
+
+def default_client_info() -> gapic_v1.client_info.ClientInfo:
+    """Return a new client info carrying the library version."""
+    return gapic_v1.client_info.ClientInfo(gapic_version=gapic_version())
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from typing import Any, AsyncIterable, Iterable
+
+
+def _items(page, field, raw):
+    if raw:
+        return getattr(type(page).pb(page), field)
+    return getattr(page, field)
+
+
+def _release(page, field):
+    # Items the caller kept remain valid; only the page lets go of them.
+    type(page).pb(page).ClearField(field)
+
+
+class Pager(object):
+    """Base class of the pagers of list methods.
+
+    Subclasses name the repeated field of the response holding the items
+    in ``_items_field``, and set ``_method``, ``_request``, ``_response``
+    and ``_metadata`` in their constructor.
+    """
+
+    _items_field = ""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    @property
+    def pages(self) -> Iterable[Any]:
+        yield self._response
+        while self._response.next_page_token:
+            self._request.page_token = self._response.next_page_token
+            self._response = self._method(self._request, metadata=self._metadata)
+            yield self._response
+
+    def __iter__(self) -> Iterable[Any]:
+        for page in self.pages:
+            yield from getattr(page, self._items_field)
+
+    def stream(self, raw: bool = False) -> Iterable[Any]:
+        """Iterate through the items, releasing each page once consumed.
+
+        Iterating the pager keeps every item of the current page alive
+        until the next page arrives, and the last response stays on the
+        pager afterwards. Here the items of each page are removed from it
+        as soon as they have all been yielded, so memory does not grow
+        with the listing unless the caller keeps the items. Attribute
+        lookups on the pager still work, but see an empty items field.
+
+        Args:
+            raw (bool): Yield the protobuf messages instead of wrapping
+                each one in its proto-plus class.
+
+        Returns:
+            Iterable: The items of every page.
+        """
+        for page in self.pages:
+            yield from _items(page, self._items_field, raw)
+            _release(page, self._items_field)
+
+    def __repr__(self) -> str:
+        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
+
+
+class AsyncPager(object):
+    """Base class of the asynchronous pagers of list methods.
+
+    Subclasses are set up like those of :class:`Pager`, with a ``_method``
+    returning an awaitable.
+    """
+
+    _items_field = ""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    @property
+    async def pages(self) -> AsyncIterable[Any]:
+        yield self._response
+        while self._response.next_page_token:
+            self._request.page_token = self._response.next_page_token
+            self._response = await self._method(self._request, metadata=self._metadata)
+            yield self._response
+
+    def __aiter__(self) -> AsyncIterable[Any]:
+        async def async_generator():
+            async for page in self.pages:
+                for response in getattr(page, self._items_field):
+                    yield response
+
+        return async_generator()
+
+    async def stream(self, raw: bool = False) -> AsyncIterable[Any]:
+        """Iterate through the items, releasing each page once consumed.
+
+        See :meth:`Pager.stream`.
+
+        Args:
+            raw (bool): Yield the protobuf messages instead of wrapping
+                each one in its proto-plus class.
+
+        Returns:
+            AsyncIterable: The items of every page.
+        """
+        async for page in self.pages:
+            for item in _items(page, self._items_field, raw):
+                yield item
+            _release(page, self._items_field)
+
+    def __repr__(self) -> str:
+        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
+
+
+__all__ = (
+    "AsyncPager",
+    "Pager",
+)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Hand-written helpers built on top of the generated Dialogflow clients.
+
+The helpers accept clients from any API version (``dialogflow_v2`` or
+``dialogflow_v2beta1``).
+"""
+
+from .agent_json import read_agent_zip
+from .agent_json import read_ndjson
+from .agent_json import write_agent_zip
+from .agent_json import write_ndjson
+from .audio import AudioConverter
+from .audio import AudioFormat
+from .audio import VoiceActivityDetector
+from .audio_cache import AudioCache
+from .audio_cache import AudioCachingSessionsClient
+from .channels import TransportOptions
+from .channels import create_client
+from .clients import ClientFactory
+from .evaluate import EvaluationReport
+from .evaluate import read_results
+from .evaluate import read_utterances
+from .evaluate import run_evaluation
+from .export import ExportResult
+from .export import export_messages
+from .knowledge import BulkDocumentLoader
+from .knowledge import LoadResult
+from .knowledge import SyncPlan
+from .knowledge import scan_directory
+from .participants import AnalyzeContentPipeline
+from .participants import AnalyzeContentResult
+from .participants import CachingParticipantsClient
+from .participants import SuggestionCache
+from .pagers import collect_items
+from .pagers import gather_items
+from .participants import analyze_content_async
+from .replay import LogWriter
+from .replay import ReplayReport
+from .replay import read_log
+from .replay import recording_transport
+from .replay import replay_transport
+from .replay import resend
+from .sessions import AsyncSessionScheduler
+from .sessions import SessionScheduler
+from .structs import dict_to_struct
+from .structs import struct_to_dict
+from .templates import DetectIntentTemplate
+from .training_phrases import CleanupPlan
+from .training_phrases import find_duplicates
+from .warmup import TokenRefresher
+from .warmup import warm_up
+from .warmup import warm_up_async
+
+__all__ = (
+    "AnalyzeContentPipeline",
+    "AnalyzeContentResult",
+    "AsyncSessionScheduler",
+    "AudioCache",
+    "AudioCachingSessionsClient",
+    "AudioConverter",
+    "AudioFormat",
+    "BulkDocumentLoader",
+    "CachingParticipantsClient",
+    "CleanupPlan",
+    "ClientFactory",
+    "DetectIntentTemplate",
+    "EvaluationReport",
+    "ExportResult",
+    "LoadResult",
+    "LogWriter",
+    "ReplayReport",
+    "SessionScheduler",
+    "SuggestionCache",
+    "SyncPlan",
+    "TokenRefresher",
+    "TransportOptions",
+    "VoiceActivityDetector",
+    "analyze_content_async",
+    "collect_items",
+    "create_client",
+    "dict_to_struct",
+    "export_messages",
+    "find_duplicates",
+    "gather_items",
+    "read_agent_zip",
+    "read_log",
+    "read_ndjson",
+    "read_results",
+    "read_utterances",
+    "recording_transport",
+    "replay_transport",
+    "resend",
+    "run_evaluation",
+    "scan_directory",
+    "struct_to_dict",
+    "warm_up",
+    "warm_up_async",
+    "write_agent_zip",
+    "write_ndjson",
+)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import importlib
+
+
+def types_module(client):
+    """Return the ``types`` module matching the API version of a client.
+
+    The helpers accept clients from any API version, so message classes
+    are looked up next to the client rather than imported directly.
+
+    Args:
+        client: A client (or async client) instance or class from one of
+            the ``google.cloud.dialogflow_*`` packages, or a helper wrapping
+            such a client in its ``_client`` attribute.
+
+    Returns:
+        module: The ``google.cloud.dialogflow_<version>.types`` module.
+    """
+    cls = client if isinstance(client, type) else type(client)
+    if ".services." not in cls.__module__ and hasattr(client, "_client"):
+        return types_module(client._client)
+    package = cls.__module__.split(".services.")[0]
+    return importlib.import_module(package + ".types")
+
+
+def import_optional(name, extra):
+    """Import an optional dependency or explain how to install it.
+
+    Args:
+        name (str): The module to import.
+        extra (str): The ``google-cloud-dialogflow`` extra providing it.
+
+    Returns:
+        module: The imported module.
+
+    Raises:
+        ImportError: If the module is not installed.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as exc:
+        raise ImportError(
+            "{} is required for this feature. Install it with "
+            "`pip install google-cloud-dialogflow[{}]`.".format(name, extra)
+        ) from exc
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Bulk JSON serialization of intents and entity types.
+
+Messages are written in their API JSON representation (camelCase field
+names, default values omitted), either as newline-delimited JSON or as a
+zip archive with one file per message in ``intents/`` and ``entities/``
+folders, like an exported agent. Reading yields raw protobuf messages;
+wrap them with the proto-plus class if needed, e.g. ``Intent(pb)``.
+
+Both directions stream in chunks and can spread the JSON work over
+several processes, which pays off for agents with thousands of intents.
+Only serialized protobuf bytes and JSON text cross process boundaries.
+"""
+
+import collections
+import concurrent.futures
+import importlib
+import json
+import re
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+from google.protobuf import json_format  # type: ignore
+
+
+# Top-level folders of the agent zip layout, by message name.
+_FOLDERS = {"Intent": "intents/", "EntityType": "entities/"}
+
+_UNSAFE_CHARACTERS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def _pb(message):
+    if hasattr(type(message), "pb"):
+        return type(message).pb(message)
+    return message
+
+
+def _pb_class(full_name):
+    # "google.cloud.dialogflow.v2.Intent" -> dialogflow_v2.types.Intent
+    package, _, name = full_name.rpartition(".")
+    prefix, _, version = package.rpartition(".")
+    types = importlib.import_module("{}_{}.types".format(prefix, version))
+    return getattr(types, name).pb()
+
+
+def _dump(pb, indent=None):
+    separators = (",", ": ") if indent else (",", ":")
+    return json.dumps(
+        json_format.MessageToDict(pb),
+        ensure_ascii=False,
+        indent=indent,
+        separators=separators,
+    )
+
+
+def _load(pb_class, text):
+    return json_format.Parse(text, pb_class())
+
+
+def _dump_chunk(task):
+    full_name, indent, chunk = task
+    pb_class = _pb_class(full_name)
+    return [_dump(pb_class.FromString(data), indent) for data in chunk]
+
+
+def _load_chunk(task):
+    full_name, chunk = task
+    pb_class = _pb_class(full_name)
+    return [_load(pb_class, text).SerializeToString() for text in chunk]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _ordered_map(function, tasks, processes):
+    """Map ``function`` over ``tasks`` in order, keeping at most two tasks
+    per process in flight so the input is consumed as a stream."""
+    if not processes or processes <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        window = collections.deque()
+        for task in tasks:
+            window.append(executor.submit(function, task))
+            if len(window) >= processes * 2:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def to_json(message) -> str:
+    """Return the compact API JSON representation of a message.
+
+    Unlike ``Intent.to_json``, fields with default values are omitted.
+
+    Args:
+        message: A proto-plus or protobuf message.
+
+    Returns:
+        str: One line of JSON.
+    """
+    return _dump(_pb(message))
+
+
+def _full_name(pb):
+    return pb.DESCRIPTOR.full_name
+
+
+def _serialized_tasks(pbs, chunk_size, indent):
+    for chunk in _chunks(pbs, chunk_size):
+        yield (
+            _full_name(chunk[0]),
+            indent,
+            [pb.SerializeToString() for pb in chunk],
+        )
+
+
+def _json_texts(pbs, processes, chunk_size, indent=None):
+    """Yield the JSON of each message, in order."""
+    if not processes or processes <= 1:
+        for pb in pbs:
+            yield _dump(pb, indent)
+        return
+    tasks = _serialized_tasks(pbs, chunk_size, indent)
+    for texts in _ordered_map(_dump_chunk, tasks, processes):
+        for text in texts:
+            yield text
+
+
+def _parsed(pb_class, texts, processes, chunk_size):
+    """Yield the messages parsed from JSON texts, in order."""
+    if not processes or processes <= 1:
+        for text in texts:
+            yield _load(pb_class, text)
+        return
+    full_name = pb_class.DESCRIPTOR.full_name
+    tasks = ((full_name, chunk) for chunk in _chunks(texts, chunk_size))
+    for chunk in _ordered_map(_load_chunk, tasks, processes):
+        for data in chunk:
+            yield pb_class.FromString(data)
+
+
+def write_ndjson(
+    messages: Iterable,
+    path: str,
+    *,
+    processes: Optional[int] = None,
+    chunk_size: int = 200,
+) -> int:
+    """Write messages to a newline-delimited JSON file.
+
+    Args:
+        messages (Iterable): Proto-plus or protobuf messages of one type,
+            such as ``Intent`` or ``EntityType``.
+        path (str): The file to write.
+        processes (Optional[int]): The number of worker processes; by
+            default the JSON is produced in this process.
+        chunk_size (int): The number of messages sent to a worker at once.
+
+    Returns:
+        int: The number of messages written.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for text in _json_texts((_pb(m) for m in messages), processes, chunk_size):
+            f.write(text)
+            f.write("\n")
+            count += 1
+    return count
+
+
+def read_ndjson(
+    path: str, message_class, *, processes: Optional[int] = None, chunk_size: int = 200,
+) -> Iterator:
+    """Read messages from a newline-delimited JSON file.
+
+    Args:
+        path (str): The file to read.
+        message_class (type): The proto-plus class of the messages, such
+            as ``dialogflow_v2.Intent``.
+        processes (Optional[int]): The number of worker processes; by
+            default the JSON is parsed in this process.
+        chunk_size (int): The number of lines sent to a worker at once.
+
+    Returns:
+        Iterator: The protobuf messages, in file order.
+
+    Raises:
+        google.protobuf.json_format.ParseError: If a line is not a valid
+            message.
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = (line for line in f if line.strip())
+        for pb in _parsed(message_class.pb(), lines, processes, chunk_size):
+            yield pb
+
+
+def _member_name(folder, display_name, used):
+    base = _UNSAFE_CHARACTERS.sub("_", display_name).strip(". ") or "unnamed"
+    name = base
+    suffix = 1
+    while name.lower() in used:
+        suffix += 1
+        name = "{}_{}".format(base, suffix)
+    used.add(name.lower())
+    return "{}{}.json".format(folder, name)
+
+
+def write_agent_zip(
+    path: str,
+    *,
+    intents: Iterable = (),
+    entity_types: Iterable = (),
+    processes: Optional[int] = None,
+    chunk_size: int = 200,
+) -> Tuple[int, int]:
+    """Write intents and entity types to a zip archive.
+
+    Each message is stored as indented JSON in ``intents/`` or
+    ``entities/``, named after its display name, so the archive unpacks
+    to a tree that diffs well under version control. The files use the
+    API JSON representation rather than the console's export schema, so
+    the archive cannot be passed to ``restore_agent``.
+
+    Args:
+        path (str): The archive to write.
+        intents (Iterable): Proto-plus or protobuf ``Intent`` messages.
+        entity_types (Iterable): Proto-plus or protobuf ``EntityType``
+            messages.
+        processes (Optional[int]): The number of worker processes.
+        chunk_size (int): The number of messages sent to a worker at once.
+
+    Returns:
+        Tuple[int, int]: The number of intents and entity types written.
+    """
+    counts = []
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for folder, messages in (("intents/", intents), ("entities/", entity_types)):
+            used = set()
+            names = []
+
+            def pbs():
+                for message in messages:
+                    pb = _pb(message)
+                    names.append(_member_name(folder, pb.display_name, used))
+                    yield pb
+
+            count = 0
+            for count, text in enumerate(
+                _json_texts(pbs(), processes, chunk_size, indent=2), 1
+            ):
+                archive.writestr(names[count - 1], text + "\n")
+            counts.append(count)
+    return counts[0], counts[1]
+
+
+def read_agent_zip(
+    path: str, message_class, *, processes: Optional[int] = None, chunk_size: int = 200,
+) -> Iterator:
+    """Read intents or entity types from a zip written by
+    :func:`write_agent_zip`.
+
+    Args:
+        path (str): The archive to read.
+        message_class (type): ``Intent`` or ``EntityType`` of any API
+            version.
+        processes (Optional[int]): The number of worker processes.
+        chunk_size (int): The number of files sent to a worker at once.
+
+    Returns:
+        Iterator: The protobuf messages, in archive order.
+
+    Raises:
+        ValueError: If ``message_class`` is not supported.
+    """
+    pb_class = message_class.pb()
+    folder = _FOLDERS.get(pb_class.DESCRIPTOR.name)
+    if folder is None:
+        raise ValueError(
+            "Cannot read {} messages from an agent zip.".format(
+                pb_class.DESCRIPTOR.name
+            )
+        )
+    with zipfile.ZipFile(path) as archive:
+        texts = (
+            archive.read(info).decode("utf-8")
+            for info in archive.infolist()
+            if info.filename.startswith(folder) and info.filename.endswith(".json")
+        )
+        for pb in _parsed(pb_class, texts, processes, chunk_size):
+            yield pb
+
+
+__all__ = (
+    "read_agent_zip",
+    "read_ndjson",
+    "to_json",
+    "write_agent_zip",
+    "write_ndjson",
+)
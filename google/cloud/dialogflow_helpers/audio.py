@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Convert streamed audio to the format it is best sent to Dialogflow in.
+
+Speech recognition gains nothing from more than 16 kHz of mono audio, and
+nothing from resampling audio to a higher rate than it was recorded at.
+:func:`choose_format` picks the smallest format meeting that, and an
+:class:`AudioConverter` decodes, downmixes and resamples the chunks of a
+stream to it as they arrive. A :class:`VoiceActivityDetector` drops the
+silence before and after the speech, which would otherwise be sent and
+billed. :func:`streaming_requests` wraps them around the requests of
+``streaming_detect_intent``.
+
+Converting needs NumPy, from the ``audio`` extra. Audio that is already
+in the chosen format, such as 8 kHz mu-law from a telephony gateway, is
+passed through untouched without it.
+"""
+
+import math
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from google.cloud.dialogflow_helpers import _utils
+
+
+LINEAR_16 = "AUDIO_ENCODING_LINEAR_16"
+MULAW = "AUDIO_ENCODING_MULAW"
+
+_SAMPLE_WIDTHS = {LINEAR_16: 2, MULAW: 1}
+
+# The G.711 mu-law bias, and the largest encodable 14 bit magnitude.
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 8159
+
+
+class AudioFormat(NamedTuple):
+    """The format of raw audio.
+
+    Attributes:
+        encoding: ``"AUDIO_ENCODING_LINEAR_16"`` (signed 16 bit little
+            endian samples) or ``"AUDIO_ENCODING_MULAW"`` (G.711 mu-law).
+        sample_rate_hertz: The sample rate.
+        channels: The number of interleaved channels.
+    """
+
+    encoding: str
+    sample_rate_hertz: int
+    channels: int = 1
+
+    @property
+    def frame_size(self) -> int:
+        """int: The number of bytes of one sample of every channel."""
+        return _SAMPLE_WIDTHS[self.encoding] * self.channels
+
+    @property
+    def byte_rate(self) -> int:
+        """int: The number of bytes per second of audio."""
+        return self.frame_size * self.sample_rate_hertz
+
+
+def choose_format(
+    source: AudioFormat, *, max_sample_rate_hertz: int = 16000, compact: bool = False
+) -> AudioFormat:
+    """Return the format to send audio recorded in ``source`` format in.
+
+    The audio is sent in mono, at the source rate or ``max_sample_rate_hertz``
+    if lower. Mu-law audio stays mu-law, which is half the size of linear
+    PCM and loses nothing more; linear PCM stays linear unless ``compact``
+    is set.
+
+    Args:
+        source (AudioFormat): The format of the recorded audio.
+        max_sample_rate_hertz (int): The highest rate worth sending.
+            Dialogflow recommends 16 kHz.
+        compact (bool): Send linear PCM as mu-law too, halving its size at
+            a small cost in recognition accuracy.
+
+    Returns:
+        AudioFormat: The format to send.
+    """
+    if source.encoding not in _SAMPLE_WIDTHS:
+        raise ValueError("Unsupported audio encoding: {!r}".format(source.encoding))
+    encoding = MULAW if compact else source.encoding
+    return AudioFormat(
+        encoding, min(source.sample_rate_hertz, max_sample_rate_hertz), 1
+    )
+
+
+def _mulaw_table(np):
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + _MULAW_BIAS) << exponent) - _MULAW_BIAS
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def mulaw_decode(data: bytes):
+    """Decode G.711 mu-law bytes.
+
+    Args:
+        data (bytes): The mu-law samples.
+
+    Returns:
+        numpy.ndarray: The ``int16`` samples.
+    """
+    np = _utils.import_optional("numpy", "audio")
+    return _mulaw_table(np)[np.frombuffer(data, dtype=np.uint8)]
+
+
+def mulaw_encode(samples) -> bytes:
+    """Encode samples as G.711 mu-law.
+
+    The samples are rounded like the reference implementation, which
+    keeps their 14 most significant bits.
+
+    Args:
+        samples (numpy.ndarray): The ``int16`` samples.
+
+    Returns:
+        bytes: The mu-law samples.
+    """
+    np = _utils.import_optional("numpy", "audio")
+    samples = np.asarray(samples, dtype=np.int32) >> 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(samples), _MULAW_CLIP) + (_MULAW_BIAS >> 2)
+    # The magnitude is in [0x21, 0x2000]; codes have 8 segments of 16 steps.
+    segment = np.floor(np.log2(magnitude)).astype(np.int32) - 5
+    code = (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    code = np.where(segment > 7, 0x7F, code)
+    return (code ^ mask).astype(np.uint8).tobytes()
+
+
+class _Resampler(object):
+    """A streaming polyphase windowed-sinc resampler.
+
+    The rate changes by the reduced ratio ``up / down``. Each output sample
+    is the dot product of the input samples around it with one of
+    ``up`` phases of a low-pass filter cutting below the lower of both
+    Nyquist rates, so downsampling does not alias.
+    """
+
+    def __init__(self, np, rate_in, rate_out, zero_crossings=12):
+        self._np = np
+        divisor = math.gcd(rate_in, rate_out)
+        self._up = rate_out // divisor
+        self._down = rate_in // divisor
+        # The filter spans zero_crossings periods of the lower rate on each
+        # side, so downsampling needs proportionally more input samples.
+        taps = 2 * math.ceil(zero_crossings * max(1.0, self._down / self._up))
+        self._taps = taps
+        self._lead = taps // 2
+        # phases[p, k] weighs input i + lead - k for the output at input
+        # position i + p / up.
+        cutoff = 0.9 * 0.5 / max(self._up, self._down)
+        offset = (
+            np.arange(self._up)[:, None]
+            + (np.arange(taps)[None, :] - self._lead) * self._up
+        )
+        window = np.kaiser(taps * self._up, 8.0)[offset + self._lead * self._up]
+        phases = np.sinc(2 * cutoff * offset) * window
+        self._phases = phases / phases.sum(axis=1, keepdims=True)
+        # The inputs still needed, from global index _start on; those
+        # before the stream are zeros.
+        self._start = self._lead - taps + 1
+        self._buffer = np.zeros(-self._start)
+        self._produced = 0
+        self._consumed = 0
+
+    def process(self, samples, final=False):
+        np = self._np
+        self._consumed += len(samples)
+        if final:
+            # The last outputs need inputs past the end of the stream.
+            samples = np.concatenate([samples, np.zeros(self._lead)])
+            last = -(-self._consumed * self._up // self._down)
+        buffer = np.concatenate([self._buffer, samples])
+        end = self._start + len(buffer)
+        if not final:
+            last = max(self._produced, -(-(end - self._lead) * self._up // self._down))
+        position = np.arange(self._produced, last) * self._down
+        index = position // self._up + self._lead - self._start
+        window = index[:, None] - np.arange(self._taps)[None, :]
+        out = np.einsum("nk,nk->n", buffer[window], self._phases[position % self._up])
+        self._produced = last
+        keep = self._taps - 1
+        self._buffer = buffer[len(buffer) - keep :]
+        self._start = end - keep
+        return out
+
+
+class AudioConverter(object):
+    """Convert a stream of raw audio chunks from one format to another.
+
+    Chunks can split samples and frames anywhere; the remainder is kept
+    for the next chunk.
+
+    .. code-block:: python
+
+        from google.cloud.dialogflow_helpers import audio
+
+        converter = audio.AudioConverter(
+            audio.AudioFormat(audio.LINEAR_16, 48000, channels=2)
+        )
+        for chunk in chunks:
+            send(converter.convert(chunk))
+        send(converter.flush())
+
+    Args:
+        source (AudioFormat): The format of the input.
+        target (Optional[AudioFormat]): The format of the output; it must
+            be mono. Defaults to :func:`choose_format` of the source.
+        kwargs: Arguments for :func:`choose_format`, without ``target``.
+    """
+
+    def __init__(
+        self, source: AudioFormat, target: Optional[AudioFormat] = None, **kwargs
+    ) -> None:
+        if target is None:
+            target = choose_format(source, **kwargs)
+        if target.channels != 1:
+            raise ValueError("Audio can only be converted to mono.")
+        if target.encoding not in _SAMPLE_WIDTHS:
+            raise ValueError("Unsupported audio encoding: {!r}".format(target.encoding))
+        self.source = source
+        self.target = target
+        self._passthrough = source == target
+        self._pending = b""
+        self._resampler = None
+        if not self._passthrough:
+            self._np = _utils.import_optional("numpy", "audio")
+            if source.sample_rate_hertz != target.sample_rate_hertz:
+                self._resampler = _Resampler(
+                    self._np, source.sample_rate_hertz, target.sample_rate_hertz
+                )
+
+    def convert(self, chunk: bytes) -> bytes:
+        """Convert the next chunk of the stream.
+
+        Args:
+            chunk (bytes): Audio in the source format.
+
+        Returns:
+            bytes: Audio in the target format, possibly empty. The output
+            lags the input by a few samples when resampling.
+        """
+        return self._convert(chunk, final=False)
+
+    def flush(self) -> bytes:
+        """Return the output still held back at the end of the stream."""
+        return self._convert(b"", final=True)
+
+    def convert_stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Convert every chunk of a stream, and flush it at the end.
+
+        Args:
+            chunks (Iterable[bytes]): Audio in the source format.
+
+        Returns:
+            Iterator[bytes]: The non-empty chunks of converted audio.
+        """
+        for chunk in chunks:
+            out = self.convert(chunk)
+            if out:
+                yield out
+        out = self.flush()
+        if out:
+            yield out
+
+    def _convert(self, chunk, final):
+        if self._passthrough:
+            return bytes(chunk)
+        np = self._np
+        data = self._pending + chunk
+        usable = len(data) - len(data) % self.source.frame_size
+        data, self._pending = data[:usable], data[usable:]
+
+        if self.source.encoding == MULAW:
+            samples = mulaw_decode(data)
+        else:
+            samples = np.frombuffer(data, dtype="<i2")
+        if self.source.channels > 1:
+            samples = samples.reshape(-1, self.source.channels).mean(axis=1)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples.astype(np.float64), final=final)
+        samples = np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
+
+        if self.target.encoding == MULAW:
+            return mulaw_encode(samples)
+        return samples.astype("<i2").tobytes()
+
+
+class VoiceActivityDetector(object):
+    """Trim the silence around the speech of a stream, by frame energy.
+
+    The audio is cut in frames, and a frame is speech when its level
+    exceeds ``threshold_db``. Everything before the first
+    ``min_speech`` seconds of consecutive speech is dropped, except for
+    ``padding`` seconds kept so the first syllable is not clipped. Once
+    ``trailing_silence`` seconds pass without speech, the stream ends:
+    :attr:`ended` is set and later audio is dropped.
+
+    The levels of all the frames of a chunk are computed at once, so the
+    cost per chunk barely depends on its length.
+
+    Args:
+        audio_format (AudioFormat): The format of the audio; it must be
+            mono.
+        threshold_db (float): The level, in dB relative to full scale,
+            above which a frame is speech.
+        frame_duration (float): The length of a frame, in seconds.
+        min_speech (float): The length of speech starting the utterance.
+        padding (float): The length of audio kept before the speech.
+        trailing_silence (Optional[float]): The length of silence ending
+            the stream; ``None`` never ends it.
+    """
+
+    def __init__(
+        self,
+        audio_format: AudioFormat,
+        *,
+        threshold_db: float = -45.0,
+        frame_duration: float = 0.02,
+        min_speech: float = 0.06,
+        padding: float = 0.2,
+        trailing_silence: Optional[float] = 1.0,
+    ) -> None:
+        if audio_format.channels != 1:
+            raise ValueError("Voice activity is only detected in mono audio.")
+        self._np = _utils.import_optional("numpy", "audio")
+        self.audio_format = audio_format
+        rate = audio_format.sample_rate_hertz
+        self._frame_samples = max(1, int(round(frame_duration * rate)))
+        self._frame_bytes = self._frame_samples * audio_format.frame_size
+        frames = self._frame_samples / float(rate)
+        self._min_speech = max(1, int(math.ceil(min_speech / frames)))
+        self._padding = int(round(padding / frames))
+        self._trailing = (
+            None
+            if trailing_silence is None
+            else max(1, int(math.ceil(trailing_silence / frames)))
+        )
+        # The mean square of a frame at the threshold, in 16 bit units.
+        self._threshold = (32768.0 * 10 ** (threshold_db / 20.0)) ** 2
+        self._pending = b""
+        # Frames held back before the speech starts, and the length of
+        # the runs of speech, then silence, ending the audio seen so far.
+        self._held = []
+        self._speech_run = 0
+        self._silence_run = 0
+        self.started = False
+        self.ended = False
+
+    def _levels(self, data):
+        np = self._np
+        if self.audio_format.encoding == MULAW:
+            samples = mulaw_decode(data)
+        else:
+            samples = np.frombuffer(data, dtype="<i2")
+        frames = samples.reshape(-1, self._frame_samples).astype(np.float64)
+        return np.einsum("ij,ij->i", frames, frames) / self._frame_samples
+
+    def _runs(self, flags, carry):
+        # The length of the run of True ending at each index.
+        np = self._np
+        index = np.arange(len(flags))
+        last_false = np.maximum.accumulate(np.where(flags, -1, index))
+        return np.where(last_false < 0, index + 1 + carry, index - last_false)
+
+    def process(self, chunk: bytes) -> bytes:
+        """Return the audio of a chunk worth sending.
+
+        Args:
+            chunk (bytes): The next chunk of the stream.
+
+        Returns:
+            bytes: The audio to send, possibly empty. Audio is sent whole
+            frames at a time, so some of it is held for the next chunk.
+        """
+        if self.ended:
+            return b""
+        data = self._pending + chunk
+        usable = len(data) - len(data) % self._frame_bytes
+        data, self._pending = data[:usable], data[usable:]
+        if not data:
+            return b""
+        speech = self._levels(data) > self._threshold
+        frames = len(speech)
+        start = 0
+        out = []
+
+        if not self.started:
+            runs = self._runs(speech, self._speech_run)
+            onsets = self._np.flatnonzero(runs >= self._min_speech)
+            if not len(onsets):
+                self._speech_run = int(runs[-1])
+                self._hold(data, frames)
+                return b""
+            # Keep the padding and the speech run from the earlier frames.
+            self.started = True
+            start = int(onsets[0]) + 1
+            first = start - self._min_speech - self._padding
+            held = b"".join(self._held)
+            if first < 0:
+                out.append(held[len(held) + first * self._frame_bytes :])
+            out.append(
+                data[max(first, 0) * self._frame_bytes : start * self._frame_bytes]
+            )
+            self._held = []
+
+        if self._trailing is not None and start < frames:
+            runs = self._runs(~speech[start:], self._silence_run)
+            ends = self._np.flatnonzero(runs >= self._trailing)
+            if len(ends):
+                self.ended = True
+                stop = start + int(ends[0]) + 1
+                out.append(data[start * self._frame_bytes : stop * self._frame_bytes])
+                return b"".join(out)
+            self._silence_run = int(runs[-1])
+        out.append(data[start * self._frame_bytes :])
+        return b"".join(out)
+
+    def _hold(self, data, frames):
+        keep = self._padding + self._min_speech
+        self._held.extend(
+            data[i * self._frame_bytes : (i + 1) * self._frame_bytes]
+            for i in range(max(0, frames - keep), frames)
+        )
+        del self._held[: max(0, len(self._held) - keep)]
+
+    def trim(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Yield the audio of a stream worth sending, until it ends.
+
+        Args:
+            chunks (Iterable[bytes]): The audio.
+
+        Returns:
+            Iterator[bytes]: The non-empty chunks to send.
+        """
+        for chunk in chunks:
+            out = self.process(chunk)
+            if out:
+                yield out
+            if self.ended:
+                return
+
+
+def streaming_requests(
+    client,
+    session: str,
+    chunks: Iterable[bytes],
+    source: AudioFormat,
+    *,
+    language_code: str,
+    target: Optional[AudioFormat] = None,
+    compact: bool = False,
+    query_params=None,
+    output_audio_config=None,
+    vad=None,
+    **audio_config,
+):
+    """Yield the requests of ``streaming_detect_intent`` for recorded audio.
+
+    The first request configures recognition for the converted audio; the
+    following ones carry it.
+
+    .. code-block:: python
+
+        requests = audio.streaming_requests(
+            client,
+            session,
+            gateway_chunks,
+            audio.AudioFormat(audio.MULAW, 8000),
+            language_code="en-US",
+            single_utterance=True,
+        )
+        for response in client.streaming_detect_intent(requests=requests):
+            ...
+
+    Args:
+        client (SessionsClient): The client the requests are for; its API
+            version decides the request type.
+        session (str): The session name.
+        chunks (Iterable[bytes]): The audio, in the ``source`` format.
+        source (AudioFormat): The format of the audio.
+        language_code (str): The language of the audio.
+        target (Optional[AudioFormat]): The format to send; defaults to
+            :func:`choose_format` of the source.
+        compact (bool): See :func:`choose_format`.
+        query_params (Union[dict, QueryParameters, None]): The parameters
+            of the query.
+        output_audio_config (Union[dict, OutputAudioConfig, None]): The
+            configuration of the audio response.
+        vad (Union[bool, dict, None]): Trim the silence around the speech
+            with a :class:`VoiceActivityDetector`, created with these
+            keyword arguments if a dict. The requests end after the
+            trailing silence, which half-closes the stream; with
+            ``single_utterance`` the server may end it sooner.
+        audio_config: Other fields of the ``InputAudioConfig``, such as
+            ``single_utterance`` or ``model``.
+
+    Returns:
+        Iterator[StreamingDetectIntentRequest]: The requests.
+    """
+    types = _utils.types_module(client)
+    converter = AudioConverter(source, target, compact=compact)
+    first = {
+        "session": session,
+        "query_input": {
+            "audio_config": dict(
+                audio_config,
+                audio_encoding=converter.target.encoding,
+                sample_rate_hertz=converter.target.sample_rate_hertz,
+                language_code=language_code,
+            )
+        },
+    }
+    if query_params is not None:
+        first["query_params"] = query_params
+    if output_audio_config is not None:
+        first["output_audio_config"] = output_audio_config
+    yield types.StreamingDetectIntentRequest(first)
+    audio = converter.convert_stream(chunks)
+    if vad:
+        options = vad if isinstance(vad, dict) else {}
+        audio = VoiceActivityDetector(converter.target, **options).trim(audio)
+    for data in audio:
+        yield types.StreamingDetectIntentRequest(input_audio=data)
+
+
+__all__ = (
+    "AudioConverter",
+    "AudioFormat",
+    "LINEAR_16",
+    "MULAW",
+    "VoiceActivityDetector",
+    "choose_format",
+    "mulaw_decode",
+    "mulaw_encode",
+    "streaming_requests",
+)
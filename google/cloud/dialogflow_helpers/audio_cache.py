@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Serve the synthesized audio of repeated prompts from a local cache.
+
+``detect_intent`` returns the speech synthesized for the fulfillment of
+every turn, even when the prompt was heard many times before. The audio
+only depends on the default platform text responses and on the speech
+synthesizer settings, so it can be cached under those.
+
+The text of a turn is only known once the server has answered, so the
+cache has to predict it: :class:`AudioCachingSessionsClient` remembers the
+text that answered the same query last time. Events are predicted across
+sessions, while text queries, whose matched intent depends on the
+session's contexts, are only predicted from earlier turns of the same
+session. When the audio of the predicted text is cached, the request is
+sent without ``output_audio_config`` and the audio is taken from the
+cache.
+
+A misprediction happens when the turn is answered with another text whose
+audio is not cached, for example because the session's contexts changed
+the matched intent. ``detect_intent`` is not idempotent, so the turn is
+not sent again: :attr:`SynthesizedAudio.mispredicted` is set and the
+audio is obtained from the ``synthesizer`` given to the client, if any.
+Without one, the response is returned without audio, and the caller has
+to fall back on synthesizing the text itself or on playing a generic
+prompt.
+
+Audio is only saved if the agent does not synthesize speech on its own:
+``output_audio_config_mask`` can override the agent-level settings but not
+turn them off, so with agent-level speech synthesis enabled every turn
+still carries audio. The responses then fill the cache but no bandwidth
+is saved.
+"""
+
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Any, Callable, NamedTuple, Optional
+
+from google.cloud.dialogflow_helpers import _utils
+
+
+def _pb(message):
+    if hasattr(type(message), "pb"):
+        return type(message).pb(message)
+    return message
+
+
+def _digest(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def prompt_text(query_result) -> str:
+    """Return the text the output audio of a query result is synthesized from.
+
+    That is the concatenation of the default platform text responses, as
+    described for ``DetectIntentResponse.output_audio``.
+
+    Args:
+        query_result (QueryResult): The result of a turn.
+
+    Returns:
+        str: The text, empty if the turn has no audio.
+    """
+    texts = []
+    for message in query_result.fulfillment_messages:
+        if not message.platform and "text" in message:
+            texts.extend(message.text.text)
+    return "\n".join(texts)
+
+
+class AudioCacheStats(NamedTuple):
+    """Counters describing the effectiveness of an :class:`AudioCache`."""
+
+    hits: int
+    misses: int
+    fills: int
+    evictions: int
+    entries: int
+    size: int
+
+
+class AudioCache(object):
+    """A thread-safe cache of synthesized audio.
+
+    Entries are keyed on the prompt text and the speech synthesizer
+    settings (:meth:`key`). The audio is kept in memory, least recently
+    used first out beyond ``max_bytes``, and, with a ``directory``, on disk
+    as well, where it outlives the process and is shared by every process
+    using the same directory. On disk, audio is stored once per distinct
+    content, however many keys share it, and is never evicted.
+
+    Args:
+        directory (Optional[str]): The directory holding the disk cache.
+            It is created if missing.
+        max_bytes (int): The maximum size of the audio kept in memory.
+    """
+
+    def __init__(
+        self, directory: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024
+    ):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._fills = 0
+        self._evictions = 0
+        if directory is not None:
+            os.makedirs(os.path.join(directory, "keys"), exist_ok=True)
+            os.makedirs(os.path.join(directory, "audio"), exist_ok=True)
+
+    @staticmethod
+    def key(text: str, output_audio_config) -> str:
+        """Return the cache key of a prompt.
+
+        Args:
+            text (str): The prompt text, see :func:`prompt_text`.
+            output_audio_config (OutputAudioConfig): The settings the audio
+                is synthesized with: encoding, sample rate and
+                ``synthesize_speech_config`` (voice, speaking rate, pitch,
+                volume and effects).
+
+        Returns:
+            str: The key.
+        """
+        config = _pb(output_audio_config).SerializeToString(deterministic=True)
+        return _digest(text.encode("utf-8"), config)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the audio cached under ``key``, or ``None``."""
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return audio
+        audio = self._read(key)
+        with self._lock:
+            if audio is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._remember(key, audio)
+        return audio
+
+    def __contains__(self, key: str) -> bool:
+        # Entries can be evicted right after this check; use get() to both
+        # test for and fetch audio.
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self._read(key) is not None
+
+    def put(self, key: str, audio: bytes) -> None:
+        """Cache audio under ``key``."""
+        if self._directory is not None:
+            digest = hashlib.sha256(audio).hexdigest()
+            audio_path = self._audio_path(digest)
+            if not os.path.exists(audio_path):
+                self._write(audio_path, audio)
+            self._write(self._key_path(key), digest.encode("ascii"))
+        with self._lock:
+            self._fills += 1
+            self._remember(key, audio)
+
+    def stats(self) -> AudioCacheStats:
+        """Return the current counters and the size of the memory cache."""
+        with self._lock:
+            return AudioCacheStats(
+                self._hits,
+                self._misses,
+                self._fills,
+                self._evictions,
+                len(self._entries),
+                self._size,
+            )
+
+    def _remember(self, key, audio):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        if len(audio) > self._max_bytes:
+            return
+        self._entries[key] = audio
+        self._size += len(audio)
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self._evictions += 1
+
+    def _key_path(self, key):
+        return os.path.join(self._directory, "keys", key)
+
+    def _audio_path(self, digest):
+        return os.path.join(self._directory, "audio", digest[:2], digest)
+
+    def _read(self, key):
+        if self._directory is None:
+            return None
+        try:
+            with open(self._key_path(key), "rb") as f:
+                digest = f.read().decode("ascii")
+            with open(self._audio_path(digest), "rb") as f:
+                audio = f.read()
+        except FileNotFoundError:
+            return None
+        if hashlib.sha256(audio).hexdigest() != digest:
+            # A corrupted file; removed so that the next fill rewrites it.
+            try:
+                os.unlink(self._audio_path(digest))
+            except FileNotFoundError:
+                pass
+            return None
+        return audio
+
+    @staticmethod
+    def _write(path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class SynthesizedAudio(NamedTuple):
+    """How the audio of a turn was obtained.
+
+    Attributes:
+        cached: The audio came from the cache rather than the server.
+        mispredicted: The request asked for no audio, expecting a cached
+            prompt, but the turn was answered with a prompt whose audio is
+            not cached; the response has no audio unless it was
+            synthesized.
+        synthesized: The audio of a mispredicted turn was obtained from
+            the client's ``synthesizer``.
+    """
+
+    cached: bool = False
+    mispredicted: bool = False
+    synthesized: bool = False
+
+
+class AudioCachingSessionsClient(object):
+    """A Sessions client serving repeated prompts' audio from a cache.
+
+    ``detect_intent`` requests with an ``output_audio_config`` are sent
+    without it when the audio of the predicted prompt is cached, and the
+    audio of the response is filled in from the cache; responses carrying
+    audio fill the cache. How the audio of the last turn was obtained is
+    available as :attr:`last_audio`. Requests without
+    ``output_audio_config`` and all other attributes are passed through to
+    the wrapped client. See the module documentation for mispredictions.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import audio_cache
+
+        client = audio_cache.AudioCachingSessionsClient(
+            dialogflow.SessionsClient(),
+            audio_cache.AudioCache("/var/cache/prompts"),
+        )
+        response = client.detect_intent(
+            request={
+                "session": session,
+                "query_input": query_input,
+                "output_audio_config": {"audio_encoding": "OUTPUT_AUDIO_ENCODING_MP3"},
+            }
+        )
+        if not response.output_audio and client.last_audio.mispredicted:
+            ...
+
+    Args:
+        client (SessionsClient): The client to wrap. Clients of any API
+            version are accepted.
+        cache (Optional[AudioCache]): The cache to use. A new memory-only
+            cache is created if unset.
+        max_predictions (int): The number of distinct queries whose last
+            prompt is remembered.
+        max_configs (int): The number of distinct request-level audio
+            settings whose effective settings are remembered.
+        synthesizer (Optional[Callable[[str, OutputAudioConfig], Optional[bytes]]]):
+            Called with the prompt text and the effective audio settings
+            of a mispredicted turn, to synthesize its audio. The audio
+            returned is cached.
+    """
+
+    def __init__(
+        self,
+        client,
+        cache: Optional[AudioCache] = None,
+        *,
+        max_predictions: int = 4096,
+        max_configs: int = 64,
+        synthesizer: Optional[Callable[[str, Any], Optional[bytes]]] = None,
+    ) -> None:
+        self._client = client
+        self._types = _utils.types_module(client)
+        self.cache = AudioCache() if cache is None else cache
+        self._max_predictions = max_predictions
+        self._max_configs = max_configs
+        self._synthesizer = synthesizer
+        self._lock = threading.Lock()
+        # Query -> text of the prompt that answered it last.
+        self._predictions = collections.OrderedDict()
+        # Request-level audio settings -> settings the server used.
+        self._effective_configs = collections.OrderedDict()
+        self._local = threading.local()
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_client":
+            raise AttributeError(name)
+        return getattr(self._client, name)
+
+    @property
+    def last_audio(self) -> SynthesizedAudio:
+        """SynthesizedAudio: How this thread's last turn got its audio."""
+        return getattr(self._local, "last_audio", SynthesizedAudio())
+
+    def detect_intent(self, request=None, *, session=None, query_input=None, **kwargs):
+        """Cached version of ``SessionsClient.detect_intent``."""
+        if request is not None and any([session, query_input]):
+            raise ValueError(
+                "If the `request` argument is set, then none of "
+                "the individual field arguments should be set."
+            )
+        request = self._types.DetectIntentRequest(request)
+        if session is not None:
+            request.session = session
+        if query_input is not None:
+            request.query_input = query_input
+
+        if "output_audio_config" not in request:
+            self._local.last_audio = SynthesizedAudio()
+            return self._client.detect_intent(request=request, **kwargs)
+
+        config_key = _digest(
+            _pb(request.output_audio_config).SerializeToString(deterministic=True),
+            _pb(request.output_audio_config_mask).SerializeToString(deterministic=True),
+        )
+        query_key = self._query_key(request)
+        with self._lock:
+            effective = self._effective_configs.get(config_key)
+            predicted = self._predictions.get(query_key) if query_key else None
+
+        predicted_audio = None
+        if effective is not None and predicted is not None:
+            # Fetched now rather than checked for: the entry could be
+            # evicted before the response arrives.
+            predicted_audio = self.cache.get(self.cache.key(predicted, effective))
+        skip_audio = predicted_audio is not None
+        if skip_audio:
+            request = self._types.DetectIntentRequest(request)
+            del request.output_audio_config
+            del request.output_audio_config_mask
+
+        response = self._client.detect_intent(request=request, **kwargs)
+        text = prompt_text(response.query_result)
+        if query_key:
+            self._predict(query_key, text)
+
+        if response.output_audio:
+            # Also the case when the agent synthesizes speech on its own.
+            self._remember_config(config_key, response.output_audio_config)
+            self.cache.put(
+                self.cache.key(text, response.output_audio_config),
+                response.output_audio,
+            )
+            self._local.last_audio = SynthesizedAudio()
+            return response
+
+        audio = None
+        if skip_audio and text:
+            if text == predicted:
+                audio = predicted_audio
+            else:
+                audio = self.cache.get(self.cache.key(text, effective))
+        mispredicted = skip_audio and bool(text) and audio is None
+        synthesized = False
+        if mispredicted and self._synthesizer is not None:
+            audio = self._synthesizer(text, effective)
+            if audio is not None:
+                self.cache.put(self.cache.key(text, effective), audio)
+                synthesized = True
+        if audio is not None:
+            response.output_audio = audio
+            response.output_audio_config = effective
+        self._local.last_audio = SynthesizedAudio(
+            cached=audio is not None and not synthesized,
+            mispredicted=mispredicted,
+            synthesized=synthesized,
+        )
+        return response
+
+    def _query_key(self, request):
+        query_input = request.query_input
+        if "event" in query_input:
+            scope = b""
+        elif "text" in query_input:
+            # The intent a text matches depends on the session's contexts.
+            scope = request.session.encode("utf-8")
+        else:
+            # Spoken queries cannot be told apart before recognition.
+            return None
+        return _digest(
+            scope,
+            _pb(query_input).SerializeToString(deterministic=True),
+            _pb(request.query_params).SerializeToString(deterministic=True),
+        )
+
+    def _remember_config(self, config_key, effective):
+        with self._lock:
+            self._effective_configs[config_key] = effective
+            self._effective_configs.move_to_end(config_key)
+            while len(self._effective_configs) > self._max_configs:
+                self._effective_configs.popitem(last=False)
+
+    def _predict(self, query_key, text):
+        with self._lock:
+            self._predictions[query_key] = text
+            self._predictions.move_to_end(query_key)
+            while len(self._predictions) > self._max_predictions:
+                self._predictions.popitem(last=False)
+
+
+__all__ = (
+    "AudioCache",
+    "AudioCacheStats",
+    "AudioCachingSessionsClient",
+    "SynthesizedAudio",
+    "prompt_text",
+)
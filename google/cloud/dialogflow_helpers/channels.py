@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Typed gRPC channel options for the Dialogflow transports.
+
+The generated transports create their channels with unlimited message
+sizes and no other options. :class:`TransportOptions` describes keepalive,
+message size limits and compression, and :func:`create_client` builds a
+client whose channel uses them:
+
+.. code-block:: python
+
+    from google.cloud import dialogflow
+    from google.cloud.dialogflow_helpers import channels
+
+    # Uses the defaults for the service: keepalive for Sessions.
+    sessions = channels.create_client(dialogflow.SessionsClient)
+
+    intents = channels.create_client(
+        dialogflow.IntentsClient,
+        options=channels.TransportOptions(compression="gzip"),
+    )
+
+Services carrying long-lived streams (Sessions, Participants) default to
+HTTP/2 keepalive pings so idle connections are not silently dropped in the
+middle of a call. Design-time services whose requests can be large
+(Agents, Intents, EntityTypes, Documents) default to gzip compression of
+requests. Other services use the generated transport's settings.
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+import grpc  # type: ignore
+
+from google import auth  # type: ignore
+from google.api_core import client_options as client_options_lib  # type: ignore
+
+
+_COMPRESSION = {
+    None: None,
+    "none": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+
+
+class TransportOptions(NamedTuple):
+    """Options for the gRPC channel of a transport.
+
+    Attributes:
+        keepalive_time: Seconds between keepalive pings on an otherwise
+            idle connection; ``None`` disables keepalive. Servers reject
+            clients that ping too often, so keep this at tens of seconds.
+        keepalive_timeout: Seconds to wait for a ping acknowledgement
+            before closing the connection.
+        keepalive_permit_without_calls: Whether to ping while no call is
+            in progress.
+        max_send_message_length: The largest request in bytes; -1 for no
+            limit.
+        max_receive_message_length: The largest response in bytes; -1 for
+            no limit.
+        compression: ``"gzip"``, ``"deflate"`` or ``"none"`` to compress
+            requests; ``None`` keeps the gRPC default.
+    """
+
+    keepalive_time: Optional[float] = None
+    keepalive_timeout: Optional[float] = None
+    keepalive_permit_without_calls: bool = False
+    max_send_message_length: int = -1
+    max_receive_message_length: int = -1
+    compression: Optional[str] = None
+
+    def channel_options(self) -> List[Tuple[str, object]]:
+        """Return the options as ``grpc`` channel arguments.
+
+        Raises:
+            ValueError: If an option is out of range.
+        """
+        for name in ("keepalive_time", "keepalive_timeout"):
+            value = getattr(self, name)
+            if value is not None and value <= 0:
+                raise ValueError("{} must be positive, got {}.".format(name, value))
+        for name in ("max_send_message_length", "max_receive_message_length"):
+            value = getattr(self, name)
+            if value < -1 or value == 0:
+                raise ValueError(
+                    "{} must be positive or -1, got {}.".format(name, value)
+                )
+
+        options = [
+            ("grpc.max_send_message_length", self.max_send_message_length),
+            ("grpc.max_receive_message_length", self.max_receive_message_length),
+        ]
+        if self.keepalive_time is not None:
+            options.append(("grpc.keepalive_time_ms", int(self.keepalive_time * 1000)))
+            options.append(
+                (
+                    "grpc.keepalive_permit_without_calls",
+                    int(self.keepalive_permit_without_calls),
+                )
+            )
+        if self.keepalive_timeout is not None:
+            options.append(
+                ("grpc.keepalive_timeout_ms", int(self.keepalive_timeout * 1000))
+            )
+        return options
+
+    def channel_kwargs(self) -> dict:
+        """Return the keyword arguments for ``create_channel``.
+
+        Raises:
+            ValueError: If an option is out of range.
+        """
+        if self.compression not in _COMPRESSION:
+            raise ValueError(
+                "Unsupported compression {!r}; use one of gzip, deflate or "
+                "none.".format(self.compression)
+            )
+        kwargs = {"options": self.channel_options()}
+        if self.compression is not None:
+            kwargs["compression"] = _COMPRESSION[self.compression]
+        return kwargs
+
+
+_STREAMING = TransportOptions(keepalive_time=60.0, keepalive_timeout=20.0)
+_DESIGN_TIME = TransportOptions(compression="gzip")
+
+#: Default options by service name.
+SERVICE_DEFAULTS = {
+    "Sessions": _STREAMING,
+    "Participants": _STREAMING,
+    "Agents": _DESIGN_TIME,
+    "Intents": _DESIGN_TIME,
+    "EntityTypes": _DESIGN_TIME,
+    "Documents": _DESIGN_TIME,
+}
+
+
+def _service_name(client_class):
+    name = client_class.__name__
+    for suffix in ("AsyncClient", "Client"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def _is_async(client_class):
+    return client_class.__name__.endswith("AsyncClient")
+
+
+def default_options(client_class) -> TransportOptions:
+    """Return the default transport options of a service.
+
+    Args:
+        client_class (type): The client class of the service, of any API
+            version, synchronous or asynchronous.
+
+    Returns:
+        TransportOptions: The defaults of the service.
+    """
+    return SERVICE_DEFAULTS.get(_service_name(client_class), TransportOptions())
+
+
+def create_transport(
+    client_class,
+    *,
+    options: Optional[TransportOptions] = None,
+    credentials=None,
+    host: Optional[str] = None,
+    scopes=None,
+    quota_project_id: Optional[str] = None,
+    client_info=None,
+):
+    """Create a gRPC transport whose channel uses ``options``.
+
+    Args:
+        client_class (type): The client class the transport is for.
+        options (Optional[TransportOptions]): The channel options; by
+            default those of :data:`SERVICE_DEFAULTS`.
+        credentials (Optional[google.auth.credentials.Credentials]): The
+            credentials; by default the application default credentials.
+        host (Optional[str]): The endpoint; by default the client's.
+        scopes (Optional[Sequence[str]]): The OAuth scopes; by default
+            those of the service.
+        quota_project_id (Optional[str]): A project to bill for quota.
+        client_info (Optional[google.api_core.gapic_v1.client_info.ClientInfo]):
+            The client info sent with requests; by default the library's.
+
+    Returns:
+        The transport, to pass as the ``transport`` of a client.
+    """
+    if options is None:
+        options = default_options(client_class)
+    transport_class = client_class.get_transport_class(
+        "grpc_asyncio" if _is_async(client_class) else "grpc"
+    )
+    scopes = scopes or transport_class.AUTH_SCOPES
+    if credentials is None:
+        credentials, _ = auth.default(scopes=scopes, quota_project_id=quota_project_id)
+    host = host or client_class.DEFAULT_ENDPOINT
+    if ":" not in host:
+        host += ":443"
+
+    channel = transport_class.create_channel(
+        host,
+        credentials=credentials,
+        scopes=scopes,
+        quota_project_id=quota_project_id,
+        **options.channel_kwargs(),
+    )
+    transport_kwargs = {}
+    if client_info is not None:
+        transport_kwargs["client_info"] = client_info
+    transport = transport_class(host=host, channel=channel, **transport_kwargs)
+    # A transport given a channel does not know its credentials; record
+    # them so helpers such as warmup.warm_up() can reach them.
+    transport._credentials = credentials
+    return transport
+
+
+def create_client(
+    client_class,
+    *,
+    options: Optional[TransportOptions] = None,
+    credentials=None,
+    client_options=None,
+    **kwargs,
+):
+    """Create a client whose channel uses ``options``.
+
+    Mutual TLS endpoints are not selected automatically; set
+    ``client_options.api_endpoint`` to use one.
+
+    Args:
+        client_class (type): The client class, of any service and API
+            version, synchronous or asynchronous.
+        options (Optional[TransportOptions]): The channel options; by
+            default those of :data:`SERVICE_DEFAULTS`.
+        credentials (Optional[google.auth.credentials.Credentials]): The
+            credentials; by default the application default credentials.
+        client_options (Union[dict, ClientOptions]): Client options; the
+            endpoint, scopes and quota project are used.
+        kwargs: Additional arguments for the client. A ``client_info`` is
+            handed to the transport, which sends it with every request.
+
+    Returns:
+        The client.
+    """
+    if isinstance(client_options, dict):
+        client_options = client_options_lib.from_dict(client_options)
+    if client_options is None:
+        client_options = client_options_lib.ClientOptions()
+    transport = create_transport(
+        client_class,
+        options=options,
+        credentials=credentials,
+        host=client_options.api_endpoint,
+        scopes=client_options.scopes,
+        quota_project_id=client_options.quota_project_id,
+        client_info=kwargs.get("client_info"),
+    )
+    return client_class(transport=transport, **kwargs)
+
+
+__all__ = (
+    "SERVICE_DEFAULTS",
+    "TransportOptions",
+    "create_client",
+    "create_transport",
+    "default_options",
+)
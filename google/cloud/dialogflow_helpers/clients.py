@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Per-process client caching that is safe across ``fork``.
+
+gRPC channels cannot be used in a child process created by ``fork`` after
+the channel was created, which is how gunicorn and ``multiprocessing``
+start workers. :class:`ClientFactory` caches one client per service and
+process, and notices a fork by the change of process id: the child then
+builds its own clients, and so channels, the first time it asks for them.
+
+Credentials are resolved once, in the process that creates the factory,
+and shared with every client, so children neither parse service account
+keys again nor look up default credentials.
+"""
+
+import os
+import threading
+import weakref
+from typing import Optional, Union
+
+from google.api_core import client_options as client_options_lib  # type: ignore
+from google.api_core import gapic_v1  # type: ignore
+from google.auth import credentials as ga_credentials  # type: ignore
+from google.oauth2 import service_account  # type: ignore
+
+
+# Factories to reset in a child process, on Pythons supporting fork hooks.
+_factories = weakref.WeakSet()  # type: weakref.WeakSet
+
+
+def _after_fork_in_child():
+    for factory in list(_factories):
+        factory._reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class ClientFactory(object):
+    """Create and cache one client per service in each process.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import clients
+
+        # At import time, in the gunicorn master.
+        factory = clients.ClientFactory.from_service_account_file("key.json")
+
+        def handle(request):
+            # In a worker: the client is created on first use and reused.
+            sessions = factory.get(dialogflow.SessionsClient)
+            return sessions.detect_intent(request=...)
+
+    Clients inherited from the parent process are never used or closed in
+    the child; closing them there could disturb the parent's channels.
+    Avoid calling :meth:`get` in the parent before forking: once gRPC has
+    started its threads, a forked child may hang creating new channels
+    unless ``GRPC_ENABLE_FORK_SUPPORT=1`` is set.
+
+    Args:
+        credentials (Optional[google.auth.credentials.Credentials]): The
+            credentials for every client. By default each client finds
+            the application default credentials.
+        transport (Optional[str]): The name of the transport to use, such
+            as ``"grpc"``. Transport instances cannot be shared between
+            processes and are not accepted.
+        client_options (Union[dict, ClientOptions]): Options for every
+            client.
+        client_info (google.api_core.gapic_v1.client_info.ClientInfo):
+            The client info for every client.
+    """
+
+    def __init__(
+        self,
+        *,
+        credentials: Optional[ga_credentials.Credentials] = None,
+        transport: Optional[str] = None,
+        client_options: Union[dict, client_options_lib.ClientOptions, None] = None,
+        client_info: Optional[gapic_v1.client_info.ClientInfo] = None,
+    ) -> None:
+        if transport is not None and not isinstance(transport, str):
+            raise ValueError(
+                "ClientFactory accepts a transport name, not a transport instance."
+            )
+        self._credentials = credentials
+        self._kwargs = {}
+        if transport is not None:
+            self._kwargs["transport"] = transport
+        if client_options is not None:
+            self._kwargs["client_options"] = client_options
+        if client_info is not None:
+            self._kwargs["client_info"] = client_info
+        self._reset()
+        _factories.add(self)
+
+    @classmethod
+    def from_service_account_info(cls, info: dict, **kwargs) -> "ClientFactory":
+        """Create a factory using service account credentials info.
+
+        The key is parsed once, here; clients created in forked children
+        reuse the parsed credentials.
+
+        Args:
+            info (dict): The service account private key info.
+            kwargs: Additional arguments to pass to the constructor.
+
+        Returns:
+            ClientFactory: The constructed factory.
+        """
+        kwargs["credentials"] = service_account.Credentials.from_service_account_info(
+            info
+        )
+        return cls(**kwargs)
+
+    @classmethod
+    def from_service_account_file(cls, filename: str, **kwargs) -> "ClientFactory":
+        """Create a factory using a service account private key file.
+
+        Args:
+            filename (str): The path to the service account private key json
+                file.
+            kwargs: Additional arguments to pass to the constructor.
+
+        Returns:
+            ClientFactory: The constructed factory.
+        """
+        kwargs["credentials"] = service_account.Credentials.from_service_account_file(
+            filename
+        )
+        return cls(**kwargs)
+
+    from_service_account_json = from_service_account_file
+
+    @property
+    def credentials(self) -> Optional[ga_credentials.Credentials]:
+        """The credentials shared by the clients."""
+        return self._credentials
+
+    def _reset(self):
+        # A lock held by another thread at the time of the fork stays
+        # locked in the child, so the child gets a fresh one. Clients of
+        # the parent are kept referenced so their channels are not
+        # garbage collected (and closed) in the child.
+        inherited = getattr(self, "_clients", None)
+        if inherited:
+            self._inherited.append(inherited)
+        elif not hasattr(self, "_inherited"):
+            self._inherited = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def get(self, client_class):
+        """Return the client of a service for the current process.
+
+        Args:
+            client_class (type): The client class, such as
+                ``dialogflow.SessionsClient`` or ``SessionsAsyncClient``.
+
+        Returns:
+            The cached client, created on first use in this process.
+        """
+        if self._pid != os.getpid():
+            # Python < 3.7 has no fork hooks; detect the fork here.
+            self._reset()
+        client = self._clients.get(client_class)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(client_class)
+                if client is None:
+                    client = client_class(credentials=self._credentials, **self._kwargs)
+                    self._clients[client_class] = client
+        return client
+
+    def clear(self) -> None:
+        """Forget the clients of the current process.
+
+        The clients are not closed; calls already in progress complete.
+        """
+        with self._lock:
+            self._clients = {}
+
+
+__all__ = ("ClientFactory",)
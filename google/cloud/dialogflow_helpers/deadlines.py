@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""A time budget shared by all the calls made within a block of code.
+
+Each generated method has its own timeout and retry deadline, up to 220
+seconds by default, so a request handler calling several methods cannot
+bound its total latency by passing timeouts alone. Within :func:`budget`,
+the methods of installed clients trim their timeouts and retry deadlines
+to the time remaining, and fail right away with
+:class:`~google.api_core.exceptions.DeadlineExceeded` once it is spent:
+
+.. code-block:: python
+
+    from google.cloud import dialogflow
+    from google.cloud.dialogflow_helpers import deadlines
+
+    sessions = deadlines.install(dialogflow.SessionsClient())
+    contexts = deadlines.install(dialogflow.ContextsClient())
+
+    with deadlines.budget(1.5):
+        response = sessions.detect_intent(request=...)
+        active = list(contexts.list_contexts(parent=...))
+
+The budget is held in a :mod:`contextvars` variable, so each thread and
+each asyncio task has its own. Python 3.6 has no :mod:`contextvars`;
+there the budget is per thread, and concurrent tasks on one event loop
+share it.
+
+For asynchronous clients, which wrap their methods on every call, only
+the timeout of each attempt is trimmed; a retry that starts after the
+budget is spent fails with ``DeadlineExceeded`` instead of being sent.
+"""
+
+import contextlib
+import threading
+import time
+from typing import Optional
+
+from google.api_core import exceptions  # type: ignore
+from google.api_core import gapic_v1  # type: ignore
+from google.api_core import timeout as timeout_  # type: ignore
+from grpc.experimental import aio  # type: ignore
+
+try:
+    import contextvars
+except ImportError:  # pragma: NO COVER
+    contextvars = None
+
+
+class _ThreadLocalVar(object):
+    """The subset of ``contextvars.ContextVar`` used here, per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self):
+        return getattr(self._local, "value", None)
+
+    def set(self, value):
+        token = self.get()
+        self._local.value = value
+        return token
+
+    def reset(self, token):
+        self._local.value = token
+
+
+if contextvars is not None:
+    _deadline = contextvars.ContextVar("dialogflow_deadline", default=None)
+else:  # pragma: NO COVER
+    _deadline = _ThreadLocalVar()
+
+
+def remaining() -> Optional[float]:
+    """Return the seconds left in the current budget.
+
+    Returns:
+        Optional[float]: The remaining time, which is negative once the
+        budget is spent, or ``None`` outside of a budget.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextlib.contextmanager
+def budget(seconds: float):
+    """Limit the total time of the calls made within the block.
+
+    Budgets nest: an inner budget cannot extend the deadline of an outer
+    one.
+
+    Args:
+        seconds (float): The time allowed for the block.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _check(left):
+    if left <= 0:
+        raise exceptions.DeadlineExceeded(
+            "The deadline budget was spent {:.3f} seconds ago.".format(-left)
+        )
+
+
+def _clamp(func):
+    """Wrap a low-level call so its timeout ends with the budget."""
+
+    def call(*args, **kwargs):
+        left = remaining()
+        if left is not None:
+            _check(left)
+            timeout = kwargs.get("timeout")
+            kwargs["timeout"] = left if timeout is None else min(timeout, left)
+        return func(*args, **kwargs)
+
+    return call
+
+
+class _BudgetTimeout(object):
+    """A timeout decorator that applies ``timeout`` and then the budget."""
+
+    def __init__(self, timeout):
+        if isinstance(timeout, (int, float)):
+            timeout = timeout_.ConstantTimeout(timeout)
+        self._timeout = timeout
+
+    def __call__(self, func):
+        func = _clamp(func)
+        if self._timeout is not None:
+            func = self._timeout(func)
+        return func
+
+
+class _BudgetedMethod(object):
+    """A wrapped method whose retry deadline and timeout fit the budget."""
+
+    def __init__(self, wrapped):
+        self._wrapped = wrapped
+
+    def __call__(
+        self,
+        *args,
+        retry=gapic_v1.method.DEFAULT,
+        timeout=gapic_v1.method.DEFAULT,
+        **kwargs
+    ):
+        left = remaining()
+        if left is None:
+            return self._wrapped(*args, retry=retry, timeout=timeout, **kwargs)
+        _check(left)
+
+        if retry is gapic_v1.method.DEFAULT:
+            retry = getattr(self._wrapped, "_retry", None)
+        if retry:
+            deadline = getattr(retry, "deadline", None)
+            retry = retry.with_deadline(
+                left if deadline is None else min(deadline, left)
+            )
+        if timeout is gapic_v1.method.DEFAULT:
+            timeout = getattr(self._wrapped, "_timeout", None)
+        return self._wrapped(
+            *args, retry=retry, timeout=_BudgetTimeout(timeout), **kwargs
+        )
+
+
+class _BudgetedStub(object):
+    """A gRPC stub whose calls fit the budget."""
+
+    def __init__(self, stub):
+        self._stub = stub
+        self._call = _clamp(stub)
+
+    def __call__(self, *args, **kwargs):
+        return self._call(*args, **kwargs)
+
+
+class _BudgetedUnaryStub(_BudgetedStub, aio.UnaryUnaryMultiCallable):
+    # google.api_core maps the errors of asyncio stubs based on their type.
+    pass
+
+
+def install(client):
+    """Make the methods of a client honor the deadline budget.
+
+    Outside of a :func:`budget`, the methods behave as before. Installing
+    twice has no further effect.
+
+    Args:
+        client: A synchronous or asynchronous gRPC client, or its
+            transport, of any service and API version.
+
+    Returns:
+        The client, for chaining.
+    """
+    transport = getattr(client, "transport", client)
+    if getattr(transport, "_deadline_budget", False):
+        return client
+    transport._wrapped_methods = {
+        stub: _BudgetedMethod(method)
+        for stub, method in transport._wrapped_methods.items()
+    }
+    # Asynchronous clients wrap the transport's stubs on each call rather
+    # than using the wrapped methods, so the stubs are wrapped as well.
+    stubs = transport._stubs
+    for name, stub in list(stubs.items()):
+        if isinstance(stub, aio.UnaryUnaryMultiCallable):
+            stubs[name] = _BudgetedUnaryStub(stub)
+        elif isinstance(stub, aio.StreamStreamMultiCallable) or isinstance(
+            stub, aio.UnaryStreamMultiCallable
+        ):
+            stubs[name] = _BudgetedStub(stub)
+    transport._deadline_budget = True
+    return client
+
+
+__all__ = (
+    "budget",
+    "install",
+    "remaining",
+)
@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Evaluate intent classification against a labeled utterance set.
+
+The labeled CSV is streamed, queries run concurrently at a bounded rate,
+and each result is appended to a results CSV as soon as it arrives, so an
+interrupted evaluation resumes where it stopped. The confusion matrix and
+per-intent metrics are computed from the results file with NumPy.
+
+The command line entry point is::
+
+    python -m google.cloud.dialogflow_helpers.evaluate \\
+        --session-prefix projects/my-project/agent/sessions/ \\
+        utterances.csv results.csv
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import importlib
+import os
+import threading
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from google.api_core import exceptions  # type: ignore
+
+from google.cloud.dialogflow_helpers import _utils
+
+
+_RESULT_FIELDS = (
+    "id",
+    "text",
+    "expected",
+    "predicted",
+    "confidence",
+    "latency",
+    "error",
+)
+
+
+class Utterance(NamedTuple):
+    """A labeled utterance.
+
+    Attributes:
+        id: Identifies the utterance across runs.
+        text: The query text.
+        intent: The display name of the expected intent; empty if no
+            intent should match.
+        language_code: The query language, or empty for the default.
+    """
+
+    id: str
+    text: str
+    intent: str
+    language_code: str = ""
+
+
+class EvaluationResult(NamedTuple):
+    """The classification of one utterance.
+
+    Attributes:
+        id: The utterance id.
+        text: The query text.
+        expected: The display name of the expected intent.
+        predicted: The display name of the matched intent; empty if no
+            intent matched or the query failed.
+        confidence: The intent detection confidence.
+        latency: Seconds the query took.
+        error: The error message of a failed query, else empty.
+    """
+
+    id: str
+    text: str
+    expected: str
+    predicted: str
+    confidence: float
+    latency: float
+    error: str
+
+
+def read_utterances(path: str) -> Iterator[Utterance]:
+    """Stream labeled utterances from a CSV file.
+
+    The file needs a header with ``text`` and ``intent`` columns, and may
+    have ``id`` and ``language_code`` columns. Without an ``id`` column,
+    utterances are identified by their row number.
+
+    Args:
+        path (str): The CSV file.
+
+    Returns:
+        Iterator[Utterance]: The utterances, in file order.
+
+    Raises:
+        ValueError: If a required column is missing.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = {"text", "intent"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(
+                "{} has no {} column.".format(path, " or ".join(sorted(missing)))
+            )
+        for number, row in enumerate(reader, 1):
+            yield Utterance(
+                row.get("id") or str(number),
+                row["text"],
+                row["intent"],
+                row.get("language_code") or "",
+            )
+
+
+def read_results(path: str) -> Iterator[EvaluationResult]:
+    """Stream the results written by :func:`run_evaluation`.
+
+    Args:
+        path (str): The results CSV file.
+
+    Returns:
+        Iterator[EvaluationResult]: The results, in completion order. An
+        utterance retried after an error appears once per attempt.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield EvaluationResult(
+                row["id"],
+                row["text"],
+                row["expected"],
+                row["predicted"],
+                float(row["confidence"] or 0),
+                float(row["latency"] or 0),
+                row["error"],
+            )
+
+
+def _completed_ids(path):
+    """Return the ids without errors in a results file, and prepare it for
+    appending by dropping a partially written last line."""
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return set(), False
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.seek(0)
+            content = f.read()
+            f.truncate(content.rfind(b"\n") + 1)
+    done = set()
+    for result in read_results(path):
+        if result.error:
+            done.discard(result.id)
+        else:
+            done.add(result.id)
+    return done, True
+
+
+class RateLimiter(object):
+    """Space calls evenly to stay under a rate.
+
+    Args:
+        rate (Optional[float]): The maximum calls per second; ``None``
+            disables the limit.
+    """
+
+    def __init__(self, rate: Optional[float]) -> None:
+        self._interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Block until the next call is allowed."""
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # Do not bank unused capacity while the caller was idle.
+            self._next = max(self._next, now)
+            delay = self._next - now
+            self._next += self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run_evaluation(
+    client,
+    utterances: Iterable[Utterance],
+    results_path: str,
+    *,
+    session_prefix: str,
+    language_code: str = "en",
+    queries_per_second: Optional[float] = None,
+    max_workers: int = 8,
+) -> int:
+    """Classify utterances and append the results to a CSV file.
+
+    Utterances with a result in ``results_path`` are skipped, so an
+    interrupted evaluation can be resumed by running it again. Utterances
+    whose query failed are retried.
+
+    Args:
+        client (SessionsClient): The client to query with. Clients of any
+            API version are accepted.
+        utterances (Iterable[Utterance]): The labeled utterances, usually
+            from :func:`read_utterances`.
+        results_path (str): The results CSV file.
+        session_prefix (str): Each utterance is sent in its own session,
+            named ``session_prefix + "eval-" + id``; for example
+            ``projects/<project>/agent/sessions/``.
+        language_code (str): The language of utterances without one.
+        queries_per_second (Optional[float]): The maximum query rate.
+        max_workers (int): The maximum number of concurrent queries.
+
+    Returns:
+        int: The number of utterances evaluated by this run.
+    """
+    done, exists = _completed_ids(results_path)
+    limiter = RateLimiter(queries_per_second)
+
+    def classify(utterance):
+        request = {
+            "session": "{}eval-{}".format(session_prefix, utterance.id),
+            "query_input": {
+                "text": {
+                    "text": utterance.text,
+                    "language_code": utterance.language_code or language_code,
+                }
+            },
+        }
+        started = time.monotonic()
+        try:
+            response = client.detect_intent(request=request)
+        except exceptions.GoogleAPICallError as exc:
+            return EvaluationResult(
+                utterance.id,
+                utterance.text,
+                utterance.intent,
+                "",
+                0.0,
+                time.monotonic() - started,
+                str(exc),
+            )
+        query_result = response.query_result
+        return EvaluationResult(
+            utterance.id,
+            utterance.text,
+            utterance.intent,
+            query_result.intent.display_name,
+            query_result.intent_detection_confidence,
+            time.monotonic() - started,
+            "",
+        )
+
+    evaluated = 0
+    with open(results_path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not exists:
+            writer.writerow(_RESULT_FIELDS)
+
+        def drain(pending, return_when):
+            nonlocal evaluated
+            finished, pending = concurrent.futures.wait(
+                pending, return_when=return_when
+            )
+            for future in finished:
+                writer.writerow(future.result())
+                evaluated += 1
+            f.flush()
+            return pending
+
+        pending = set()
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            try:
+                for utterance in utterances:
+                    if utterance.id in done:
+                        continue
+                    if len(pending) >= max_workers:
+                        pending = drain(pending, concurrent.futures.FIRST_COMPLETED)
+                    limiter.wait()
+                    pending.add(executor.submit(classify, utterance))
+            finally:
+                drain(pending, concurrent.futures.ALL_COMPLETED)
+    return evaluated
+
+
+class EvaluationReport(object):
+    """Intent classification metrics.
+
+    Rows of the confusion matrix are expected intents and columns are
+    predicted intents, both indexed like :attr:`labels`. The empty label
+    stands for "no intent matched". Failed queries are counted in
+    :attr:`errors` and excluded from the metrics; for an utterance
+    evaluated more than once only the last result counts.
+
+    Attributes:
+        labels (List[str]): The intent display names.
+        matrix (numpy.ndarray): The confusion matrix.
+        errors (int): The number of failed queries.
+    """
+
+    def __init__(self, labels: List[str], matrix, errors: int = 0) -> None:
+        self.labels = labels
+        self.matrix = matrix
+        self.errors = errors
+
+    @classmethod
+    def from_results(cls, results: Iterable[EvaluationResult]) -> "EvaluationReport":
+        """Compute the metrics of evaluation results.
+
+        Args:
+            results (Iterable[EvaluationResult]): The results, usually
+                from :func:`read_results`.
+
+        Returns:
+            EvaluationReport: The metrics.
+        """
+        np = _utils.import_optional("numpy", "evaluation")
+        latest = {}
+        for result in results:
+            latest[result.id] = result
+
+        errors = 0
+        expected = []
+        predicted = []
+        for result in latest.values():
+            if result.error:
+                errors += 1
+            else:
+                expected.append(result.expected)
+                predicted.append(result.predicted)
+
+        labels = sorted(set(expected) | set(predicted))
+        index = {label: i for i, label in enumerate(labels)}
+        rows = np.fromiter((index[label] for label in expected), np.intp, len(expected))
+        columns = np.fromiter(
+            (index[label] for label in predicted), np.intp, len(predicted)
+        )
+        matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        np.add.at(matrix, (rows, columns), 1)
+        return cls(labels, matrix, errors)
+
+    def _ratio(self, numerator, denominator):
+        np = _utils.import_optional("numpy", "evaluation")
+        out = np.zeros(len(numerator), dtype=np.float64)
+        return np.divide(numerator, denominator, out=out, where=denominator > 0)
+
+    @property
+    def support(self):
+        """numpy.ndarray: The number of utterances expecting each intent."""
+        return self.matrix.sum(axis=1)
+
+    @property
+    def precision(self):
+        """numpy.ndarray: The precision of each intent."""
+        return self._ratio(self.matrix.diagonal(), self.matrix.sum(axis=0))
+
+    @property
+    def recall(self):
+        """numpy.ndarray: The recall of each intent."""
+        return self._ratio(self.matrix.diagonal(), self.support)
+
+    @property
+    def f1(self):
+        """numpy.ndarray: The F1 score of each intent."""
+        precision = self.precision
+        recall = self.recall
+        return self._ratio(2 * precision * recall, precision + recall)
+
+    @property
+    def accuracy(self) -> float:
+        """float: The fraction of utterances classified correctly."""
+        total = self.matrix.sum()
+        return float(self.matrix.trace() / total) if total else 0.0
+
+    def format(self) -> str:
+        """Return the per-intent metrics as a plain text table."""
+        width = max([len("(no intent)")] + [len(label) for label in self.labels])
+        lines = ["{:<{}}  precision  recall     f1  support".format("intent", width)]
+        rows = zip(self.labels, self.precision, self.recall, self.f1, self.support)
+        for label, precision, recall, f1, support in rows:
+            lines.append(
+                "{:<{}}  {:9.3f}  {:6.3f}  {:5.3f}  {:7d}".format(
+                    label or "(no intent)", width, precision, recall, f1, support
+                )
+            )
+        lines.append(
+            "accuracy {:.3f} over {} utterances, {} errors".format(
+                self.accuracy, int(self.matrix.sum()), self.errors
+            )
+        )
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate intent classification against labeled utterances."
+    )
+    parser.add_argument("utterances", help="CSV file with text and intent columns")
+    parser.add_argument("results", help="CSV file to append results to")
+    parser.add_argument(
+        "--session-prefix",
+        required=True,
+        help="prefix of the session names, e.g. projects/<project>/agent/sessions/",
+    )
+    parser.add_argument("--language-code", default="en")
+    parser.add_argument(
+        "--qps", type=float, default=None, help="maximum queries per second"
+    )
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--api-version", choices=("v2", "v2beta1"), default="v2")
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(
+        "google.cloud.dialogflow_{}".format(args.api_version)
+    )
+    run_evaluation(
+        module.SessionsClient(),
+        read_utterances(args.utterances),
+        args.results,
+        session_prefix=args.session_prefix,
+        language_code=args.language_code,
+        queries_per_second=args.qps,
+        max_workers=args.max_workers,
+    )
+    print(EvaluationReport.from_results(read_results(args.results)).format())
+
+
+__all__ = (
+    "EvaluationReport",
+    "EvaluationResult",
+    "RateLimiter",
+    "Utterance",
+    "read_results",
+    "read_utterances",
+    "run_evaluation",
+)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Export conversation messages to Parquet or Arrow files.
+
+Messages are listed for many conversations concurrently and streamed to
+the output file in record batches, so memory use is bounded by the batch
+size and the number of workers rather than by the size of the export.
+"""
+
+import concurrent.futures
+import json
+import queue
+import threading
+from typing import NamedTuple, Optional
+
+from google.protobuf import descriptor as pb_descriptor  # type: ignore
+from google.protobuf import json_format  # type: ignore
+
+from google.cloud.dialogflow_helpers import _utils
+
+
+_FD = pb_descriptor.FieldDescriptor
+
+_ARROW_TYPES = {
+    _FD.TYPE_STRING: "string",
+    _FD.TYPE_BYTES: "binary",
+    _FD.TYPE_BOOL: "bool_",
+    _FD.TYPE_ENUM: "string",
+    _FD.TYPE_INT32: "int32",
+    _FD.TYPE_SINT32: "int32",
+    _FD.TYPE_SFIXED32: "int32",
+    _FD.TYPE_INT64: "int64",
+    _FD.TYPE_SINT64: "int64",
+    _FD.TYPE_SFIXED64: "int64",
+    _FD.TYPE_UINT32: "uint32",
+    _FD.TYPE_FIXED32: "uint32",
+    _FD.TYPE_UINT64: "uint64",
+    _FD.TYPE_FIXED64: "uint64",
+    _FD.TYPE_FLOAT: "float32",
+    _FD.TYPE_DOUBLE: "float64",
+}
+
+# Well-known message types which are stored as a single column instead of
+# being flattened field by field.
+_JSON_TYPES = frozenset(
+    ("google.protobuf.Value", "google.protobuf.Struct", "google.protobuf.ListValue")
+)
+_TIMESTAMP = "google.protobuf.Timestamp"
+_DURATION = "google.protobuf.Duration"
+
+_DONE = object()
+
+
+class ExportResult(NamedTuple):
+    """Summary of a finished export."""
+
+    conversations: int
+    messages: int
+
+
+class _Column(object):
+    """A flat output column bound to a field path in ``Message``."""
+
+    __slots__ = ("name", "path", "arrow_type", "convert")
+
+    def __init__(self, name, path, arrow_type, convert):
+        self.name = name
+        # Sequence of (field name, is_repeated, is_message) tuples.
+        self.path = path
+        self.arrow_type = arrow_type
+        self.convert = convert
+
+    def value(self, message, path=None):
+        path = self.path if path is None else path
+        name, repeated, is_message = path[0]
+        if is_message and not repeated and not message.HasField(name):
+            return None
+        value = getattr(message, name)
+        if len(path) == 1:
+            if repeated:
+                return [self.convert(v) for v in value]
+            return self.convert(value)
+        if repeated:
+            return [self.value(v, path[1:]) for v in value]
+        return self.value(value, path[1:])
+
+
+def _identity(value):
+    return value
+
+
+def _json(value):
+    return json.dumps(json_format.MessageToDict(value), sort_keys=True)
+
+
+def _scalar_column(name, path, field, repeated):
+    if field.type == _FD.TYPE_MESSAGE:
+        full_name = field.message_type.full_name
+        if full_name == _TIMESTAMP:
+            arrow_type = lambda pa: pa.timestamp("us", tz="UTC")  # noqa: E731
+            convert = lambda v: v.ToMicroseconds()  # noqa: E731
+        elif full_name == _DURATION:
+            arrow_type = lambda pa: pa.duration("us")  # noqa: E731
+            convert = lambda v: v.ToMicroseconds()  # noqa: E731
+        else:
+            arrow_type = lambda pa: pa.string()  # noqa: E731
+            convert = _json
+    else:
+        type_name = _ARROW_TYPES[field.type]
+        arrow_type = lambda pa: getattr(pa, type_name)()  # noqa: E731
+        if field.type == _FD.TYPE_ENUM:
+            values = field.enum_type.values_by_number
+            convert = lambda v: values[v].name if v in values else str(v)  # noqa: E731
+        else:
+            convert = _identity
+
+    if repeated:
+        return _Column(name, path, lambda pa: pa.list_(arrow_type(pa)), convert)
+    return _Column(name, path, arrow_type, convert)
+
+
+def _flatten(descriptor, prefix=(), path=(), repeated=False):
+    for field in descriptor.fields:
+        is_repeated = field.label == _FD.LABEL_REPEATED
+        is_message = field.type == _FD.TYPE_MESSAGE
+        if is_message and field.message_type.GetOptions().map_entry:
+            # Map fields have no flat representation; skip them.
+            continue
+        if is_repeated and repeated:
+            # Only one level of repetition maps onto a list column.
+            continue
+
+        name = prefix + (field.name,)
+        field_path = path + ((field.name, is_repeated, is_message),)
+        full_name = field.message_type.full_name if is_message else None
+        if is_message and full_name not in _JSON_TYPES | {_TIMESTAMP, _DURATION}:
+            for column in _flatten(
+                field.message_type, name, field_path, repeated or is_repeated
+            ):
+                yield column
+        else:
+            yield _scalar_column(
+                "_".join(name), field_path, field, repeated or is_repeated
+            )
+
+
+def message_columns(message_class) -> list:
+    """Return the flat column layout for a ``Message`` class.
+
+    Scalar fields of ``Message`` become columns of the same name. Singular
+    sub-messages such as ``message_annotation`` are flattened with their
+    field names joined by underscores, and repeated sub-messages such as
+    ``message_annotation.parts`` become one list column per leaf field
+    (for example ``message_annotation_parts_entity_type``). Timestamps are
+    stored as UTC timestamps, enums by name and ``google.protobuf.Value``
+    fields as JSON strings.
+
+    Args:
+        message_class: The ``Message`` type of the API version in use.
+
+    Returns:
+        list: The columns, in field declaration order. The first column
+        is always ``conversation``.
+    """
+    columns = [_Column("conversation", None, lambda pa: pa.string(), _identity)]
+    columns.extend(_flatten(message_class.pb().DESCRIPTOR))
+    return columns
+
+
+def message_schema(message_class):
+    """Return the :class:`pyarrow.Schema` used for exported messages.
+
+    Args:
+        message_class: The ``Message`` type of the API version in use.
+
+    Returns:
+        pyarrow.Schema: The schema of the exported files.
+    """
+    pa = _utils.import_optional("pyarrow", "export")
+    return pa.schema(
+        [
+            (column.name, column.arrow_type(pa))
+            for column in message_columns(message_class)
+        ]
+    )
+
+
+class _Batch(object):
+    """Column-oriented buffer for rows of a record batch."""
+
+    def __init__(self, columns):
+        self._columns = columns
+        self.data = {column.name: [] for column in columns}
+        self.size = 0
+
+    def append(self, conversation, message):
+        pb = type(message).pb(message)
+        data = self.data
+        data["conversation"].append(conversation)
+        for column in self._columns[1:]:
+            data[column.name].append(column.value(pb))
+        self.size += 1
+
+
+def _open_writer(pa, path, schema, file_format):
+    if file_format == "parquet":
+        parquet = _utils.import_optional("pyarrow.parquet", "export")
+        return parquet.ParquetWriter(path, schema)
+    if file_format == "arrow":
+        return pa.ipc.new_file(path, schema)
+    raise ValueError(
+        "Unsupported file_format {!r}; expected 'parquet' or 'arrow'.".format(
+            file_format
+        )
+    )
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def export_messages(
+    client,
+    parent: str,
+    path: str,
+    *,
+    file_format: str = "parquet",
+    filter: Optional[str] = None,
+    max_workers: int = 8,
+    batch_size: int = 1000,
+) -> ExportResult:
+    r"""Export the messages of all conversations under a project.
+
+    Conversations are listed lazily with ``list_conversations`` and their
+    messages are fetched with ``list_messages`` on up to ``max_workers``
+    threads. Rows are written to ``path`` as record batches of at most
+    ``batch_size`` messages while the export is still running; at no point
+    is the full listing held in memory.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import export
+
+        client = dialogflow.ConversationsClient()
+        export.export_messages(
+            client, "projects/my-project/locations/global", "messages.parquet",
+            filter='lifecycle_state = "COMPLETED"',
+        )
+
+    Args:
+        client (ConversationsClient): The client used to list conversations
+            and messages. Clients of any API version are accepted.
+        parent (str): The project (and optionally location) to export, in
+            the format accepted by ``list_conversations``.
+        path (str): The output file.
+        file_format (str): ``"parquet"`` for a Parquet file or ``"arrow"``
+            for an Arrow IPC file of record batches.
+        filter (Optional[str]): An optional ``list_conversations`` filter.
+        max_workers (int): The maximum number of conversations whose
+            messages are listed concurrently.
+        batch_size (int): The maximum number of rows per record batch.
+
+    Returns:
+        ExportResult: The number of conversations and messages exported.
+
+    Raises:
+        google.api_core.exceptions.GoogleAPICallError: If listing
+            conversations or messages failed. The partially written file is
+            closed but left in place.
+    """
+    pa = _utils.import_optional("pyarrow", "export")
+    message_class = _utils.types_module(client).Message
+    columns = message_columns(message_class)
+    schema = message_schema(message_class)
+
+    # Workers hand finished batches to the writer through a bounded queue,
+    # which throttles them whenever writing falls behind.
+    batches = queue.Queue(maxsize=max_workers * 2)
+    stopped = threading.Event()
+    errors = []
+    counts = {"conversations": 0, "messages": 0}
+    lock = threading.Lock()
+
+    def put(item):
+        while True:
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if stopped.is_set():
+                    raise _Cancelled()
+
+    def export_conversation(name):
+        batch = _Batch(columns)
+        count = 0
+        for message in client.list_messages(request={"parent": name}):
+            if stopped.is_set():
+                raise _Cancelled()
+            batch.append(name, message)
+            count += 1
+            if batch.size >= batch_size:
+                put(batch)
+                batch = _Batch(columns)
+        if batch.size:
+            put(batch)
+        with lock:
+            counts["conversations"] += 1
+            counts["messages"] += count
+
+    def feed():
+        in_flight = threading.BoundedSemaphore(max_workers * 2)
+
+        def done(future):
+            in_flight.release()
+            exc = future.exception()
+            if exc is not None and not isinstance(exc, _Cancelled):
+                errors.append(exc)
+                stopped.set()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            # Stop the workers before waiting for them on leaving the block.
+            try:
+                request = {"parent": parent}
+                if filter:
+                    request["filter"] = filter
+                for conversation in client.list_conversations(request=request):
+                    in_flight.acquire()
+                    if stopped.is_set():
+                        in_flight.release()
+                        break
+                    future = executor.submit(export_conversation, conversation.name)
+                    future.add_done_callback(done)
+            except Exception as exc:
+                errors.append(exc)
+                stopped.set()
+        try:
+            put(errors[0] if errors else _DONE)
+        except _Cancelled:
+            pass
+
+    feeder = threading.Thread(target=feed, name="dialogflow-export-feeder")
+    writer = _open_writer(pa, path, schema, file_format)
+    feeder.start()
+    try:
+        while True:
+            try:
+                item = batches.get(timeout=0.1)
+            except queue.Empty:
+                if feeder.is_alive():
+                    continue
+                # The feeder gave up handing over its outcome because the
+                # queue was full once stopped; take it from ``errors``.
+                item = errors[0] if errors else _DONE
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            writer.write_table(pa.Table.from_pydict(item.data, schema=schema))
+    finally:
+        stopped.set()
+        writer.close()
+        feeder.join()
+
+    return ExportResult(counts["conversations"], counts["messages"])
+
+
+__all__ = (
+    "ExportResult",
+    "export_messages",
+    "message_columns",
+    "message_schema",
+)
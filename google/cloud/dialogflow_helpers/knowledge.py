@@ -0,0 +1,685 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Bulk loading and synchronization of local files with a knowledge base."""
+
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import time
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from google.cloud.dialogflow_helpers import _utils
+
+
+# File extension -> (MIME type, knowledge types).
+DEFAULT_FILE_TYPES = {
+    ".csv": ("text/csv", ("FAQ",)),
+    ".htm": ("text/html", ("EXTRACTIVE_QA",)),
+    ".html": ("text/html", ("EXTRACTIVE_QA",)),
+    ".pdf": ("application/pdf", ("EXTRACTIVE_QA",)),
+    ".txt": ("text/plain", ("EXTRACTIVE_QA",)),
+}
+
+_CHUNK_SIZE = 1 << 20
+
+
+class SourceDocument(NamedTuple):
+    """A local file to be loaded as a knowledge document.
+
+    Attributes:
+        display_name: The document display name; the path of the file
+            relative to the scanned directory, with ``/`` separators. It
+            identifies the document across runs.
+        path: The path of the file.
+        mime_type: The MIME type of the document.
+        knowledge_types: The knowledge type names of the document.
+        sha256: The hex SHA-256 digest of the file content.
+    """
+
+    display_name: str
+    path: str
+    mime_type: str
+    knowledge_types: Tuple[str, ...]
+    sha256: str
+
+
+class LoadResult(NamedTuple):
+    """The outcome of :meth:`BulkDocumentLoader.load` or ``sync``.
+
+    Each attribute lists the display names of the affected documents.
+    """
+
+    created: List[str]
+    reloaded: List[str]
+    replaced: List[str]
+    skipped: List[str]
+    failed: Dict[str, Exception]
+    renamed: List[str]
+    deleted: List[str]
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 digest of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_directory(
+    root: str,
+    *,
+    file_types: Mapping[str, Tuple[str, Sequence[str]]] = DEFAULT_FILE_TYPES,
+) -> List[SourceDocument]:
+    """Find the files of a directory tree that can be loaded as documents.
+
+    Args:
+        root (str): The directory to scan recursively.
+        file_types (Mapping[str, Tuple[str, Sequence[str]]]): Maps lower
+            case file extensions to a MIME type and knowledge type names.
+            Files with other extensions are ignored.
+
+    Returns:
+        List[SourceDocument]: The documents, sorted by display name.
+    """
+    root_path = pathlib.Path(root)
+    sources = []
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            file_type = file_types.get(os.path.splitext(filename)[1].lower())
+            if file_type is None:
+                continue
+            path = pathlib.Path(directory, filename)
+            mime_type, knowledge_types = file_type
+            sources.append(
+                SourceDocument(
+                    display_name=path.relative_to(root_path).as_posix(),
+                    path=str(path),
+                    mime_type=mime_type,
+                    knowledge_types=tuple(knowledge_types),
+                    sha256=file_sha256(str(path)),
+                )
+            )
+    return sorted(sources)
+
+
+class Manifest(object):
+    """Content hashes of the documents loaded by previous runs.
+
+    Documents do not carry a content hash, so the loader records the hash
+    of every document it creates in a small JSON file and compares it on
+    the next run.
+
+    Args:
+        path (Optional[str]): The manifest file. It is created on
+            :meth:`save` if it does not exist. If unset, the manifest only
+            lives in memory.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        # display name -> {"name": document name, "sha256": digest}
+        self.documents = {}
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                raise ValueError(
+                    "Unsupported manifest version in {}: {!r}".format(
+                        path, data.get("version")
+                    )
+                )
+            self.documents = data["documents"]
+
+    def sha256(self, display_name: str, document_name: str) -> Optional[str]:
+        """Return the recorded hash of a document, if it is still current."""
+        entry = self.documents.get(display_name)
+        if entry is None or entry["name"] != document_name:
+            return None
+        return entry["sha256"]
+
+    def record(self, display_name: str, document_name: str, sha256: str) -> None:
+        self.documents[display_name] = {"name": document_name, "sha256": sha256}
+
+    def forget(self, display_name: str, document_name: Optional[str] = None) -> None:
+        """Drop the record of a display name, if it is of ``document_name``."""
+        entry = self.documents.get(display_name)
+        if entry is not None and document_name in (None, entry["name"]):
+            del self.documents[display_name]
+
+    def save(self) -> None:
+        """Atomically write the manifest to :attr:`path`."""
+        if self.path is None:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"version": self.VERSION, "documents": self.documents},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
+
+
+class _Task(object):
+    """One long-running step of loading a document.
+
+    ``start`` sends the request and returns the operation; ``on_done`` is
+    called with the operation result and may return a follow-up task.
+    """
+
+    __slots__ = ("display_name", "kind", "start", "on_done")
+
+    def __init__(self, display_name, kind, start, on_done=None):
+        self.display_name = display_name
+        self.kind = kind
+        self.start = start
+        self.on_done = on_done
+
+
+def _run_operations(tasks, *, max_in_flight: int, poll_interval: float):
+    """Run long-running tasks with a cap on the operations in flight.
+
+    The initial requests are sent from a thread pool, but all started
+    operations are polled from this thread in a single loop instead of
+    blocking one thread per operation in ``Operation.result()``.
+
+    Args:
+        tasks (Iterable[_Task]): The tasks to run.
+        max_in_flight (int): The maximum number of started but unfinished
+            operations.
+        poll_interval (float): Seconds to wait between polling rounds
+            that made no progress.
+
+    Yields:
+        Tuple[_Task, Optional[Exception]]: Each finished task, with the
+        error it failed with, if any.
+    """
+    pending = collections.deque(tasks)
+    starting = {}
+    running = {}
+    with concurrent.futures.ThreadPoolExecutor(max_in_flight) as executor:
+        while pending or starting or running:
+            while pending and len(starting) + len(running) < max_in_flight:
+                task = pending.popleft()
+                starting[executor.submit(task.start)] = task
+
+            progressed = False
+            for future in [f for f in starting if f.done()]:
+                task = starting.pop(future)
+                progressed = True
+                try:
+                    running[task] = future.result()
+                except Exception as exc:
+                    # Reported like API errors, e.g. an unreadable file.
+                    yield task, exc
+
+            for task, operation in list(running.items()):
+                try:
+                    if not operation.done():
+                        continue
+                    del running[task]
+                    progressed = True
+                    error = operation.exception()
+                    if error is None and task.on_done is not None:
+                        follow_up = task.on_done(operation.result())
+                        if follow_up is not None:
+                            pending.appendleft(follow_up)
+                            continue
+                except Exception as exc:
+                    running.pop(task, None)
+                    progressed = True
+                    error = exc
+                yield task, error
+
+            if not progressed:
+                time.sleep(poll_interval)
+
+
+class SyncAction(NamedTuple):
+    """One step of a :class:`SyncPlan`.
+
+    Attributes:
+        kind: One of ``"create"``, ``"reload"``, ``"replace"``,
+            ``"rename"``, ``"delete"`` or ``"skip"``.
+        display_name: The display name the document has after the step.
+        source: The local document, unless the step is a deletion.
+        document: The remote document the step applies to, unless the
+            step is a creation.
+    """
+
+    kind: str
+    display_name: str
+    source: Optional[SourceDocument]
+    document: Optional[object]
+
+
+_REPORT_PREFIXES = {
+    "create": "+",
+    "reload": "~",
+    "replace": "~",
+    "rename": ">",
+    "delete": "-",
+    "skip": "=",
+}
+
+
+class SyncPlan(object):
+    """The minimal set of operations bringing a knowledge base up to date.
+
+    Plans are computed by :meth:`BulkDocumentLoader.plan` and do nothing
+    until :meth:`apply` is called, so they double as a dry run.
+    """
+
+    def __init__(self, loader, actions: Sequence[SyncAction]) -> None:
+        self._loader = loader
+        self.actions = list(actions)
+
+    def summary(self) -> Dict[str, int]:
+        """Return the number of actions of each kind."""
+        counts = collections.Counter(action.kind for action in self.actions)
+        return {kind: counts[kind] for kind in _REPORT_PREFIXES}
+
+    def report(self, *, include_skipped: bool = False) -> str:
+        """Return a human readable diff of the plan.
+
+        Args:
+            include_skipped (bool): Whether to list unchanged documents.
+
+        Returns:
+            str: One line per action, such as ``+ create faq.csv``,
+            followed by a summary line.
+        """
+        lines = []
+        for action in self.actions:
+            if action.kind == "skip" and not include_skipped:
+                continue
+            line = "{} {} {}".format(
+                _REPORT_PREFIXES[action.kind], action.kind, action.display_name
+            )
+            if action.kind == "rename":
+                line += " (was {})".format(action.document.display_name)
+            lines.append(line)
+        lines.append(
+            ", ".join(
+                "{} {}".format(count, kind)
+                for kind, count in self.summary().items()
+                if count
+            )
+            or "nothing to do"
+        )
+        return "\n".join(lines)
+
+    def result(self) -> "LoadResult":
+        """Return the :class:`LoadResult` applying this plan would produce."""
+        result = LoadResult([], [], [], [], {}, [], [])
+        for action in self.actions:
+            getattr(result, _RESULT_FIELDS[action.kind]).append(action.display_name)
+        return result
+
+    def apply(self) -> "LoadResult":
+        """Run the plan.
+
+        All operations run concurrently, within the loader's
+        ``max_in_flight`` limit, and the manifest is saved afterwards.
+
+        Returns:
+            LoadResult: What happened to each document. Failures of
+            individual documents are reported rather than raised.
+        """
+        return self._loader._apply(self.actions)
+
+
+_RESULT_FIELDS = {
+    "create": "created",
+    "reload": "reloaded",
+    "replace": "replaced",
+    "skip": "skipped",
+    "rename": "renamed",
+    "delete": "deleted",
+}
+
+
+class BulkDocumentLoader(object):
+    """Load a directory of FAQs, HTML pages and PDFs into a knowledge base.
+
+    New files are created as documents with ``raw_content``; up to
+    ``max_in_flight`` operations run at the same time and are tracked by
+    one poller. Files whose content hash matches the remote document are
+    skipped. Changed files are reloaded with ``reload_document`` when the
+    loader was given a ``content_uri_prefix`` (the files are mirrored to
+    Cloud Storage by the caller); otherwise the document is replaced by
+    creating the new version before deleting the old one, as
+    ``raw_content`` cannot be reloaded in place.
+
+    :meth:`load` only adds and refreshes documents. :meth:`sync` also
+    deletes remote documents without a local source and turns a deletion
+    plus creation of identical content into a rename.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import knowledge
+
+        loader = knowledge.BulkDocumentLoader(
+            dialogflow.DocumentsClient(), knowledge_base_name,
+            manifest_path="faq-manifest.json",
+        )
+        sources = knowledge.scan_directory("./faq")
+        print(loader.plan(sources, delete_missing=True).report())
+        result = loader.sync(sources)
+
+    Args:
+        client (DocumentsClient): The client to use. Clients of any API
+            version are accepted.
+        knowledge_base (str): The knowledge base to load documents into.
+        manifest_path (Optional[str]): A JSON file recording the content
+            hash of each loaded document between runs.
+        content_uri_prefix (Optional[str]): If set, documents are created
+            from ``content_uri_prefix + display_name`` instead of
+            ``raw_content``, and changed documents are reloaded in place.
+        max_in_flight (int): The maximum number of concurrent operations.
+        poll_interval (float): Seconds between polls of the operations.
+    """
+
+    def __init__(
+        self,
+        client,
+        knowledge_base: str,
+        *,
+        manifest_path: Optional[str] = None,
+        content_uri_prefix: Optional[str] = None,
+        max_in_flight: int = 10,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self._client = client
+        self._types = _utils.types_module(client)
+        self._knowledge_base = knowledge_base
+        self._content_uri_prefix = content_uri_prefix
+        self._max_in_flight = max_in_flight
+        self._poll_interval = poll_interval
+        self.manifest = Manifest(manifest_path)
+
+    def list_documents(self) -> Dict[str, List[object]]:
+        """Return the remote documents of the knowledge base by display name.
+
+        Display names are not unique, so each maps to a list of documents;
+        duplicates are left behind when deleting a replaced document fails.
+        """
+        documents = collections.defaultdict(list)
+        for document in self._client.list_documents(
+            request={"parent": self._knowledge_base}
+        ):
+            documents[document.display_name].append(document)
+        return dict(documents)
+
+    def remote_sha256(self, document) -> Optional[str]:
+        """Return the content hash of a remote document, if it is known."""
+        if document.raw_content:
+            return hashlib.sha256(document.raw_content).hexdigest()
+        return self.manifest.sha256(document.display_name, document.name)
+
+    def plan(
+        self, sources: Sequence[SourceDocument], *, delete_missing: bool = False
+    ) -> SyncPlan:
+        """Compare local sources with the remote documents.
+
+        Args:
+            sources (Sequence[SourceDocument]): The documents that should
+                exist, usually from :func:`scan_directory`.
+            delete_missing (bool): Whether remote documents without a
+                local source should be deleted (or renamed, if a new
+                source has the same content).
+
+        Returns:
+            SyncPlan: The operations to run; nothing is changed yet.
+        """
+        wanted = {source.display_name: source.sha256 for source in sources}
+        remote = {}
+        duplicates = []
+        for display_name, documents in self.list_documents().items():
+            # Keep the copy with the wanted content, or whose content is
+            # known, and delete the others.
+            documents.sort(
+                key=lambda d: (
+                    self.remote_sha256(d) != wanted.get(display_name),
+                    self.remote_sha256(d) is None,
+                )
+            )
+            remote[display_name] = documents[0]
+            if display_name in wanted or delete_missing:
+                duplicates.extend(
+                    SyncAction("delete", display_name, None, document)
+                    for document in documents[1:]
+                )
+
+        actions = []
+        new_sources = []
+        for source in sources:
+            document = remote.pop(source.display_name, None)
+            if document is None:
+                new_sources.append(source)
+            elif self.remote_sha256(document) == source.sha256:
+                actions.append(
+                    SyncAction("skip", source.display_name, source, document)
+                )
+            elif self._content_uri_prefix is not None:
+                actions.append(
+                    SyncAction("reload", source.display_name, source, document)
+                )
+            else:
+                actions.append(
+                    SyncAction("replace", source.display_name, source, document)
+                )
+
+        # Whatever is left in ``remote`` has no local source.
+        orphans = {}
+        if delete_missing:
+            for document in remote.values():
+                sha256 = self.remote_sha256(document)
+                if sha256 is not None:
+                    orphans.setdefault(sha256, []).append(document)
+
+        for source in new_sources:
+            candidates = orphans.get(source.sha256)
+            if candidates:
+                document = candidates.pop()
+                del remote[document.display_name]
+                actions.append(
+                    SyncAction("rename", source.display_name, source, document)
+                )
+            else:
+                actions.append(SyncAction("create", source.display_name, source, None))
+
+        if delete_missing:
+            for display_name, document in sorted(remote.items()):
+                actions.append(SyncAction("delete", display_name, None, document))
+        actions.extend(duplicates)
+        return SyncPlan(self, actions)
+
+    def load(self, sources: Sequence[SourceDocument]) -> "LoadResult":
+        """Create, reload or skip documents so they match ``sources``.
+
+        Remote documents without a matching source are left untouched.
+
+        Args:
+            sources (Sequence[SourceDocument]): The documents to load,
+                usually from :func:`scan_directory`.
+
+        Returns:
+            LoadResult: What happened to each document. Failures of
+            individual documents are reported rather than raised.
+        """
+        return self.plan(sources).apply()
+
+    def sync(
+        self, sources: Sequence[SourceDocument], *, dry_run: bool = False
+    ) -> "LoadResult":
+        """Make the knowledge base contain exactly ``sources``.
+
+        Unlike :meth:`load`, remote documents without a local source are
+        deleted, or renamed when a new source has identical content.
+
+        Args:
+            sources (Sequence[SourceDocument]): The documents to keep.
+            dry_run (bool): If true, nothing is changed and the returned
+                result describes what would have been done. Use
+                :meth:`plan` to get a printable report instead.
+
+        Returns:
+            LoadResult: What happened (or would happen) to each document.
+        """
+        plan = self.plan(sources, delete_missing=True)
+        if dry_run:
+            return plan.result()
+        return plan.apply()
+
+    def _document(self, source):
+        document = self._types.Document(
+            display_name=source.display_name,
+            mime_type=source.mime_type,
+            knowledge_types=list(source.knowledge_types),
+        )
+        if self._content_uri_prefix is not None:
+            document.content_uri = self._content_uri_prefix + source.display_name
+        else:
+            # Read lazily so only the documents in flight are held in memory.
+            with open(source.path, "rb") as f:
+                document.raw_content = f.read()
+        return document
+
+    def _create_task(self, source, kind="create", on_created=None):
+        def start():
+            return self._client.create_document(
+                request={
+                    "parent": self._knowledge_base,
+                    "document": self._document(source),
+                }
+            )
+
+        def on_done(document):
+            self.manifest.record(source.display_name, document.name, source.sha256)
+            if on_created is not None:
+                return on_created(document)
+
+        return _Task(source.display_name, kind, start, on_done)
+
+    def _reload_task(self, source, document):
+        def start():
+            request_type = self._types.ReloadDocumentRequest
+            request = request_type(name=document.name)
+            uri = self._content_uri_prefix + source.display_name
+            if "content_uri" in request_type.pb().DESCRIPTOR.fields_by_name:
+                request.content_uri = uri
+            else:
+                # v2beta1 only reloads from Cloud Storage.
+                request.gcs_source.uri = uri
+            return self._client.reload_document(request=request)
+
+        def on_done(reloaded):
+            self.manifest.record(source.display_name, document.name, source.sha256)
+
+        return _Task(source.display_name, "reload", start, on_done)
+
+    def _rename_task(self, source, document):
+        def start():
+            return self._client.update_document(
+                request={
+                    "document": {
+                        "name": document.name,
+                        "display_name": source.display_name,
+                    },
+                    "update_mask": {"paths": ["display_name"]},
+                }
+            )
+
+        def on_done(updated):
+            self.manifest.forget(document.display_name)
+            self.manifest.record(source.display_name, document.name, source.sha256)
+
+        return _Task(source.display_name, "rename", start, on_done)
+
+    def _delete_task(self, display_name, document_name, kind="delete"):
+        def start():
+            return self._client.delete_document(request={"name": document_name})
+
+        def on_done(empty):
+            if kind == "delete":
+                # A duplicate leaves the record of the copy kept alone.
+                self.manifest.forget(display_name, document_name)
+
+        return _Task(display_name, kind, start, on_done)
+
+    def _replace_task(self, source, document):
+        # Create the new version first so the content is never missing.
+        def on_created(created):
+            return self._delete_task(source.display_name, document.name, "replace")
+
+        return self._create_task(source, "replace", on_created)
+
+    def _task(self, action):
+        if action.kind == "create":
+            return self._create_task(action.source)
+        if action.kind == "reload":
+            return self._reload_task(action.source, action.document)
+        if action.kind == "replace":
+            return self._replace_task(action.source, action.document)
+        if action.kind == "rename":
+            return self._rename_task(action.source, action.document)
+        return self._delete_task(action.display_name, action.document.name)
+
+    def _apply(self, actions):
+        result = LoadResult([], [], [], [], {}, [], [])
+        tasks = []
+        for action in actions:
+            if action.kind == "skip":
+                result.skipped.append(action.display_name)
+            else:
+                tasks.append(self._task(action))
+        try:
+            for task, error in _run_operations(
+                tasks,
+                max_in_flight=self._max_in_flight,
+                poll_interval=self._poll_interval,
+            ):
+                if error is not None:
+                    result.failed[task.display_name] = error
+                else:
+                    getattr(result, _RESULT_FIELDS[task.kind]).append(task.display_name)
+        finally:
+            self.manifest.save()
+        return result
+
+
+__all__ = (
+    "BulkDocumentLoader",
+    "DEFAULT_FILE_TYPES",
+    "LoadResult",
+    "Manifest",
+    "SourceDocument",
+    "SyncAction",
+    "SyncPlan",
+    "file_sha256",
+    "scan_directory",
+)
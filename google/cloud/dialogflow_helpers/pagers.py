@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""List the same resource under many parents concurrently.
+
+Jobs often list one resource under a large number of parents: the
+contexts of every session, the participants of every conversation. The
+generated async pagers fetch their pages one at a time, so awaiting them
+one parent after the other leaves the channel idle most of the time.
+:func:`gather_items` drives the pagers of many parents at once and yields
+their items as they arrive.
+"""
+
+import asyncio
+import functools
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from google.api_core import gapic_v1  # type: ignore
+
+
+# Marks the end of the items in the queue.
+_DONE = object()
+
+
+class _Failure(object):
+    def __init__(self, error):
+        self.error = error
+
+
+async def gather_items(
+    method: Callable[..., Awaitable[Any]],
+    parents: Iterable[str],
+    *,
+    concurrency: int = 16,
+    request: Optional[dict] = None,
+    raw: bool = False,
+    return_exceptions: bool = False,
+    max_buffered: int = 1000,
+    retry=gapic_v1.method.DEFAULT,
+    timeout: Optional[float] = None,
+    metadata: Sequence[Tuple[str, str]] = (),
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield the items listed under every parent, as they arrive.
+
+    The items of one parent are yielded in order, interleaved with those
+    of the other parents.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import pagers
+
+        client = dialogflow.ContextsAsyncClient()
+        async for session, context in pagers.gather_items(
+            client.list_contexts, sessions, concurrency=32
+        ):
+            ...
+
+    Args:
+        method (Callable): A ``list_*`` method of an async client of any
+            API version, such as ``ContextsAsyncClient.list_contexts``.
+        parents (Iterable[str]): The parents to list the items of. They
+            are consumed as slots free up, so a generator is not read
+            ahead.
+        concurrency (int): The maximum number of parents whose pages are
+            being fetched at the same time.
+        request (Optional[dict]): Fields of the request sent for every
+            parent, other than ``parent``; for example ``page_size``.
+        raw (bool): Yield the protobuf messages instead of wrapping each
+            one in its proto-plus class.
+        return_exceptions (bool): Yield ``(parent, exception)`` when
+            listing a parent fails, after any items of the parent already
+            yielded, and carry on with the other parents. By default, the
+            first failure is raised and the other listings are cancelled.
+        max_buffered (int): The maximum number of items fetched but not
+            yet consumed; the pagers wait beyond it.
+        retry: Designation of what errors, if any, should be retried,
+            for every page request.
+        timeout (Optional[float]): The timeout for each page request.
+        metadata (Sequence[Tuple[str, str]]): Strings which should be
+            sent along with each request as metadata.
+
+    Returns:
+        AsyncIterator[Tuple[str, Any]]: The ``(parent, item)`` pairs.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+    fields = dict(request or {})
+    queue = asyncio.Queue(max_buffered)
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def drain(parent):
+        try:
+            pager = await method(
+                request=dict(fields, parent=parent),
+                retry=retry,
+                timeout=timeout,
+                metadata=metadata,
+            )
+            # The pager fetches later pages with the method's defaults;
+            # have every page request use the retry and timeout given here.
+            pager._method = functools.partial(
+                pager._method, retry=retry, timeout=timeout
+            )
+            async for item in pager.stream(raw=raw):
+                await queue.put((parent, item))
+        except asyncio.CancelledError:
+            # An Exception before Python 3.8; never a failure of the parent.
+            raise
+        except Exception as exc:
+            await queue.put((parent, _Failure(exc)))
+        finally:
+            slots.release()
+
+    async def feed():
+        try:
+            for parent in parents:
+                await slots.acquire()
+                task = asyncio.ensure_future(drain(parent))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # Every slot is free again once the last pager is done.
+            for _ in range(concurrency):
+                await slots.acquire()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await queue.put(_DONE)
+            raise
+        await queue.put(_DONE)
+
+    feeder = asyncio.ensure_future(feed())
+    try:
+        while True:
+            entry = await queue.get()
+            if entry is _DONE:
+                break
+            parent, item = entry
+            if isinstance(item, _Failure):
+                if not return_exceptions:
+                    raise item.error
+                item = item.error
+            yield parent, item
+        # Raises the error of ``parents``, if any.
+        await feeder
+    finally:
+        feeder.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+
+async def collect_items(
+    method: Callable[..., Awaitable[Any]], parents: Iterable[str], **kwargs
+) -> Dict[str, List[Any]]:
+    """Return the items listed under every parent.
+
+    Args:
+        method (Callable): A ``list_*`` method of an async client.
+        parents (Iterable[str]): The parents to list the items of.
+        kwargs: Keyword arguments accepted by :func:`gather_items`, other
+            than ``return_exceptions``.
+
+    Returns:
+        Dict[str, List[Any]]: The items of each parent, in order, with the
+        parents in the order given, including those without items.
+    """
+    parents = list(parents)
+    items = {parent: [] for parent in parents}
+    async for parent, item in gather_items(method, parents, **kwargs):
+        items[parent].append(item)
+    return items
+
+
+__all__ = (
+    "collect_items",
+    "gather_items",
+)
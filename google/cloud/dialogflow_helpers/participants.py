@@ -0,0 +1,669 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Agent Assist helpers for the Participants service."""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import threading
+import time
+import uuid
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from google.api_core import exceptions  # type: ignore
+from google.api_core import retry as retries  # type: ignore
+from google.api_core import retry_async  # type: ignore
+
+from google.cloud.dialogflow_helpers import _utils
+
+
+# Suggestion feature type name -> (client method, result attribute).
+_FEATURE_METHODS = {
+    "ARTICLE_SUGGESTION": ("suggest_articles", "articles"),
+    "FAQ": ("suggest_faq_answers", "faq_answers"),
+    "SMART_REPLY": ("suggest_smart_replies", "smart_replies"),
+}
+
+# ``analyze_content`` is only idempotent when ``request_id`` is set. Every
+# request sent by the helpers carries one, so timeouts can be retried too.
+DEFAULT_ANALYZE_CONTENT_RETRY = retries.Retry(
+    initial=0.1,
+    maximum=60.0,
+    multiplier=1.3,
+    predicate=retries.if_exception_type(
+        exceptions.ServiceUnavailable, exceptions.DeadlineExceeded,
+    ),
+    deadline=220.0,
+)
+DEFAULT_ANALYZE_CONTENT_ASYNC_RETRY = retry_async.AsyncRetry(
+    initial=0.1,
+    maximum=60.0,
+    multiplier=1.3,
+    predicate=retries.if_exception_type(
+        exceptions.ServiceUnavailable, exceptions.DeadlineExceeded,
+    ),
+    deadline=220.0,
+)
+
+
+class _AnalyzeContentResult(NamedTuple):
+    response: Any
+    articles: Any = None
+    faq_answers: Any = None
+    smart_replies: Any = None
+    errors: Optional[Dict[str, Exception]] = None
+
+
+class AnalyzeContentResult(_AnalyzeContentResult):
+    """The merged result of ``analyze_content`` and its suggestion calls.
+
+    Attributes:
+        response: The ``AnalyzeContentResponse``.
+        articles: The ``SuggestArticlesResponse``, if requested.
+        faq_answers: The ``SuggestFaqAnswersResponse``, if requested.
+        smart_replies: The ``SuggestSmartRepliesResponse``, if requested.
+        errors: Suggestion calls that failed, keyed by feature type name.
+            A failed suggestion does not discard the other results.
+    """
+
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        response,
+        articles=None,
+        faq_answers=None,
+        smart_replies=None,
+        errors: Optional[Dict[str, Exception]] = None,
+    ):
+        # A fresh dict for each result rather than one shared default.
+        return super().__new__(
+            cls,
+            response,
+            articles,
+            faq_answers,
+            smart_replies,
+            {} if errors is None else errors,
+        )
+
+
+def _feature_name(feature) -> str:
+    name = getattr(feature, "name", feature)
+    if name not in _FEATURE_METHODS:
+        raise ValueError("Unsupported suggestion feature: {!r}".format(feature))
+    return name
+
+
+def enabled_features(conversation_profile, *, role: str = "HUMAN_AGENT") -> list:
+    """Return the suggestion features enabled in a conversation profile.
+
+    Args:
+        conversation_profile (ConversationProfile): The profile used by the
+            conversation.
+        role (str): ``"HUMAN_AGENT"`` for the features suggested to human
+            agents, ``"END_USER"`` for those suggested to end users.
+
+    Returns:
+        list: The enabled feature type names, e.g. ``["ARTICLE_SUGGESTION"]``,
+        restricted to those with a matching ``suggest_*`` method.
+    """
+    config = conversation_profile.human_agent_assistant_config
+    if role == "HUMAN_AGENT":
+        suggestion_config = config.human_agent_suggestion_config
+    elif role == "END_USER":
+        suggestion_config = config.end_user_suggestion_config
+    else:
+        raise ValueError("Unsupported role: {!r}".format(role))
+
+    features = []
+    for feature_config in suggestion_config.feature_configs:
+        name = feature_config.suggestion_feature.type_.name
+        if name in _FEATURE_METHODS and name not in features:
+            features.append(name)
+    return features
+
+
+class _Plan(object):
+    """Validated, version specific state shared by the pipelines."""
+
+    def __init__(self, client, features, context_size):
+        self.request_type = _utils.types_module(client).AnalyzeContentRequest
+        self.features = [_feature_name(feature) for feature in features]
+        for name in self.features:
+            method = _FEATURE_METHODS[name][0]
+            if not hasattr(client, method):
+                raise ValueError(
+                    "{} does not support the {} feature.".format(
+                        type(client).__name__, name
+                    )
+                )
+        self.context_size = context_size
+
+    def prepare(self, request):
+        # Copy the request so the generated request_id is not leaked into
+        # the caller's object; retries of this turn reuse the same id.
+        request = self.request_type(request)
+        if not request.request_id:
+            request.request_id = str(uuid.uuid4())
+        return request
+
+    def suggestion_requests(self, request, response, suggestion_participant):
+        parent = suggestion_participant or request.participant
+        for name in self.features:
+            suggestion_request = {
+                "parent": parent,
+                "latest_message": response.message.name,
+            }
+            if self.context_size is not None:
+                suggestion_request["context_size"] = self.context_size
+            method, attribute = _FEATURE_METHODS[name]
+            yield name, method, attribute, suggestion_request
+
+
+class AnalyzeContentPipeline(object):
+    """Run ``analyze_content`` followed by concurrent suggestion calls.
+
+    Once ``analyze_content`` returns, the ``suggest_*`` calls for every
+    configured feature are issued at the same time, so a turn takes
+    roughly as long as ``analyze_content`` plus the slowest suggestion
+    rather than the sum of all calls. Turns can also be submitted without
+    waiting for the previous one to finish with :meth:`submit`.
+
+    Each request is given a ``request_id`` (unless it already has one),
+    which makes ``analyze_content`` idempotent and therefore safe to
+    retry on timeouts as well as on unavailability.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import participants
+
+        client = dialogflow.ParticipantsClient()
+        with participants.AnalyzeContentPipeline(
+            client, ["ARTICLE_SUGGESTION", "FAQ"]
+        ) as pipeline:
+            result = pipeline.analyze_content(
+                {"participant": end_user, "text_input": text_input},
+                suggestion_participant=human_agent,
+            )
+            print(result.response.reply_text, result.faq_answers)
+
+    Args:
+        client (ParticipantsClient): The client to call. Clients of any API
+            version are accepted.
+        features (Sequence[Union[str, SuggestionFeature.Type]]): The
+            suggestion features to request after each turn; see
+            :func:`enabled_features`.
+        context_size (Optional[int]): The ``context_size`` sent with every
+            suggestion request. The server default is used if unset.
+        max_turns (int): The maximum number of turns processed at the same
+            time when using :meth:`submit`.
+        retry (google.api_core.retry.Retry): The retry policy for
+            ``analyze_content``.
+    """
+
+    def __init__(
+        self,
+        client,
+        features: Sequence[Any],
+        *,
+        context_size: Optional[int] = None,
+        max_turns: int = 8,
+        retry: retries.Retry = DEFAULT_ANALYZE_CONTENT_RETRY,
+    ) -> None:
+        self._client = client
+        self._plan = _Plan(client, features, context_size)
+        self._retry = retry
+        # Turns and suggestion calls use separate pools so that a turn
+        # waiting on its suggestions never starves them of a thread.
+        self._turns = concurrent.futures.ThreadPoolExecutor(max_turns)
+        self._suggestions = concurrent.futures.ThreadPoolExecutor(
+            max_turns * max(len(self._plan.features), 1)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """Wait for submitted turns and release the worker threads."""
+        self._turns.shutdown(wait=True)
+        self._suggestions.shutdown(wait=True)
+
+    def analyze_content(
+        self,
+        request,
+        *,
+        suggestion_participant: Optional[str] = None,
+        timeout: Optional[float] = None,
+        metadata: Sequence[Tuple[str, str]] = (),
+    ) -> AnalyzeContentResult:
+        """Analyze one turn and fetch its suggestions.
+
+        Args:
+            request (Union[dict, AnalyzeContentRequest]): The
+                ``analyze_content`` request.
+            suggestion_participant (Optional[str]): The participant to
+                fetch suggestions for, usually the human agent. Defaults to
+                the participant that sent the content.
+            timeout (Optional[float]): The timeout for each call.
+            metadata (Sequence[Tuple[str, str]]): Strings which should be
+                sent along with each request as metadata.
+
+        Returns:
+            AnalyzeContentResult: The merged result.
+
+        Raises:
+            google.api_core.exceptions.GoogleAPICallError: If
+                ``analyze_content`` failed. Suggestion failures are
+                reported in :attr:`AnalyzeContentResult.errors` instead.
+        """
+        request = self._plan.prepare(request)
+        response = self._client.analyze_content(
+            request=request, retry=self._retry, timeout=timeout, metadata=metadata,
+        )
+
+        futures = {}
+        for (
+            name,
+            method,
+            attribute,
+            suggestion_request,
+        ) in self._plan.suggestion_requests(request, response, suggestion_participant):
+            futures[name] = (
+                attribute,
+                self._suggestions.submit(
+                    getattr(self._client, method),
+                    request=suggestion_request,
+                    timeout=timeout,
+                    metadata=metadata,
+                ),
+            )
+
+        results = {}
+        errors = {}
+        for name, (attribute, future) in futures.items():
+            try:
+                results[attribute] = future.result()
+            except exceptions.GoogleAPICallError as exc:
+                errors[name] = exc
+        return AnalyzeContentResult(response, errors=errors, **results)
+
+    def submit(self, request, **kwargs) -> concurrent.futures.Future:
+        """Start analyzing a turn without waiting for it to finish.
+
+        Submitted turns run concurrently and are not ordered with respect
+        to each other; wait for a turn before submitting the next one of
+        the same conversation if message order matters.
+
+        Args:
+            request (Union[dict, AnalyzeContentRequest]): The
+                ``analyze_content`` request.
+            kwargs: Keyword arguments accepted by :meth:`analyze_content`.
+
+        Returns:
+            concurrent.futures.Future: Resolves to an
+            :class:`AnalyzeContentResult`.
+        """
+        return self._turns.submit(self.analyze_content, request, **kwargs)
+
+
+async def analyze_content_async(
+    client,
+    request,
+    features: Sequence[Any],
+    *,
+    suggestion_participant: Optional[str] = None,
+    context_size: Optional[int] = None,
+    retry: retry_async.AsyncRetry = DEFAULT_ANALYZE_CONTENT_ASYNC_RETRY,
+    timeout: Optional[float] = None,
+    metadata: Sequence[Tuple[str, str]] = (),
+) -> AnalyzeContentResult:
+    """Analyze one turn and fetch its suggestions with an async client.
+
+    This is the asyncio counterpart of
+    :meth:`AnalyzeContentPipeline.analyze_content`; the suggestion calls
+    are awaited together with :func:`asyncio.gather`.
+
+    Args:
+        client (ParticipantsAsyncClient): The client to call.
+        request (Union[dict, AnalyzeContentRequest]): The
+            ``analyze_content`` request.
+        features (Sequence[Union[str, SuggestionFeature.Type]]): The
+            suggestion features to request.
+        suggestion_participant (Optional[str]): The participant to fetch
+            suggestions for. Defaults to the participant that sent the
+            content.
+        context_size (Optional[int]): The ``context_size`` sent with every
+            suggestion request.
+        retry (google.api_core.retry_async.AsyncRetry): The retry policy
+            for ``analyze_content``.
+        timeout (Optional[float]): The timeout for each call.
+        metadata (Sequence[Tuple[str, str]]): Strings which should be
+            sent along with each request as metadata.
+
+    Returns:
+        AnalyzeContentResult: The merged result.
+    """
+    plan = _Plan(client, features, context_size)
+    request = plan.prepare(request)
+    response = await client.analyze_content(
+        request=request, retry=retry, timeout=timeout, metadata=metadata,
+    )
+
+    names = []
+    attributes = []
+    calls = []
+    for name, method, attribute, suggestion_request in plan.suggestion_requests(
+        request, response, suggestion_participant
+    ):
+        names.append(name)
+        attributes.append(attribute)
+        calls.append(
+            getattr(client, method)(
+                request=suggestion_request, timeout=timeout, metadata=metadata,
+            )
+        )
+
+    results = {}
+    errors = {}
+    outcomes = await asyncio.gather(*calls, return_exceptions=True)
+    for name, attribute, outcome in zip(names, attributes, outcomes):
+        if isinstance(outcome, exceptions.GoogleAPICallError):
+            errors[name] = outcome
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            results[attribute] = outcome
+    return AnalyzeContentResult(response, errors=errors, **results)
+
+
+class CacheStats(NamedTuple):
+    """Counters describing the effectiveness of a :class:`SuggestionCache`."""
+
+    hits: int
+    misses: int
+    invalidations: int
+    evictions: int
+    size: int
+
+
+def _conversation_of(participant_name: str) -> str:
+    return participant_name.split("/participants/")[0]
+
+
+class SuggestionCache(object):
+    """A thread-safe LRU cache of suggestion responses.
+
+    Entries are keyed on the participant, the feature and every other
+    field of the request (:meth:`key`), and are dropped as soon as a new
+    message is posted to the participant's conversation through
+    :class:`CachingParticipantsClient` (or when :meth:`invalidate` is
+    called). Share one cache between all the clients of a process so that
+    every posted message invalidates it.
+
+    Args:
+        max_entries (int): The maximum number of cached responses; the
+            least recently used entry is evicted first.
+        max_age (Optional[float]): If set, entries older than this many
+            seconds are treated as misses. This is a safety net for
+            messages posted by other processes, which the cache cannot
+            observe.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_age: Optional[float] = None):
+        self._max_entries = max_entries
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        # Conversation name -> keys of its cached entries.
+        self._by_conversation = collections.defaultdict(set)
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+        # Counts invalidations; conversation -> count at its last one, for
+        # the most recently invalidated conversations.
+        self._generation = 0
+        self._invalidated_at = collections.OrderedDict()
+        self._forgotten_at = 0
+
+    @staticmethod
+    def key(feature, request) -> Tuple[str, str, str]:
+        """Return the cache key of a suggestion request.
+
+        Args:
+            feature (Union[str, SuggestionFeature.Type]): The feature the
+                request is for.
+            request: The ``Suggest*Request``.
+
+        Returns:
+            Tuple[str, str, str]: The participant, a digest of the other
+            fields of the request, such as ``latest_message``,
+            ``context_size`` or ``current_text_input``, and the feature.
+        """
+        fields = type(request)(request)
+        del fields.parent
+        digest = hashlib.sha256(
+            type(fields).pb(fields).SerializeToString(deterministic=True)
+        ).hexdigest()
+        return (request.parent, digest, _feature_name(feature))
+
+    def generation(self) -> int:
+        """Return a token to pass to :meth:`put` for a response being fetched.
+
+        Take it before fetching the response: :meth:`put` then drops the
+        response if the conversation was invalidated in the meantime.
+        """
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        """Return a copy of the cached response for ``key``, or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._max_age is not None:
+                if time.monotonic() - entry[0] > self._max_age:
+                    self._discard(key)
+                    entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            response = entry[1]
+        # Hand out copies so callers cannot mutate the cached response.
+        return type(response)(response)
+
+    def put(self, key, response, generation: Optional[int] = None) -> None:
+        """Cache a response under ``key``.
+
+        Args:
+            key: The key, see :meth:`key`.
+            response: The ``Suggest*Response``.
+            generation (Optional[int]): The :meth:`generation` taken before
+                the response was fetched. The response is not cached if
+                its conversation was invalidated since.
+        """
+        with self._lock:
+            if generation is not None:
+                conversation = _conversation_of(key[0])
+                invalidated = self._invalidated_at.get(conversation, self._forgotten_at)
+                if invalidated > generation:
+                    return
+            self._entries[key] = (time.monotonic(), type(response)(response))
+            self._entries.move_to_end(key)
+            self._by_conversation[_conversation_of(key[0])].add(key)
+            while len(self._entries) > self._max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self._evictions += 1
+
+    def invalidate(self, conversation: str) -> None:
+        """Drop every entry of a conversation.
+
+        Args:
+            conversation (str): The conversation, or one of its
+                participants.
+        """
+        with self._lock:
+            conversation = _conversation_of(conversation)
+            self._generation += 1
+            self._invalidated_at[conversation] = self._generation
+            self._invalidated_at.move_to_end(conversation)
+            while len(self._invalidated_at) > self._max_entries:
+                _, invalidated = self._invalidated_at.popitem(last=False)
+                # Forgotten conversations count as invalidated then.
+                self._forgotten_at = max(self._forgotten_at, invalidated)
+            keys = self._by_conversation.pop(conversation, ())
+            for key in keys:
+                self._entries.pop(key, None)
+            self._invalidations += len(keys)
+
+    def clear(self) -> None:
+        """Drop all entries. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._by_conversation.clear()
+
+    def stats(self) -> CacheStats:
+        """Return the current hit, miss and eviction counters."""
+        with self._lock:
+            return CacheStats(
+                self._hits,
+                self._misses,
+                self._invalidations,
+                self._evictions,
+                len(self._entries),
+            )
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        conversation = _conversation_of(key[0])
+        keys = self._by_conversation.get(conversation)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_conversation[conversation]
+
+
+class CachingParticipantsClient(object):
+    """A Participants client with an opt-in suggestion cache.
+
+    ``suggest_articles``, ``suggest_faq_answers`` and (on ``v2beta1``)
+    ``suggest_smart_replies`` are answered from the cache when the same
+    context window was requested before; ``analyze_content`` invalidates
+    the cached suggestions of the conversation it posts to. All other
+    attributes are those of the wrapped client.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import participants
+
+        client = participants.CachingParticipantsClient(
+            dialogflow.ParticipantsClient()
+        )
+        client.suggest_faq_answers(request={"parent": human_agent})
+        print(client.cache.stats())
+
+    Args:
+        client (ParticipantsClient): The client to wrap.
+        cache (Optional[SuggestionCache]): The cache to use. A new private
+            cache is created if unset.
+    """
+
+    def __init__(self, client, cache: Optional[SuggestionCache] = None) -> None:
+        self._client = client
+        self._types = _utils.types_module(client)
+        self.cache = SuggestionCache() if cache is None else cache
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_client":
+            raise AttributeError(name)
+        attribute = getattr(self._client, name)
+        if name == "suggest_smart_replies":
+            # Only v2beta1 clients have this method.
+            return functools.partial(
+                self._suggest, "SMART_REPLY", "SuggestSmartRepliesRequest"
+            )
+        return attribute
+
+    def _suggest(self, feature, request_type, request=None, *, parent=None, **kwargs):
+        method = _FEATURE_METHODS[feature][0]
+        if request is not None and parent is not None:
+            raise ValueError(
+                "If the `request` argument is set, then none of "
+                "the individual field arguments should be set."
+            )
+        request = getattr(self._types, request_type)(request)
+        if parent is not None:
+            request.parent = parent
+
+        key = self.cache.key(feature, request)
+        generation = self.cache.generation()
+        response = self.cache.get(key)
+        if response is None:
+            response = getattr(self._client, method)(request=request, **kwargs)
+            self.cache.put(key, response, generation)
+        return response
+
+    def suggest_articles(self, request=None, *, parent=None, **kwargs):
+        """Cached version of ``ParticipantsClient.suggest_articles``."""
+        return self._suggest(
+            "ARTICLE_SUGGESTION",
+            "SuggestArticlesRequest",
+            request,
+            parent=parent,
+            **kwargs,
+        )
+
+    def suggest_faq_answers(self, request=None, *, parent=None, **kwargs):
+        """Cached version of ``ParticipantsClient.suggest_faq_answers``."""
+        return self._suggest(
+            "FAQ", "SuggestFaqAnswersRequest", request, parent=parent, **kwargs
+        )
+
+    def analyze_content(self, request=None, *, participant=None, **kwargs):
+        """Post a message and invalidate its conversation's suggestions."""
+        if participant is not None:
+            kwargs["participant"] = participant
+        try:
+            return self._client.analyze_content(request=request, **kwargs)
+        finally:
+            # Invalidate even on failure: the message may have been posted.
+            name = participant
+            if name is None:
+                name = self._types.AnalyzeContentRequest(request).participant
+            self.cache.invalidate(name)
+
+
+__all__ = (
+    "AnalyzeContentPipeline",
+    "AnalyzeContentResult",
+    "CacheStats",
+    "CachingParticipantsClient",
+    "DEFAULT_ANALYZE_CONTENT_ASYNC_RETRY",
+    "DEFAULT_ANALYZE_CONTENT_RETRY",
+    "analyze_content_async",
+    "SuggestionCache",
+    "enabled_features",
+)
@@ -0,0 +1,610 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Record and replay ``detect_intent`` traffic.
+
+Exchanges are recorded below the retry layer of a Sessions transport, so
+every RPC attempt is logged with its latency. A log can then be served
+back by a deterministic fake transport, or re-sent to an agent to compare
+latencies and matched intents with the recording.
+
+The log is a sequence of length-delimited records::
+
+    header:  b"DFRL" version:u8 len:varint package
+    record:  kind:u8 offset_us:varint latency_us:varint
+             len:varint request  len:varint response-or-status
+
+where ``request`` and ``response`` are the serialized protocol buffers and
+a failed call stores a ``google.rpc.Status``. Only unary ``detect_intent``
+calls are recorded.
+"""
+
+import concurrent.futures
+import importlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import grpc  # type: ignore
+
+from google.api_core import exceptions  # type: ignore
+from google.api_core import gapic_v1  # type: ignore
+from google.auth import credentials as ga_credentials  # type: ignore
+from google.rpc import status_pb2  # type: ignore
+
+
+_MAGIC = b"DFRL"
+_VERSION = 1
+_RESPONSE = 0
+_ERROR = 1
+
+_STATUS_CODES = {code.value[0]: code for code in grpc.StatusCode}
+
+
+class Exchange(NamedTuple):
+    """One recorded ``detect_intent`` call.
+
+    Attributes:
+        request: The ``DetectIntentRequest``.
+        response: The ``DetectIntentResponse``, or ``None`` if the call
+            failed.
+        error: The ``google.rpc.Status`` of a failed call, else ``None``.
+        offset: Seconds between the start of the recording and the call.
+        latency: Seconds the call took.
+    """
+
+    request: object
+    response: Optional[object]
+    error: Optional[status_pb2.Status]
+    offset: float
+    latency: float
+
+
+def _write_varint(f, value):
+    bits = value & 0x7F
+    value >>= 7
+    while value:
+        f.write(bytes((0x80 | bits,)))
+        bits = value & 0x7F
+        value >>= 7
+    f.write(bytes((bits,)))
+
+
+def _read_varint(f):
+    result = 0
+    shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise EOFError("Truncated replay log.")
+        result |= (byte[0] & 0x7F) << shift
+        if not byte[0] & 0x80:
+            return result
+        shift += 7
+
+
+def _write_bytes(f, data):
+    _write_varint(f, len(data))
+    f.write(data)
+
+
+def _read_bytes(f):
+    size = _read_varint(f)
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError("Truncated replay log.")
+    return data
+
+
+def _pb(message):
+    # Generated clients pass proto-plus messages to the stubs.
+    if hasattr(type(message), "pb"):
+        return type(message).pb(message)
+    return message
+
+
+def _serialize(message):
+    # Struct fields are maps; deterministic output keeps replay keys stable.
+    return _pb(message).SerializeToString(deterministic=True)
+
+
+def _status(exc):
+    if isinstance(exc, grpc.RpcError) and callable(getattr(exc, "code", None)):
+        return status_pb2.Status(code=exc.code().value[0], message=exc.details() or "")
+    code = getattr(exc, "grpc_status_code", None)
+    return status_pb2.Status(
+        code=code.value[0] if code is not None else grpc.StatusCode.UNKNOWN.value[0],
+        message=str(exc),
+    )
+
+
+def _exception(status):
+    return exceptions.from_grpc_status(
+        _STATUS_CODES.get(status.code, grpc.StatusCode.UNKNOWN), status.message
+    )
+
+
+class LogWriter(object):
+    """Append ``detect_intent`` exchanges to a replay log.
+
+    Writers are thread-safe and can be used as context managers.
+
+    Args:
+        path (str): The file to write; it is truncated.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "wb")
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._header = False
+
+    def write(
+        self,
+        request,
+        response=None,
+        *,
+        error: Optional[BaseException] = None,
+        started: Optional[float] = None,
+        latency: float = 0.0,
+    ) -> None:
+        """Record one exchange.
+
+        Args:
+            request: The ``DetectIntentRequest`` that was sent.
+            response: The ``DetectIntentResponse`` that was received.
+            error (Optional[BaseException]): The error raised instead of
+                a response.
+            started (Optional[float]): The :func:`time.monotonic` time the
+                call started; defaults to now.
+            latency (float): Seconds the call took.
+        """
+        if started is None:
+            started = time.monotonic()
+        request_bytes = _serialize(request)
+        if error is not None:
+            kind, payload = _ERROR, _status(error).SerializeToString()
+        else:
+            kind, payload = _RESPONSE, _serialize(response)
+
+        with self._lock:
+            if not self._header:
+                package = type(_pb(request)).DESCRIPTOR.file.package
+                self._file.write(_MAGIC + bytes((_VERSION,)))
+                _write_bytes(self._file, package.encode("utf-8"))
+                self._header = True
+            self._file.write(bytes((kind,)))
+            _write_varint(self._file, max(0, int((started - self._start) * 1e6)))
+            _write_varint(self._file, max(0, int(latency * 1e6)))
+            _write_bytes(self._file, request_bytes)
+            _write_bytes(self._file, payload)
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the log file."""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+def _types_for_package(package):
+    # "google.cloud.dialogflow.v2" -> google.cloud.dialogflow_v2.types
+    prefix, _, version = package.rpartition(".")
+    return importlib.import_module("{}_{}.types".format(prefix, version))
+
+
+def read_log(path: str) -> Iterator[Exchange]:
+    """Read the exchanges of a replay log, in recording order.
+
+    Args:
+        path (str): The log to read.
+
+    Returns:
+        Iterator[Exchange]: The recorded exchanges, as messages of the API
+        version that was recorded.
+
+    Raises:
+        ValueError: If the file is not a replay log.
+        EOFError: If the log is truncated.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(_MAGIC) + 1)
+        if not magic:
+            return
+        if magic[: len(_MAGIC)] != _MAGIC or magic[-1] != _VERSION:
+            raise ValueError("{} is not a replay log.".format(path))
+        types = _types_for_package(_read_bytes(f).decode("utf-8"))
+        while True:
+            kind = f.read(1)
+            if not kind:
+                return
+            offset = _read_varint(f) / 1e6
+            latency = _read_varint(f) / 1e6
+            request = types.DetectIntentRequest.deserialize(_read_bytes(f))
+            payload = _read_bytes(f)
+            if kind[0] == _ERROR:
+                yield Exchange(
+                    request,
+                    None,
+                    status_pb2.Status.FromString(payload),
+                    offset,
+                    latency,
+                )
+            else:
+                response = types.DetectIntentResponse.deserialize(payload)
+                yield Exchange(request, response, None, offset, latency)
+
+
+class _RecordingStub(object):
+    def __init__(self, stub, writer):
+        self._stub = stub
+        self._writer = writer
+
+    def __call__(self, request, **kwargs):
+        started = time.monotonic()
+        try:
+            response = self._stub(request, **kwargs)
+        except Exception as exc:
+            self._writer.write(
+                request, error=exc, started=started, latency=time.monotonic() - started,
+            )
+            raise
+        self._writer.write(
+            request, response, started=started, latency=time.monotonic() - started
+        )
+        return response
+
+
+_recording_classes = {}  # type: Dict[type, type]
+
+
+def recording_transport(transport_class, writer: LogWriter, **kwargs):
+    """Create a Sessions transport that records ``detect_intent`` calls.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import replay
+        from google.cloud.dialogflow_v2.services.sessions.transports import (
+            SessionsGrpcTransport,
+        )
+
+        with replay.LogWriter("traffic.dfrl") as writer:
+            client = dialogflow.SessionsClient(
+                transport=replay.recording_transport(SessionsGrpcTransport, writer)
+            )
+            ...
+
+    Args:
+        transport_class (type): A synchronous Sessions transport class of
+            any API version, such as ``SessionsGrpcTransport``.
+        writer (LogWriter): The log to record to.
+        kwargs: Arguments for the transport constructor.
+
+    Returns:
+        SessionsTransport: An instance of a subclass of
+        ``transport_class`` to pass to the client.
+    """
+    cls = _recording_classes.get(transport_class)
+    if cls is None:
+
+        class cls(transport_class):
+            def __init__(self, writer, **kwargs):
+                self._recording_writer = writer
+                self._recording_stub = None
+                super().__init__(**kwargs)
+
+            @property
+            def detect_intent(self):
+                # The stub must be the same object on every access, since
+                # the wrapped methods are looked up by it.
+                if self._recording_stub is None:
+                    self._recording_stub = _RecordingStub(
+                        super().detect_intent, self._recording_writer
+                    )
+                return self._recording_stub
+
+        cls.__name__ = cls.__qualname__ = "Recording" + transport_class.__name__
+        _recording_classes[transport_class] = cls
+    return cls(writer, **kwargs)
+
+
+class ReplayMissError(LookupError):
+    """Raised by a replay transport for a request that was not recorded."""
+
+
+class _ReplayStub(object):
+    def __init__(self, exchanges, ignore_session):
+        self._ignore_session = ignore_session
+        self._lock = threading.Lock()
+        self._recorded = {}  # type: Dict[bytes, List[Exchange]]
+        for exchange in exchanges:
+            self._recorded.setdefault(self._key(exchange.request), []).append(exchange)
+
+    def _key(self, request):
+        if self._ignore_session:
+            request = type(request)(request)
+            request.session = ""
+        return _serialize(request)
+
+    def __call__(self, request, **kwargs):
+        key = self._key(request)
+        with self._lock:
+            exchanges = self._recorded.get(key)
+            if not exchanges:
+                raise ReplayMissError(
+                    "No recorded response for {!r}.".format(request.query_input)
+                )
+            # Identical requests are answered in recording order; the last
+            # answer is repeated once the recording is exhausted.
+            exchange = exchanges.pop(0) if len(exchanges) > 1 else exchanges[0]
+        if exchange.error is not None:
+            raise _exception(exchange.error)
+        return type(exchange.response)(exchange.response)
+
+
+def _not_recorded(requests, **kwargs):
+    raise ReplayMissError("Streaming calls are not recorded.")
+
+
+def replay_transport(exchanges: Iterable[Exchange], *, ignore_session: bool = False):
+    """Create a fake Sessions transport serving recorded responses.
+
+    The transport answers ``detect_intent`` with the response recorded for
+    an identical request, and raises the recorded error for failed calls.
+    It makes no network calls and needs no credentials.
+
+    .. code-block:: python
+
+        transport = replay.replay_transport(replay.read_log("traffic.dfrl"))
+        client = dialogflow.SessionsClient(transport=transport)
+
+    Args:
+        exchanges (Iterable[Exchange]): The recording, usually from
+            :func:`read_log`. It must not be empty.
+        ignore_session (bool): Match requests regardless of their session.
+
+    Returns:
+        SessionsTransport: A transport of the recorded API version.
+
+    Raises:
+        ValueError: If ``exchanges`` is empty.
+    """
+    exchanges = list(exchanges)
+    if not exchanges:
+        raise ValueError("Cannot replay an empty recording.")
+    package = type(exchanges[0].request).__module__.split(".types.")[0]
+    base = importlib.import_module(
+        package + ".services.sessions.transports.base"
+    ).SessionsTransport
+
+    class ReplaySessionsTransport(base):
+        def __init__(self):
+            super().__init__(credentials=ga_credentials.AnonymousCredentials())
+            self._detect_intent = _ReplayStub(exchanges, ignore_session)
+            self._prep_wrapped_messages(gapic_v1.client_info.ClientInfo())
+
+        @property
+        def detect_intent(self):
+            return self._detect_intent
+
+        @property
+        def streaming_detect_intent(self):
+            return _not_recorded
+
+    return ReplaySessionsTransport()
+
+
+class ReplayDiff(NamedTuple):
+    """The outcome of re-sending one recorded request.
+
+    Attributes:
+        session: The session of the recorded request.
+        query: The query text, or the event name for event queries.
+        recorded_intent: The display name of the recorded intent, or
+            ``None`` if the recorded call failed.
+        replayed_intent: The display name of the intent matched now, or
+            ``None`` if the call failed.
+        recorded_latency: Seconds the recorded call took.
+        replayed_latency: Seconds the call took now.
+        error: The error raised by the call, if any.
+    """
+
+    session: str
+    query: str
+    recorded_intent: Optional[str]
+    replayed_intent: Optional[str]
+    recorded_latency: float
+    replayed_latency: float
+    error: Optional[Exception]
+
+    @property
+    def matched(self) -> bool:
+        """Whether the same intent was matched."""
+        return self.recorded_intent == self.replayed_intent
+
+
+def _percentile(values, percentile):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(0, int(round(percentile / 100.0 * len(ordered) + 0.5)) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class ReplayReport(object):
+    """The comparison of a replay with its recording.
+
+    Attributes:
+        diffs (List[ReplayDiff]): One entry per request, in recording order.
+    """
+
+    def __init__(self, diffs: List[ReplayDiff]) -> None:
+        self.diffs = diffs
+
+    @property
+    def intent_match_rate(self) -> float:
+        """The fraction of requests that matched the recorded intent."""
+        if not self.diffs:
+            return 1.0
+        return sum(diff.matched for diff in self.diffs) / len(self.diffs)
+
+    def mismatches(self) -> List[ReplayDiff]:
+        """Return the requests that matched a different intent."""
+        return [diff for diff in self.diffs if not diff.matched]
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)) -> Dict[str, Dict]:
+        """Return latency percentiles of the recording and of the replay.
+
+        Args:
+            percentiles (Sequence[float]): The percentiles to compute.
+
+        Returns:
+            Dict[str, Dict[float, float]]: Seconds by percentile, under
+            the keys ``"recorded"`` and ``"replayed"``.
+        """
+        recorded = [diff.recorded_latency for diff in self.diffs]
+        replayed = [diff.replayed_latency for diff in self.diffs]
+        return {
+            "recorded": {p: _percentile(recorded, p) for p in percentiles},
+            "replayed": {p: _percentile(replayed, p) for p in percentiles},
+        }
+
+    def format(self) -> str:
+        """Return a plain text summary with every intent mismatch."""
+        lines = [
+            "{} requests, {:.1%} matched the recorded intent".format(
+                len(self.diffs), self.intent_match_rate
+            )
+        ]
+        latencies = self.latency_percentiles()
+        for percentile in latencies["recorded"]:
+            lines.append(
+                "p{}: {:.1f} ms recorded, {:.1f} ms replayed".format(
+                    percentile,
+                    latencies["recorded"][percentile] * 1e3,
+                    latencies["replayed"][percentile] * 1e3,
+                )
+            )
+        for diff in self.mismatches():
+            lines.append(
+                "{}: {!r} {} -> {}".format(
+                    diff.session,
+                    diff.query,
+                    diff.recorded_intent,
+                    diff.error if diff.error is not None else diff.replayed_intent,
+                )
+            )
+        return "\n".join(lines)
+
+
+def _query(request):
+    query_input = request.query_input
+    return query_input.text.text or query_input.event.name
+
+
+def _intent(response):
+    if response is None:
+        return None
+    return response.query_result.intent.display_name
+
+
+def resend(
+    client,
+    exchanges: Iterable[Exchange],
+    *,
+    speedup: Optional[float] = 1.0,
+    max_workers: int = 8,
+    rewrite: Optional[Callable] = None,
+) -> ReplayReport:
+    """Re-send recorded requests and compare the results.
+
+    Requests are sent with their recorded spacing divided by ``speedup``;
+    when all ``max_workers`` are busy, sending falls behind schedule
+    rather than exceeding the concurrency limit.
+
+    Args:
+        client (SessionsClient): The client to send the requests with.
+        exchanges (Iterable[Exchange]): The recording, usually from
+            :func:`read_log`.
+        speedup (Optional[float]): How much faster than recorded to send
+            the requests. ``None`` sends them as fast as possible.
+        max_workers (int): The maximum number of concurrent requests.
+        rewrite (Optional[Callable]): Called with a copy of each request
+            before it is sent, for example to move it to a test session or
+            another environment. It may modify the request in place or
+            return a new one.
+
+    Returns:
+        ReplayReport: The comparison with the recording.
+    """
+    semaphore = threading.BoundedSemaphore(max_workers)
+
+    def send(exchange):
+        try:
+            request = type(exchange.request)(exchange.request)
+            if rewrite is not None:
+                request = rewrite(request) or request
+            started = time.monotonic()
+            try:
+                response, error = client.detect_intent(request=request), None
+            except exceptions.GoogleAPICallError as exc:
+                response, error = None, exc
+            return ReplayDiff(
+                exchange.request.session,
+                _query(exchange.request),
+                _intent(exchange.response),
+                _intent(response),
+                exchange.latency,
+                time.monotonic() - started,
+                error,
+            )
+        finally:
+            semaphore.release()
+
+    futures = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        start = time.monotonic()
+        first = None
+        for exchange in exchanges:
+            if first is None:
+                first = exchange.offset
+            if speedup:
+                delay = start + (exchange.offset - first) / speedup - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            semaphore.acquire()
+            futures.append(executor.submit(send, exchange))
+    return ReplayReport([future.result() for future in futures])
+
+
+__all__ = (
+    "Exchange",
+    "LogWriter",
+    "ReplayDiff",
+    "ReplayMissError",
+    "ReplayReport",
+    "read_log",
+    "recording_transport",
+    "replay_transport",
+    "resend",
+)
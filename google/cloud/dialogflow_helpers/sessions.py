@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Run the turns of many sessions concurrently, each session in order.
+
+``detect_intent`` is not idempotent: every turn reads and updates the
+contexts of its session, so two turns of the same session must not be in
+flight at the same time. The schedulers here hash each session to one of
+a fixed number of lanes. A lane runs its turns one at a time in the order
+they were submitted, and the lanes run in parallel, so distinct sessions
+proceed concurrently while each session sees its turns in order.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import zlib
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+
+class SessionTurn(NamedTuple):
+    """The outcome of one turn.
+
+    Attributes:
+        session: The session name.
+        query_input: The ``QueryInput`` sent.
+        response: The ``DetectIntentResponse``; ``None`` if the call
+            failed.
+        error: The exception raised by the call, else ``None``; an
+            :class:`asyncio.CancelledError` if the call alone was
+            cancelled. Later turns of the session are still sent.
+    """
+
+    session: str
+    query_input: Any
+    response: Any = None
+    error: Optional[BaseException] = None
+
+
+class LaneStats(NamedTuple):
+    """Counters of one lane.
+
+    Attributes:
+        lane: The lane index.
+        depth: Turns queued or running on the lane.
+        max_depth: The largest depth seen.
+        submitted: Turns submitted to the lane.
+        completed: Turns that finished, successfully or not, or were
+            cancelled before they started.
+        failed: Turns whose call raised.
+    """
+
+    lane: int
+    depth: int
+    max_depth: int
+    submitted: int
+    completed: int
+    failed: int
+
+
+def lane_of(session: str, lanes: int) -> int:
+    """Return the lane of a session.
+
+    The hash is stable across processes, so sessions keep their lane
+    when work is split between several schedulers the same way.
+
+    Args:
+        session (str): The session name.
+        lanes (int): The number of lanes.
+
+    Returns:
+        int: The lane index, in ``range(lanes)``.
+    """
+    return zlib.crc32(session.encode("utf-8")) % lanes
+
+
+class _Counters(object):
+    """Per lane counters, safe to update from any thread."""
+
+    def __init__(self, lanes):
+        self._lock = threading.Lock()
+        self._submitted = [0] * lanes
+        self._completed = [0] * lanes
+        self._failed = [0] * lanes
+        self._max_depth = [0] * lanes
+
+    def submitted(self, lane):
+        with self._lock:
+            self._submitted[lane] += 1
+            depth = self._submitted[lane] - self._completed[lane]
+            self._max_depth[lane] = max(self._max_depth[lane], depth)
+
+    def completed(self, lane, failed):
+        with self._lock:
+            self._completed[lane] += 1
+            self._failed[lane] += failed
+
+    def stats(self):
+        with self._lock:
+            return [
+                LaneStats(
+                    lane,
+                    self._submitted[lane] - self._completed[lane],
+                    self._max_depth[lane],
+                    self._submitted[lane],
+                    self._completed[lane],
+                    self._failed[lane],
+                )
+                for lane in range(len(self._submitted))
+            ]
+
+
+def _request(session, query_input, query_params):
+    request = {"session": session, "query_input": query_input}
+    if query_params is not None:
+        request["query_params"] = query_params
+    return request
+
+
+class SessionScheduler(object):
+    """Run ``detect_intent`` turns on threads, in order within each session.
+
+    Each lane drains its queue on a thread of the executor, one turn at a
+    time, and gives the thread back when the queue is empty, so the lanes
+    can share an executor with other work. At most ``max_queue`` turns
+    wait on a lane; :meth:`submit` blocks beyond that.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import sessions
+
+        client = dialogflow.SessionsClient()
+        with sessions.SessionScheduler(client, lanes=16) as scheduler:
+            for turn in scheduler.map(conversations):
+                print(turn.session, turn.response.query_result.fulfillment_text)
+            print(scheduler.stats())
+
+    Args:
+        client (SessionsClient): The client to call. Clients of any API
+            version are accepted.
+        lanes (int): The number of lanes, and so the maximum number of
+            turns in flight.
+        max_queue (int): The maximum number of turns waiting on a lane.
+        executor (Optional[concurrent.futures.Executor]): The executor
+            running the lanes; it needs ``lanes`` workers for every lane to
+            make progress at once. A thread pool of that size, owned by
+            the scheduler, is used if unset.
+        timeout (Optional[float]): The timeout for each call.
+        metadata (Sequence[Tuple[str, str]]): Strings which should be
+            sent along with each request as metadata.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        lanes: int = 8,
+        max_queue: int = 64,
+        executor: Optional[concurrent.futures.Executor] = None,
+        timeout: Optional[float] = None,
+        metadata=(),
+    ) -> None:
+        if lanes < 1 or max_queue < 1:
+            raise ValueError("lanes and max_queue must be at least 1.")
+        self._client = client
+        self._lanes = lanes
+        self._timeout = timeout
+        self._metadata = metadata
+        self._owns_executor = executor is None
+        self._executor = executor or concurrent.futures.ThreadPoolExecutor(lanes)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._queues = [collections.deque() for _ in range(lanes)]
+        self._running = [False] * lanes
+        self._slots = [threading.BoundedSemaphore(max_queue) for _ in range(lanes)]
+        self._counters = _Counters(lanes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """Wait for submitted turns, and shut down the executor if owned."""
+        with self._idle:
+            self._idle.wait_for(lambda: not any(self._running))
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+    def submit(
+        self, session: str, query_input, *, query_params=None
+    ) -> concurrent.futures.Future:
+        """Queue a turn behind the earlier turns of its session.
+
+        Args:
+            session (str): The session name.
+            query_input (Union[dict, QueryInput]): The input of the turn.
+            query_params (Union[dict, QueryParameters, None]): The
+                parameters of the turn.
+
+        Returns:
+            concurrent.futures.Future: Resolves to a :class:`SessionTurn`;
+            call failures are reported in :attr:`SessionTurn.error`.
+        """
+        lane = lane_of(session, self._lanes)
+        self._slots[lane].acquire()
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._queues[lane].append((session, query_input, query_params, future))
+            self._counters.submitted(lane)
+            start = not self._running[lane]
+            self._running[lane] = True
+        if start:
+            self._executor.submit(self._drain, lane)
+        return future
+
+    def map(
+        self,
+        work: Iterable[Tuple[str, Any]],
+        *,
+        read_ahead: Optional[int] = None,
+        **kwargs,
+    ) -> Iterator[SessionTurn]:
+        """Run a stream of turns and yield their outcomes in order.
+
+        Turns are submitted as fast as the lanes accept them, while
+        finished ones are yielded in submission order. Once ``read_ahead``
+        turns are waiting to be yielded, behind a slow one for instance,
+        no more are read from ``work`` until that turn finishes.
+
+        Args:
+            work (Iterable[Tuple[str, Union[dict, QueryInput]]]): The
+                ``(session, query_input)`` of each turn.
+            read_ahead (Optional[int]): The maximum number of turns
+                submitted but not yet yielded; four per lane if unset.
+            kwargs: Keyword arguments accepted by :meth:`submit`.
+
+        Returns:
+            Iterator[SessionTurn]: The outcome of each turn.
+        """
+        read_ahead = _read_ahead(read_ahead, self._lanes)
+        pending = collections.deque()
+        for session, query_input in work:
+            pending.append(self.submit(session, query_input, **kwargs))
+            while pending and (pending[0].done() or len(pending) >= read_ahead):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def stats(self) -> List[LaneStats]:
+        """Return the counters of every lane."""
+        return self._counters.stats()
+
+    def _drain(self, lane):
+        queue = self._queues[lane]
+        try:
+            while True:
+                with self._lock:
+                    if not queue:
+                        self._running[lane] = False
+                        self._idle.notify_all()
+                        return
+                    session, query_input, query_params, future = queue.popleft()
+                self._slots[lane].release()
+                if not future.set_running_or_notify_cancel():
+                    # Cancelled by the caller while it waited.
+                    self._counters.completed(lane, False)
+                    continue
+                try:
+                    response = self._client.detect_intent(
+                        request=_request(session, query_input, query_params),
+                        timeout=self._timeout,
+                        metadata=self._metadata,
+                    )
+                except Exception as exc:
+                    turn = SessionTurn(session, query_input, error=exc)
+                else:
+                    turn = SessionTurn(session, query_input, response)
+                self._counters.completed(lane, turn.error is not None)
+                future.set_result(turn)
+        except BaseException:
+            # Never leave the lane marked running, or close() would hang.
+            with self._lock:
+                self._running[lane] = False
+                self._idle.notify_all()
+            raise
+
+
+class AsyncSessionScheduler(object):
+    """Run ``detect_intent`` turns on asyncio, in order within each session.
+
+    This is the asyncio counterpart of :class:`SessionScheduler`: each
+    lane is a task awaiting its turns one at a time. At most ``max_queue``
+    turns wait on a lane; :meth:`submit` waits beyond that.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import sessions
+
+        client = dialogflow.SessionsAsyncClient()
+        async with sessions.AsyncSessionScheduler(client, lanes=64) as scheduler:
+            async for turn in scheduler.map(conversations):
+                print(turn.session, turn.response.query_result.fulfillment_text)
+
+    Args:
+        client (SessionsAsyncClient): The client to call.
+        lanes (int): The number of lanes, and so the maximum number of
+            turns in flight.
+        max_queue (int): The maximum number of turns waiting on a lane.
+        timeout (Optional[float]): The timeout for each call.
+        metadata (Sequence[Tuple[str, str]]): Strings which should be
+            sent along with each request as metadata.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        lanes: int = 8,
+        max_queue: int = 64,
+        timeout: Optional[float] = None,
+        metadata=(),
+    ) -> None:
+        if lanes < 1 or max_queue < 1:
+            raise ValueError("lanes and max_queue must be at least 1.")
+        self._client = client
+        self._lanes = lanes
+        self._max_queue = max_queue
+        self._timeout = timeout
+        self._metadata = metadata
+        self._counters = _Counters(lanes)
+        # Created on first use, in the running event loop.
+        self._queues = None
+        self._workers = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self) -> None:
+        """Wait for submitted turns and stop the lane tasks."""
+        if self._queues is None:
+            return
+        for queue in self._queues:
+            await queue.put(None)
+        await asyncio.gather(*self._workers)
+        self._queues = self._workers = None
+
+    async def submit(
+        self, session: str, query_input, *, query_params=None
+    ) -> asyncio.Future:
+        """Queue a turn behind the earlier turns of its session.
+
+        Args:
+            session (str): The session name.
+            query_input (Union[dict, QueryInput]): The input of the turn.
+            query_params (Union[dict, QueryParameters, None]): The
+                parameters of the turn.
+
+        Returns:
+            asyncio.Future: Resolves to a :class:`SessionTurn`; call
+            failures are reported in :attr:`SessionTurn.error`.
+        """
+        if self._queues is None:
+            self._queues = [asyncio.Queue(self._max_queue) for _ in range(self._lanes)]
+            self._workers = [
+                asyncio.ensure_future(self._drain(queue)) for queue in self._queues
+            ]
+        lane = lane_of(session, self._lanes)
+        future = asyncio.get_event_loop().create_future()
+        await self._queues[lane].put((lane, session, query_input, query_params, future))
+        self._counters.submitted(lane)
+        return future
+
+    async def map(
+        self,
+        work: Union[Iterable[Tuple[str, Any]], AsyncIterable[Tuple[str, Any]]],
+        *,
+        read_ahead: Optional[int] = None,
+        **kwargs,
+    ) -> AsyncIterator[SessionTurn]:
+        """Run a stream of turns and yield their outcomes in order.
+
+        See :meth:`SessionScheduler.map`.
+
+        Args:
+            work (Union[Iterable, AsyncIterable]): The
+                ``(session, query_input)`` of each turn.
+            read_ahead (Optional[int]): The maximum number of turns
+                submitted but not yet yielded; four per lane if unset.
+            kwargs: Keyword arguments accepted by :meth:`submit`.
+
+        Returns:
+            AsyncIterator[SessionTurn]: The outcome of each turn.
+        """
+        read_ahead = _read_ahead(read_ahead, self._lanes)
+        if not hasattr(work, "__aiter__"):
+            work = _aiter(work)
+        pending = collections.deque()
+        async for session, query_input in work:
+            pending.append(await self.submit(session, query_input, **kwargs))
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+            if len(pending) >= read_ahead:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+
+    def stats(self) -> List[LaneStats]:
+        """Return the counters of every lane."""
+        return self._counters.stats()
+
+    async def _drain(self, queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            lane, session, query_input, query_params, future = item
+            call = asyncio.ensure_future(
+                self._client.detect_intent(
+                    request=_request(session, query_input, query_params),
+                    timeout=self._timeout,
+                    metadata=self._metadata,
+                )
+            )
+            try:
+                # Unlike awaiting the call, this only raises when the lane
+                # task itself is cancelled.
+                await asyncio.wait([call])
+            except asyncio.CancelledError:
+                call.cancel()
+                future.cancel()
+                raise
+            try:
+                response = call.result()
+            except asyncio.CancelledError as exc:
+                # Only this call was cancelled; the lane carries on.
+                turn = SessionTurn(session, query_input, error=exc)
+            except Exception as exc:
+                turn = SessionTurn(session, query_input, error=exc)
+            else:
+                turn = SessionTurn(session, query_input, response)
+            self._counters.completed(lane, turn.error is not None)
+            if not future.cancelled():
+                future.set_result(turn)
+
+
+def _read_ahead(read_ahead, lanes):
+    if read_ahead is None:
+        return 4 * lanes
+    if read_ahead < 1:
+        raise ValueError("read_ahead must be at least 1.")
+    return read_ahead
+
+
+async def _aiter(iterable):
+    for item in iterable:
+        yield item
+
+
+__all__ = (
+    "AsyncSessionScheduler",
+    "LaneStats",
+    "SessionScheduler",
+    "SessionTurn",
+    "lane_of",
+)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Fast conversion between ``google.protobuf.Struct`` and Python values.
+
+Fields such as ``QueryResult.parameters``, ``QueryResult.webhook_payload``,
+``QueryResult.diagnostic_info`` and ``WebhookResponse.payload`` are
+``Struct`` messages. By default proto-plus wraps them in lazy views which
+convert every key and item through the marshal on access; turning a large
+payload into plain Python objects that way is slow. The functions here
+convert a whole ``Struct`` in one pass.
+
+:func:`install` registers the codec with the marshals of the Dialogflow
+types, after which these fields read as plain ``dict`` objects:
+
+.. code-block:: python
+
+    from google.cloud.dialogflow_helpers import structs
+
+    structs.install()
+    response = sessions_client.detect_intent(request=request)
+    parameters = response.query_result.parameters  # a dict
+
+The codec is not installed by default because the returned objects are
+snapshots: changing them does not change the message. Assign the field
+instead, as in ``webhook_response.payload = payload``.
+"""
+
+import collections.abc
+
+import proto  # type: ignore
+from google.protobuf import struct_pb2  # type: ignore
+
+
+_MARSHALS = ("google.cloud.dialogflow.v2", "google.cloud.dialogflow.v2beta1")
+
+_SCALAR_KINDS = frozenset(("number_value", "string_value", "bool_value"))
+
+_NUMBER_TYPES = (int, float)
+
+
+def value_to_python(value: struct_pb2.Value):
+    """Convert a ``google.protobuf.Value`` to a Python value.
+
+    Args:
+        value (google.protobuf.struct_pb2.Value): The value to convert.
+
+    Returns:
+        Union[None, bool, float, str, dict, list]: The Python value.
+        Numbers are always floats, as in the proto-plus marshal.
+    """
+    kind = value.WhichOneof("kind")
+    if kind in _SCALAR_KINDS:
+        return getattr(value, kind)
+    if kind == "struct_value":
+        return {
+            key: value_to_python(item)
+            for key, item in value.struct_value.fields.items()
+        }
+    if kind == "list_value":
+        return [value_to_python(item) for item in value.list_value.values]
+    return None
+
+
+def struct_to_dict(struct: struct_pb2.Struct) -> dict:
+    """Convert a ``google.protobuf.Struct`` to a ``dict``.
+
+    Args:
+        struct (google.protobuf.struct_pb2.Struct): The struct to convert.
+
+    Returns:
+        dict: A new dictionary; nested structs and lists are converted too.
+    """
+    return {key: value_to_python(item) for key, item in struct.fields.items()}
+
+
+def list_value_to_list(list_value: struct_pb2.ListValue) -> list:
+    """Convert a ``google.protobuf.ListValue`` to a ``list``."""
+    return [value_to_python(item) for item in list_value.values]
+
+
+def _set_value(value_pb, obj):
+    # Exact type checks first; they cover almost all JSON-like data.
+    kind = type(obj)
+    if kind is str:
+        value_pb.string_value = obj
+    elif kind is bool:
+        value_pb.bool_value = obj
+    elif kind is float or kind is int:
+        value_pb.number_value = obj
+    elif kind is dict:
+        _fill_struct(value_pb.struct_value, obj)
+    elif kind is list or kind is tuple:
+        _fill_list(value_pb.list_value, obj)
+    elif obj is None:
+        value_pb.null_value = struct_pb2.NULL_VALUE
+    elif isinstance(obj, struct_pb2.Value):
+        value_pb.CopyFrom(obj)
+    elif isinstance(obj, bool):
+        value_pb.bool_value = obj
+    elif isinstance(obj, _NUMBER_TYPES):
+        value_pb.number_value = float(obj)
+    elif isinstance(obj, str):
+        value_pb.string_value = obj
+    elif isinstance(obj, collections.abc.Mapping):
+        _fill_struct(value_pb.struct_value, obj)
+    elif isinstance(obj, collections.abc.Sequence):
+        _fill_list(value_pb.list_value, obj)
+    else:
+        raise ValueError("Unable to coerce value: {!r}".format(obj))
+
+
+def _fill_struct(struct_pb, mapping):
+    # Mark the struct as present even if the mapping is empty.
+    struct_pb.SetInParent()
+    fields = struct_pb.fields
+    for key, item in mapping.items():
+        _set_value(fields[key], item)
+
+
+def _fill_list(list_pb, sequence):
+    list_pb.SetInParent()
+    values = list_pb.values
+    for item in sequence:
+        _set_value(values.add(), item)
+
+
+def python_to_value(obj) -> struct_pb2.Value:
+    """Convert a Python value to a ``google.protobuf.Value``.
+
+    Args:
+        obj: ``None``, a bool, number or string, or a mapping or sequence
+            of such values.
+
+    Returns:
+        google.protobuf.struct_pb2.Value: The converted value.
+
+    Raises:
+        ValueError: If the value cannot be represented.
+    """
+    value = struct_pb2.Value()
+    _set_value(value, obj)
+    return value
+
+
+def dict_to_struct(mapping) -> struct_pb2.Struct:
+    """Convert a mapping to a ``google.protobuf.Struct``.
+
+    Args:
+        mapping (Mapping[str, Any]): The mapping to convert.
+
+    Returns:
+        google.protobuf.struct_pb2.Struct: The converted struct.
+
+    Raises:
+        ValueError: If a value cannot be represented.
+    """
+    struct = struct_pb2.Struct()
+    _fill_struct(struct, mapping)
+    return struct
+
+
+def list_to_list_value(sequence) -> struct_pb2.ListValue:
+    """Convert a sequence to a ``google.protobuf.ListValue``."""
+    list_value = struct_pb2.ListValue()
+    _fill_list(list_value, sequence)
+    return list_value
+
+
+class StructRule(object):
+    """A marshal rule converting ``Struct`` fields to and from ``dict``."""
+
+    def to_python(self, value, *, absent: bool = None):
+        if absent:
+            return None
+        if isinstance(value, struct_pb2.Struct):
+            return struct_to_dict(value)
+        return value
+
+    def to_proto(self, value):
+        if isinstance(value, struct_pb2.Struct):
+            return value
+        return dict_to_struct(value)
+
+
+class ListValueRule(object):
+    """A marshal rule converting ``ListValue`` fields to and from ``list``."""
+
+    def to_python(self, value, *, absent: bool = None):
+        if absent:
+            return None
+        if isinstance(value, struct_pb2.ListValue):
+            return list_value_to_list(value)
+        return value
+
+    def to_proto(self, value):
+        if isinstance(value, struct_pb2.ListValue):
+            return value
+        return list_to_list_value(value)
+
+
+class ValueRule(object):
+    """A marshal rule converting ``Value`` fields to and from Python values."""
+
+    def to_python(self, value, *, absent: bool = None):
+        if absent:
+            return None
+        if isinstance(value, struct_pb2.Value):
+            return value_to_python(value)
+        return value
+
+    def to_proto(self, value):
+        if isinstance(value, struct_pb2.Value):
+            return value
+        return python_to_value(value)
+
+
+_RULES = (
+    (struct_pb2.Struct, StructRule()),
+    (struct_pb2.ListValue, ListValueRule()),
+    (struct_pb2.Value, ValueRule()),
+)
+
+# Marshal name -> the rules replaced by install().
+_replaced = {}
+
+
+def install(marshal_names=_MARSHALS) -> None:
+    """Use the fast codec for the ``Struct`` fields of the Dialogflow types.
+
+    Every ``Struct``, ``ListValue`` and ``Value`` field of the messages
+    using the marshals is affected, not only the fields named above.
+    Installing twice has no further effect.
+
+    Args:
+        marshal_names (Sequence[str]): The proto-plus marshals to register
+            the codec with; by default those of all API versions.
+    """
+    for name in marshal_names:
+        if name in _replaced:
+            continue
+        marshal = proto.Marshal(name=name)
+        _replaced[name] = {
+            proto_type: marshal._rules.get(proto_type) for proto_type, _ in _RULES
+        }
+        for proto_type, rule in _RULES:
+            marshal.register(proto_type, rule)
+
+
+def uninstall(marshal_names=_MARSHALS) -> None:
+    """Restore the marshal rules replaced by :func:`install`.
+
+    Args:
+        marshal_names (Sequence[str]): The marshals to restore.
+    """
+    for name in marshal_names:
+        replaced = _replaced.pop(name, None)
+        if replaced is None:
+            continue
+        rules = proto.Marshal(name=name)._rules
+        for proto_type, rule in replaced.items():
+            if rule is None:
+                rules.pop(proto_type, None)
+            else:
+                rules[proto_type] = rule
+
+
+__all__ = (
+    "ListValueRule",
+    "StructRule",
+    "ValueRule",
+    "dict_to_struct",
+    "install",
+    "list_to_list_value",
+    "list_value_to_list",
+    "python_to_value",
+    "struct_to_dict",
+    "uninstall",
+    "value_to_python",
+)
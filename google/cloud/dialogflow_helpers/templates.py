@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Send ``detect_intent`` requests whose constant fields are serialized once.
+
+A serialized protocol buffer message is the concatenation of its fields,
+and parsing the concatenation of two serialized messages gives the merge
+of both. A :class:`DetectIntentTemplate` serializes the fields every turn
+shares (``query_params``, ``output_audio_config`` and its mask) once, and
+each turn only serializes its session and input and appends the cached
+bytes. The bytes are sent through a stub that skips serialization.
+"""
+
+from typing import Sequence, Tuple
+
+from grpc.experimental import aio  # type: ignore
+
+from google.api_core import exceptions  # type: ignore
+from google.api_core import gapic_v1  # type: ignore
+from google.api_core import retry as retries  # type: ignore
+from google.api_core import retry_async  # type: ignore
+
+from google.cloud import dialogflow_common
+from google.cloud.dialogflow_helpers import _utils
+
+
+# The defaults of the generated ``detect_intent`` methods.
+DEFAULT_DETECT_INTENT_RETRY = retries.Retry(
+    initial=0.1,
+    maximum=60.0,
+    multiplier=1.3,
+    predicate=retries.if_exception_type(exceptions.ServiceUnavailable,),
+    deadline=220.0,
+)
+DEFAULT_DETECT_INTENT_ASYNC_RETRY = retry_async.AsyncRetry(
+    initial=0.1,
+    maximum=60.0,
+    multiplier=1.3,
+    predicate=retries.if_exception_type(exceptions.ServiceUnavailable,),
+    deadline=220.0,
+)
+DEFAULT_DETECT_INTENT_TIMEOUT = 220.0
+
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _pb(message):
+    if hasattr(type(message), "pb"):
+        return type(message).pb(message)
+    return message
+
+
+def _client_metadata(transport):
+    # Transports keep no client_info of their own, only the user agent
+    # metadata their wrapped methods were built with.
+    wrapped = getattr(transport, "_wrapped_methods", {}).get(transport.detect_intent)
+    if wrapped is None:
+        return (dialogflow_common.default_client_info().to_grpc_metadata(),)
+    return tuple(getattr(wrapped, "_metadata", None) or ())
+
+
+class DetectIntentTemplate(object):
+    """``detect_intent`` with the fields shared by every turn pre-serialized.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import templates
+
+        client = dialogflow.SessionsClient()
+        template = templates.DetectIntentTemplate(
+            client,
+            query_params={
+                "time_zone": "Europe/Paris",
+                "sentiment_analysis_request_config": {
+                    "analyze_query_text_sentiment": True
+                },
+            },
+            output_audio_config={"audio_encoding": "OUTPUT_AUDIO_ENCODING_MP3"},
+        )
+        response = template.detect_intent(session, {"text": text_input})
+
+    Args:
+        client (Union[SessionsClient, SessionsAsyncClient]): A gRPC client
+            of any API version. With an async client, :meth:`detect_intent`
+            returns an awaitable.
+        query_params (Union[dict, QueryParameters, None]): The parameters
+            sent with every turn.
+        output_audio_config (Union[dict, OutputAudioConfig, None]): The
+            audio configuration sent with every turn.
+        output_audio_config_mask (Union[dict, FieldMask, None]): The mask
+            sent with every turn.
+        retry (Union[Retry, AsyncRetry]): The default retry policy. The
+            generated default of the client's kind is used if unset.
+        timeout (float): The default timeout for each call.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        query_params=None,
+        output_audio_config=None,
+        output_audio_config_mask=None,
+        retry=None,
+        timeout: float = DEFAULT_DETECT_INTENT_TIMEOUT,
+    ) -> None:
+        types = _utils.types_module(client)
+        self._request_type = types.DetectIntentRequest
+        self._query_input_type = types.QueryInput
+
+        constant = {}
+        if query_params is not None:
+            constant["query_params"] = query_params
+        if output_audio_config is not None:
+            constant["output_audio_config"] = output_audio_config
+        if output_audio_config_mask is not None:
+            constant["output_audio_config_mask"] = output_audio_config_mask
+        # Deterministic, so Struct payloads serialize the same each time.
+        self._constant = _pb(self._request_type(constant)).SerializeToString(
+            deterministic=True
+        )
+
+        fields = self._request_type.pb().DESCRIPTOR.fields_by_name
+        self._session_tag = _varint(fields["session"].number << 3 | 2)
+        self._query_input_tag = _varint(fields["query_input"].number << 3 | 2)
+        self._input_audio_tag = _varint(fields["input_audio"].number << 3 | 2)
+
+        transport = client.transport
+        service = self._request_type.pb().DESCRIPTOR.file.package + ".Sessions"
+        # Without a request serializer, gRPC sends the request bytes as is.
+        stub = transport.grpc_channel.unary_unary(
+            "/{}/DetectIntent".format(service),
+            request_serializer=None,
+            response_deserializer=types.DetectIntentResponse.deserialize,
+        )
+        # Send the client info of the client's transport, as its own
+        # detect_intent does.
+        self._client_metadata = _client_metadata(transport)
+        if isinstance(stub, aio.UnaryUnaryMultiCallable):
+            self._call = gapic_v1.method_async.wrap_method(
+                stub,
+                default_retry=retry or DEFAULT_DETECT_INTENT_ASYNC_RETRY,
+                default_timeout=timeout,
+                client_info=None,
+            )
+        else:
+            self._call = gapic_v1.method.wrap_method(
+                stub,
+                default_retry=retry or DEFAULT_DETECT_INTENT_RETRY,
+                default_timeout=timeout,
+                client_info=None,
+            )
+
+    def request_bytes(
+        self, session: str, query_input, *, input_audio: bytes = b"", overrides=None
+    ) -> bytes:
+        """Return the serialized request of one turn.
+
+        Args:
+            session (str): The session name.
+            query_input (Union[dict, QueryInput]): The input of the turn.
+            input_audio (bytes): The audio of the turn, if any.
+            overrides (Union[dict, DetectIntentRequest, None]): Fields
+                merged over those of the template, as protocol buffers
+                merge messages: scalar fields replace the template's,
+                message fields are merged recursively and repeated fields
+                (such as contexts) are appended.
+
+        Returns:
+            bytes: A serialized ``DetectIntentRequest``.
+        """
+        session = session.encode("utf-8")
+        query_input = _pb(self._query_input_type(query_input)).SerializeToString()
+        parts = [
+            self._session_tag,
+            _varint(len(session)),
+            session,
+            self._query_input_tag,
+            _varint(len(query_input)),
+            query_input,
+        ]
+        if input_audio:
+            parts.extend(
+                (self._input_audio_tag, _varint(len(input_audio)), input_audio)
+            )
+        parts.append(self._constant)
+        if overrides is not None:
+            parts.append(_pb(self._request_type(overrides)).SerializeToString())
+        return b"".join(parts)
+
+    def request(self, session: str, query_input, **kwargs):
+        """Return the request of one turn as a ``DetectIntentRequest``.
+
+        This parses :meth:`request_bytes`, for inspecting what is sent.
+        """
+        return self._request_type.deserialize(
+            self.request_bytes(session, query_input, **kwargs)
+        )
+
+    def detect_intent(
+        self,
+        session: str,
+        query_input,
+        *,
+        input_audio: bytes = b"",
+        overrides=None,
+        retry=gapic_v1.method.DEFAULT,
+        timeout=gapic_v1.method.DEFAULT,
+        metadata: Sequence[Tuple[str, str]] = (),
+    ):
+        """Send one turn.
+
+        Args:
+            session (str): The session name.
+            query_input (Union[dict, QueryInput]): The input of the turn.
+            input_audio (bytes): The audio of the turn, if any.
+            overrides (Union[dict, DetectIntentRequest, None]): Fields
+                merged over those of the template; see
+                :meth:`request_bytes`.
+            retry: Designation of what errors, if any, should be retried.
+            timeout (Optional[float]): The timeout for this request. The
+                template's default is used if unset.
+            metadata (Sequence[Tuple[str, str]]): Strings which should be
+                sent along with the request as metadata.
+
+        Returns:
+            DetectIntentResponse: The response, or an awaitable resolving to
+            it with an async client.
+        """
+        request = self.request_bytes(
+            session, query_input, input_audio=input_audio, overrides=overrides
+        )
+        metadata = (
+            tuple(metadata)
+            + self._client_metadata
+            + (gapic_v1.routing_header.to_grpc_metadata((("session", session),)),)
+        )
+        return self._call(request, retry=retry, timeout=timeout, metadata=metadata)
+
+
+__all__ = (
+    "DEFAULT_DETECT_INTENT_ASYNC_RETRY",
+    "DEFAULT_DETECT_INTENT_RETRY",
+    "DEFAULT_DETECT_INTENT_TIMEOUT",
+    "DetectIntentTemplate",
+)
@@ -0,0 +1,555 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Find duplicate training phrases and plan their removal.
+
+Agents accumulate copies of the same training phrase over time, within an
+intent and across intents. Copies slow training down, and a phrase trained
+on two intents makes them conflict. :func:`find_duplicates` analyzes the
+intents returned by ``list_intents`` (with ``INTENT_VIEW_FULL``) locally,
+in three passes:
+
+* ``exact``: phrases with the same parts, annotations included.
+* ``normalized``: phrases with the same text once case, Unicode forms,
+  punctuation and spacing are normalized.
+* ``near``: phrases whose character trigrams are similar, with a Jaccard
+  similarity of at least ``threshold``. Candidates are found with MinHash
+  signatures and locality-sensitive hashing, so the phrases are not
+  compared pairwise.
+
+Each pass runs on one representative of the groups of the previous one.
+The result is a :class:`CleanupPlan`, which does nothing until applied
+through ``batch_update_intents``.
+"""
+
+import collections
+import re
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from google.api_core import gapic_v1  # type: ignore
+
+from google.cloud.dialogflow_helpers import _utils
+
+
+KINDS = ("exact", "normalized", "near")
+
+_SPACES = re.compile(r"\s+")
+# A Mersenne prime above the 32 bit shingle hashes, for the permutations.
+_PRIME = (1 << 61) - 1
+
+
+def _pb(message):
+    if hasattr(type(message), "pb"):
+        return type(message).pb(message)
+    return message
+
+
+class _Punctuation(dict):
+    # A str.translate table replacing punctuation with spaces, filled in
+    # as characters are met.
+    def __missing__(self, code):
+        c = chr(code)
+        self[code] = " " if unicodedata.category(c).startswith("P") else c
+        return self[code]
+
+
+_PUNCTUATION = _Punctuation()
+
+
+def phrase_text(training_phrase) -> str:
+    """Return the text of a training phrase, the concatenation of its parts."""
+    return "".join(part.text for part in _pb(training_phrase).parts)
+
+
+def normalize(text: str) -> str:
+    """Return the normalized form of a text.
+
+    The text is NFKC-normalized and case-folded, punctuation is replaced
+    by spaces and runs of spaces are collapsed.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _SPACES.sub(" ", text.translate(_PUNCTUATION)).strip()
+
+
+class PhraseRef(NamedTuple):
+    """A training phrase of an intent.
+
+    Attributes:
+        intent: The intent name.
+        display_name: The intent display name.
+        index: The position of the phrase in ``Intent.training_phrases``.
+        text: The text of the phrase.
+    """
+
+    intent: str
+    display_name: str
+    index: int
+    text: str
+
+
+class DuplicateGroup(NamedTuple):
+    """Training phrases found to be duplicates of each other.
+
+    Attributes:
+        kind: The pass which grouped them, one of :data:`KINDS`.
+        phrases: The phrases, in the order of the intents.
+        removed: The phrases the plan removes.
+        similarity: The lowest similarity between two phrases that were
+            grouped together; 1.0 for ``exact`` and ``normalized`` groups.
+    """
+
+    kind: str
+    phrases: List[PhraseRef]
+    removed: List[PhraseRef]
+    similarity: float = 1.0
+
+    @property
+    def conflict(self) -> bool:
+        """bool: Whether the phrases belong to more than one intent."""
+        return len({phrase.intent for phrase in self.phrases}) > 1
+
+
+class _UnionFind(object):
+    def __init__(self, size):
+        self._parents = list(range(size))
+
+    def find(self, i):
+        while self._parents[i] != i:
+            self._parents[i] = self._parents[self._parents[i]]
+            i = self._parents[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self._parents[max(i, j)] = min(i, j)
+
+
+def _shingles(text, size=3):
+    padded = " {} ".format(text)
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i : i + size] for i in range(len(padded) - size + 1)}
+
+
+def _bands(num_perm, threshold):
+    # The number of bands b and rows r, with b * r = num_perm, whose
+    # S-curve (1 - (1 - s ** r) ** b) rises at the threshold.
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        distance = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or distance < best[0]:
+            best = (distance, bands, rows)
+    return best[1:]
+
+
+def _signatures(np, shingle_sets, num_perm, seed, batch=4096):
+    known = {}
+
+    def crc32(shingle):
+        value = known.get(shingle)
+        if value is None:
+            value = known[shingle] = zlib.crc32(shingle.encode("utf-8"))
+        return value
+
+    random = np.random.RandomState(seed)
+    a = random.randint(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+    b = random.randint(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint64)
+    start = 0
+    while start < len(shingle_sets):
+        # As many phrases as fit in about ``batch`` shingles.
+        stop, columns = start, 0
+        while stop < len(shingle_sets) and (columns < batch or stop == start):
+            columns += len(shingle_sets[stop])
+            stop += 1
+        sets = shingle_sets[start:stop]
+        hashes = np.fromiter(
+            (crc32(s) for shingles in sets for s in shingles),
+            dtype=np.uint64,
+            count=columns,
+        )
+        offsets = np.cumsum([0] + [len(shingles) for shingles in sets[:-1]])
+        # a * h + b stays below 2 ** 64 for 32 bit a, b and h.
+        permuted = (a * hashes + b) % _PRIME
+        signatures[start:stop] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = stop
+    return signatures
+
+
+def _jaccard(x, y):
+    return len(x & y) / float(len(x | y))
+
+
+def _near_pairs(np, texts, threshold, num_perm, seed):
+    shingle_sets = [_shingles(text) for text in texts]
+    signatures = _signatures(np, shingle_sets, num_perm, seed)
+    bands, rows = _bands(num_perm, threshold)
+    candidates = set()
+    for band in range(bands):
+        buckets = collections.defaultdict(list)
+        keys = signatures[:, band * rows : (band + 1) * rows]
+        for i, key in enumerate(map(bytes, keys)):
+            buckets[key].append(i)
+        for members in buckets.values():
+            for n, i in enumerate(members):
+                candidates.update((i, j) for j in members[n + 1 :])
+    # The signatures only estimate the similarity; check the candidates.
+    for i, j in sorted(candidates):
+        similarity = _jaccard(shingle_sets[i], shingle_sets[j])
+        if similarity >= threshold:
+            yield i, j, similarity
+
+
+class CleanupPlan(object):
+    """The training phrases to remove from an agent's intents.
+
+    Plans are computed by :func:`find_duplicates` and do nothing until
+    :meth:`apply` is called, so they double as a dry run.
+
+    Attributes:
+        groups (List[DuplicateGroup]): The duplicates found, pass by pass.
+        language_code (Optional[str]): The language of the phrases.
+    """
+
+    def __init__(
+        self,
+        intents: Sequence,
+        groups: Sequence[DuplicateGroup],
+        language_code: Optional[str] = None,
+    ) -> None:
+        self._intents = list(intents)
+        self.groups = list(groups)
+        self.language_code = language_code
+
+    @property
+    def conflicts(self) -> List[DuplicateGroup]:
+        """List[DuplicateGroup]: The groups spanning more than one intent.
+
+        Groups merged into a group of a later pass are left out.
+        """
+        last_pass = {}
+        for group in self.groups:
+            for phrase in group.phrases:
+                last_pass[phrase] = group.kind
+        return [
+            group
+            for group in self.groups
+            if group.conflict and last_pass[group.phrases[0]] == group.kind
+        ]
+
+    def summary(self) -> Dict[str, int]:
+        """Return the number of phrases removed by each pass, and of conflicts."""
+        counts = collections.Counter()
+        for group in self.groups:
+            counts[group.kind] += len(group.removed)
+        summary = {kind: counts[kind] for kind in KINDS}
+        summary["conflicts"] = len(self.conflicts)
+        return summary
+
+    def report(self) -> str:
+        """Return a human readable list of the duplicates.
+
+        Returns:
+            str: One line per duplicate phrase other than the one kept,
+            prefixed with ``-`` if the plan removes it, ``!`` if it is
+            kept in another intent (a conflict) and ``=`` if it is kept in
+            the same intent, followed by a summary line.
+        """
+        lines = []
+        removed = set()
+        # The phrases of a group reappear in the groups of later passes.
+        reported = set()
+        for group in self.groups:
+            removed.update(group.removed)
+            keeper = next(p for p in group.phrases if p not in removed)
+            for phrase in group.phrases:
+                if phrase == keeper or phrase in reported:
+                    continue
+                reported.add(phrase)
+                if phrase in group.removed:
+                    prefix = "-"
+                elif phrase.intent != keeper.intent:
+                    prefix = "!"
+                else:
+                    prefix = "="
+                lines.append(
+                    "{} {} {}: {!r} (like {!r} in {})".format(
+                        prefix,
+                        group.kind,
+                        phrase.display_name,
+                        phrase.text,
+                        keeper.text,
+                        keeper.display_name,
+                    )
+                )
+        summary = self.summary()
+        lines.append(
+            ", ".join(
+                "{} {}".format(count, kind) for kind, count in summary.items() if count
+            )
+            or "nothing to do"
+        )
+        return "\n".join(lines)
+
+    def intents(self) -> List:
+        """Return the intents the plan changes, with the phrases to keep.
+
+        Only ``name``, ``display_name`` and ``training_phrases`` are set.
+        """
+        removed = collections.defaultdict(set)
+        for group in self.groups:
+            for phrase in group.removed:
+                removed[phrase.intent].add(phrase.index)
+        updated = []
+        for intent in self._intents:
+            if intent.name not in removed:
+                continue
+            updated.append(
+                type(intent)(
+                    name=intent.name,
+                    display_name=intent.display_name,
+                    training_phrases=[
+                        phrase
+                        for i, phrase in enumerate(intent.training_phrases)
+                        if i not in removed[intent.name]
+                    ],
+                )
+            )
+        return updated
+
+    def apply(
+        self,
+        client,
+        *,
+        retry=gapic_v1.method.DEFAULT,
+        timeout: Optional[float] = None,
+        metadata: Sequence[Tuple[str, str]] = (),
+    ):
+        """Update the intents through ``batch_update_intents``.
+
+        Only the training phrases of the intents are updated.
+
+        Args:
+            client (IntentsClient): A client of the API version the
+                intents were listed with.
+            retry: Designation of what errors, if any, should be retried.
+            timeout (Optional[float]): The timeout for the request.
+            metadata (Sequence[Tuple[str, str]]): Strings which should be
+                sent along with the request as metadata.
+
+        Returns:
+            Optional[google.api_core.operation.Operation]: The long-running
+            operation, or ``None`` if there is nothing to remove.
+
+        Raises:
+            ValueError: If the intents belong to more than one agent.
+        """
+        intents = self.intents()
+        if not intents:
+            return None
+        parents = {intent.name.rsplit("/intents/", 1)[0] for intent in intents}
+        if len(parents) != 1:
+            raise ValueError(
+                "The intents belong to several agents: {}".format(sorted(parents))
+            )
+        request = {
+            "parent": parents.pop(),
+            "intent_batch_inline": {"intents": intents},
+            "update_mask": {"paths": ["training_phrases"]},
+        }
+        if self.language_code:
+            request["language_code"] = self.language_code
+        return client.batch_update_intents(
+            request=_utils.types_module(client).BatchUpdateIntentsRequest(request),
+            retry=retry,
+            timeout=timeout,
+            metadata=metadata,
+        )
+
+
+def find_duplicates(
+    intents: Iterable,
+    *,
+    language_code: Optional[str] = None,
+    remove: Iterable[str] = ("exact", "normalized"),
+    resolve_conflicts: bool = False,
+    near: bool = True,
+    threshold: float = 0.8,
+    num_perm: int = 128,
+    seed: int = 1,
+) -> CleanupPlan:
+    """Find the duplicate training phrases of intents.
+
+    Within a group of duplicates, the phrase with the most annotated parts
+    is kept, the earliest one on ties. A group spanning several intents is
+    a conflict: by default, one phrase is kept in each intent and the
+    conflict is only reported, as deciding which intent is right needs a
+    human.
+
+    .. code-block:: python
+
+        from google.cloud import dialogflow
+        from google.cloud.dialogflow_helpers import training_phrases
+
+        client = dialogflow.IntentsClient()
+        intents = client.list_intents(
+            request={
+                "parent": client.agent_path(project_id),
+                "language_code": "en",
+                "intent_view": dialogflow.IntentView.INTENT_VIEW_FULL,
+            }
+        )
+        plan = training_phrases.find_duplicates(intents, language_code="en")
+        print(plan.report())
+        plan.apply(client).result()
+
+    Args:
+        intents (Iterable[Intent]): The intents, with their training
+            phrases, of any API version.
+        language_code (Optional[str]): The language the intents were
+            listed in, which the plan is applied in.
+        remove (Iterable[str]): The passes whose duplicates are removed;
+            the others are only reported.
+        resolve_conflicts (bool): Remove the phrases of a conflict from
+            every intent but the one with the most training phrases.
+        near (bool): Whether to look for near duplicates, which requires
+            NumPy.
+        threshold (float): The Jaccard similarity of the character
+            trigrams of near duplicates.
+        num_perm (int): The number of MinHash permutations. More find
+            the near duplicates more reliably but take longer.
+        seed (int): The seed of the MinHash permutations.
+
+    Returns:
+        CleanupPlan: The plan.
+    """
+    intents = list(intents)
+    remove = set(remove)
+    unknown = remove - set(KINDS)
+    if unknown:
+        raise ValueError("Unknown duplicate kinds: {}".format(sorted(unknown)))
+
+    refs = []
+    exact = []
+    normalized = []
+    annotated = []
+    sizes = {}
+    for intent in intents:
+        intent_pb = _pb(intent)
+        sizes[intent_pb.name] = len(intent_pb.training_phrases)
+        for index, phrase in enumerate(intent_pb.training_phrases):
+            parts = tuple(
+                (part.text, part.entity_type, part.alias) for part in phrase.parts
+            )
+            text = "".join(part[0] for part in parts)
+            refs.append(PhraseRef(intent_pb.name, intent_pb.display_name, index, text))
+            exact.append((phrase.type_, parts))
+            normalized.append(normalize(text))
+            annotated.append(sum(1 for part in parts if part[1]))
+
+    def preference(i):
+        return (-annotated[i], i)
+
+    groups = []
+    removed_earlier = set()
+    # Representative phrase -> the phrases it stands for in later passes.
+    members = {i: [i] for i in range(len(refs))}
+
+    def run_pass(kind, components, similarities):
+        for component in components:
+            if len(component) < 2:
+                continue
+            everyone = sorted(i for c in component for i in members[c])
+            remaining = [i for i in everyone if i not in removed_earlier]
+            keep = _keepers(remaining, refs, sizes, preference, resolve_conflicts)
+            removed = []
+            if kind in remove:
+                removed = [i for i in remaining if i not in keep]
+                removed_earlier.update(removed)
+            group = DuplicateGroup(
+                kind,
+                [refs[i] for i in everyone],
+                [refs[i] for i in removed],
+                similarities.get(min(component), 1.0),
+            )
+            groups.append(((KINDS.index(kind), everyone[0]), group))
+            representative = min(component, key=preference)
+            for c in component:
+                if c != representative:
+                    members[representative].extend(members.pop(c))
+
+    def by_key(key):
+        components = collections.defaultdict(list)
+        for i in sorted(members):
+            components[key(i)].append(i)
+        return components.values()
+
+    run_pass("exact", by_key(exact.__getitem__), {})
+    run_pass("normalized", by_key(normalized.__getitem__), {})
+    if near:
+        np = _utils.import_optional("numpy", "evaluation")
+        order = sorted(members)
+        texts = [normalized[i] for i in order]
+        union_find = _UnionFind(len(order))
+        lowest = {}
+        for i, j, similarity in _near_pairs(np, texts, threshold, num_perm, seed):
+            lowest[i] = min(lowest.get(i, 1.0), similarity)
+            lowest[j] = min(lowest.get(j, 1.0), similarity)
+            union_find.union(i, j)
+        components = collections.defaultdict(list)
+        for n in range(len(order)):
+            components[union_find.find(n)].append(n)
+        similarities = {}
+        for component in components.values():
+            similarities[order[component[0]]] = min(
+                lowest.get(n, 1.0) for n in component
+            )
+        run_pass(
+            "near",
+            [[order[n] for n in component] for component in components.values()],
+            similarities,
+        )
+
+    groups.sort(key=lambda entry: entry[0])
+    return CleanupPlan(intents, [group for _, group in groups], language_code)
+
+
+def _keepers(positions, refs, sizes, preference, resolve_conflicts):
+    by_intent = collections.defaultdict(list)
+    for i in positions:
+        by_intent[refs[i].intent].append(i)
+    if resolve_conflicts:
+        # The intent with the most phrases, the first one on ties.
+        intent = max(by_intent, key=lambda name: (sizes[name], -by_intent[name][0]))
+        return {min(by_intent[intent], key=preference)}
+    return {min(indices, key=preference) for indices in by_intent.values()}
+
+
+__all__ = (
+    "CleanupPlan",
+    "DuplicateGroup",
+    "KINDS",
+    "PhraseRef",
+    "find_duplicates",
+    "normalize",
+    "phrase_text",
+)
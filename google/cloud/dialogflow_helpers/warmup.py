@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Take credential and connection setup off the first request's path.
+
+A new client resolves its credentials when it is constructed, but fetches
+an OAuth token and connects its channel during the first call. Calling
+:func:`warm_up` right after creating the client does both ahead of time,
+and can keep the token fresh in a background thread so that no call ever
+waits for a token refresh:
+
+.. code-block:: python
+
+    from google.cloud import dialogflow
+    from google.cloud.dialogflow_helpers import warmup
+
+    client = dialogflow.SessionsClient()
+    refresher = warmup.warm_up(client, timeout=10)
+    ...
+    refresher.stop()
+
+The token refreshed is the one of the transport's credentials. When the
+credentials need scopes (for example service account credentials created
+without them), the channel authenticates with a scoped copy that cannot be
+reached; pass credentials that are already scoped instead, e.g.
+``credentials.with_scopes(SessionsClient.get_transport_class().AUTH_SCOPES)``.
+"""
+
+import asyncio
+import datetime
+import logging
+import threading
+import warnings
+from typing import Optional
+
+import grpc  # type: ignore
+
+from google.api_core import exceptions  # type: ignore
+from google.auth.transport import requests as auth_requests  # type: ignore
+
+
+_LOGGER = logging.getLogger(__name__)
+
+# Ahead of the point where google-auth itself considers a token expired.
+DEFAULT_REFRESH_MARGIN = 300.0
+
+
+def _transport(client_or_transport):
+    return getattr(client_or_transport, "transport", client_or_transport)
+
+
+def _refresh_needed(credentials, margin):
+    if not credentials.valid:
+        return True
+    expiry = getattr(credentials, "expiry", None)
+    if expiry is None:
+        return False
+    remaining = (expiry - datetime.datetime.utcnow()).total_seconds()
+    return remaining <= margin
+
+
+def refresh_credentials(credentials, *, margin: float = DEFAULT_REFRESH_MARGIN) -> bool:
+    """Refresh credentials unless their token is valid for ``margin`` more
+    seconds.
+
+    Args:
+        credentials (google.auth.credentials.Credentials): The credentials.
+        margin (float): The minimum remaining token lifetime, in seconds.
+
+    Returns:
+        bool: Whether the credentials were refreshed.
+    """
+    if not _refresh_needed(credentials, margin):
+        return False
+    credentials.refresh(auth_requests.Request())
+    return True
+
+
+class TokenRefresher(object):
+    """Refresh credentials in a daemon thread before their token expires.
+
+    Args:
+        credentials (google.auth.credentials.Credentials): The credentials
+            to keep fresh.
+        margin (float): Refresh this many seconds before expiry. It must
+            be larger than the threshold at which google-auth considers a
+            token expired (225 seconds in recent versions), or calls may
+            still refresh inline. Tokens living less than ``margin`` are
+            refreshed halfway through their lifetime instead.
+        min_interval (float): The minimum number of seconds between two
+            refreshes, however short-lived the tokens.
+        retry_interval (float): Seconds to wait after a failed refresh,
+            doubled after each further failure.
+        max_retry_interval (float): The longest wait after failures.
+    """
+
+    def __init__(
+        self,
+        credentials,
+        *,
+        margin: float = DEFAULT_REFRESH_MARGIN,
+        min_interval: float = 1.0,
+        retry_interval: float = 10.0,
+        max_retry_interval: float = 300.0,
+    ) -> None:
+        self._credentials = credentials
+        self._margin = margin
+        self._min_interval = min_interval
+        self._retry_interval = retry_interval
+        self._max_retry_interval = max_retry_interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="dialogflow-token-refresher", daemon=True
+        )
+
+    def start(self) -> "TokenRefresher":
+        """Start the refresh thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the refresh thread."""
+        self._stopped.set()
+
+    @property
+    def running(self) -> bool:
+        """Whether the refresh thread is alive."""
+        return self._thread.is_alive()
+
+    def _delay(self):
+        expiry = getattr(self._credentials, "expiry", None)
+        if expiry is None:
+            return None
+        remaining = (expiry - datetime.datetime.utcnow()).total_seconds()
+        # Without the floors, a token living less than the margin would be
+        # refreshed again as soon as it was fetched.
+        return max(self._min_interval, remaining - self._margin, remaining / 2)
+
+    def _run(self):
+        retry_interval = self._retry_interval
+        while not self._stopped.is_set():
+            delay = self._delay()
+            if delay is None:
+                # The token does not expire; there is nothing to do.
+                return
+            if self._stopped.wait(delay):
+                return
+            try:
+                # Refresh whenever woken up: the delay already decided it.
+                self._credentials.refresh(auth_requests.Request())
+            except Exception:
+                _LOGGER.warning(
+                    "Token refresh failed; retrying in %s seconds.",
+                    retry_interval,
+                    exc_info=True,
+                )
+                if self._stopped.wait(retry_interval):
+                    return
+                retry_interval = min(retry_interval * 2, self._max_retry_interval)
+            else:
+                retry_interval = self._retry_interval
+
+
+def _check_scopes(credentials):
+    if getattr(credentials, "requires_scopes", False):
+        warnings.warn(
+            "The credentials require scopes, so the channel uses a scoped "
+            "copy which warm_up() cannot refresh. Pass scoped credentials.",
+            RuntimeWarning,
+        )
+
+
+def warm_up(
+    client,
+    *,
+    timeout: Optional[float] = None,
+    refresh_in_background: bool = True,
+    refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+) -> Optional[TokenRefresher]:
+    """Fetch a token and connect the channel of a client ahead of time.
+
+    Args:
+        client: A synchronous client or transport of any service and API
+            version, using gRPC.
+        timeout (Optional[float]): Seconds to wait for the channel to be
+            ready; by default there is no limit.
+        refresh_in_background (bool): Whether to keep refreshing the token
+            before it expires.
+        refresh_margin (float): How many seconds before expiry to refresh.
+
+    Returns:
+        Optional[TokenRefresher]: The running background refresher, if
+        one was requested and the token expires.
+
+    Raises:
+        google.api_core.exceptions.DeadlineExceeded: If the channel was
+            not ready within ``timeout``.
+        google.auth.exceptions.RefreshError: If the token could not be
+            fetched.
+    """
+    transport = _transport(client)
+    credentials = transport._credentials
+    _check_scopes(credentials)
+    refresh_credentials(credentials, margin=refresh_margin)
+
+    try:
+        grpc.channel_ready_future(transport.grpc_channel).result(timeout=timeout)
+    except grpc.FutureTimeoutError:
+        raise exceptions.DeadlineExceeded(
+            "Channel to {} not ready after {} seconds.".format(transport._host, timeout)
+        )
+
+    if refresh_in_background and getattr(credentials, "expiry", None) is not None:
+        return TokenRefresher(credentials, margin=refresh_margin).start()
+    return None
+
+
+async def warm_up_async(
+    client,
+    *,
+    timeout: Optional[float] = None,
+    refresh_in_background: bool = True,
+    refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+) -> Optional[TokenRefresher]:
+    """Asynchronous version of :func:`warm_up` for ``AsyncClient`` objects.
+
+    The token is fetched in the default executor so the event loop is not
+    blocked.
+
+    Args:
+        client: An asynchronous client or transport.
+        timeout (Optional[float]): Seconds to wait for the channel to be
+            ready; by default there is no limit.
+        refresh_in_background (bool): Whether to keep refreshing the token
+            before it expires.
+        refresh_margin (float): How many seconds before expiry to refresh.
+
+    Returns:
+        Optional[TokenRefresher]: The running background refresher, if
+        one was requested and the token expires.
+
+    Raises:
+        google.api_core.exceptions.DeadlineExceeded: If the channel was
+            not ready within ``timeout``.
+    """
+    transport = _transport(client)
+    credentials = transport._credentials
+    _check_scopes(credentials)
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(
+        None, lambda: refresh_credentials(credentials, margin=refresh_margin)
+    )
+
+    try:
+        await asyncio.wait_for(transport.grpc_channel.channel_ready(), timeout)
+    except asyncio.TimeoutError:
+        raise exceptions.DeadlineExceeded(
+            "Channel to {} not ready after {} seconds.".format(transport._host, timeout)
+        )
+
+    if refresh_in_background and getattr(credentials, "expiry", None) is not None:
+        return TokenRefresher(credentials, margin=refresh_margin).start()
+    return None
+
+
+__all__ = (
+    "TokenRefresher",
+    "refresh_credentials",
+    "warm_up",
+    "warm_up_async",
+)
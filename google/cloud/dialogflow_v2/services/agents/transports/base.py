@@ -17,7 +17,6 @@
 
 import abc
 import typing
-import pkg_resources
 
 from google import auth  # type: ignore
 from google.api_core import exceptions  # type: ignore
@@ -26,6 +25,7 @@ from google.api_core import retry as retries  # type: ignore
 from google.api_core import operations_v1  # type: ignore
 from google.auth import credentials  # type: ignore
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2.types import agent
 from google.cloud.dialogflow_v2.types import agent as gcd_agent
 from google.cloud.dialogflow_v2.types import validation_result
@@ -33,14 +33,7 @@ from google.longrunning import operations_pb2 as operations  # type: ignore
 from google.protobuf import empty_pb2 as empty  # type: ignore
 
 
-try:
-    DEFAULT_CLIENT_INFO = gapic_v1.client_info.ClientInfo(
-        gapic_version=pkg_resources.get_distribution(
-            "google-cloud-dialogflow",
-        ).version,
-    )
-except pkg_resources.DistributionNotFound:
-    DEFAULT_CLIENT_INFO = gapic_v1.client_info.ClientInfo()
+DEFAULT_CLIENT_INFO = dialogflow_common.default_client_info()
 
 
 class AgentsTransport(abc.ABC):
@@ -16,21 +16,18 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2.types import conversation
 from google.cloud.dialogflow_v2.types import participant
 
 
-class ListConversationsPager:
+class ListConversationsPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_conversations`` requests.
 
     This class thinly wraps an initial
@@ -48,6 +45,8 @@ class ListConversationsPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "conversations"
+
     def __init__(
         self,
         method: Callable[..., conversation.ListConversationsResponse],
@@ -73,26 +72,8 @@ class ListConversationsPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[conversation.ListConversationsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[conversation.Conversation]:
-        for page in self.pages:
-            yield from page.conversations
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class ListConversationsAsyncPager:
+class ListConversationsAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_conversations`` requests.
 
     This class thinly wraps an initial
@@ -110,6 +91,8 @@ class ListConversationsAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "conversations"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[conversation.ListConversationsResponse]],
@@ -135,30 +118,8 @@ class ListConversationsAsyncPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[conversation.ListConversationsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[conversation.Conversation]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.conversations:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
 
-class ListMessagesPager:
+class ListMessagesPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_messages`` requests.
 
     This class thinly wraps an initial
@@ -176,6 +137,8 @@ class ListMessagesPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "messages"
+
     def __init__(
         self,
         method: Callable[..., conversation.ListMessagesResponse],
@@ -201,26 +164,8 @@ class ListMessagesPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[conversation.ListMessagesResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[participant.Message]:
-        for page in self.pages:
-            yield from page.messages
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class ListMessagesAsyncPager:
+class ListMessagesAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_messages`` requests.
 
     This class thinly wraps an initial
@@ -238,6 +183,8 @@ class ListMessagesAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "messages"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[conversation.ListMessagesResponse]],
@@ -262,25 +209,3 @@ class ListMessagesAsyncPager:
         self._request = conversation.ListMessagesRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[conversation.ListMessagesResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[participant.Message]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.messages:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
@@ -16,20 +16,17 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2.types import intent
 
 
-class ListIntentsPager:
+class ListIntentsPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_intents`` requests.
 
     This class thinly wraps an initial
@@ -47,6 +44,8 @@ class ListIntentsPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "intents"
+
     def __init__(
         self,
         method: Callable[..., intent.ListIntentsResponse],
@@ -72,26 +71,8 @@ class ListIntentsPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[intent.ListIntentsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[intent.Intent]:
-        for page in self.pages:
-            yield from page.intents
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class ListIntentsAsyncPager:
+class ListIntentsAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_intents`` requests.
 
     This class thinly wraps an initial
@@ -109,6 +90,8 @@ class ListIntentsAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "intents"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[intent.ListIntentsResponse]],
@@ -133,25 +116,3 @@ class ListIntentsAsyncPager:
         self._request = intent.ListIntentsRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[intent.ListIntentsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[intent.Intent]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.intents:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
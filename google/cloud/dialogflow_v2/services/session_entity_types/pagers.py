@@ -16,20 +16,17 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2.types import session_entity_type
 
 
-class ListSessionEntityTypesPager:
+class ListSessionEntityTypesPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_session_entity_types`` requests.
 
     This class thinly wraps an initial
@@ -47,6 +44,8 @@ class ListSessionEntityTypesPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "session_entity_types"
+
     def __init__(
         self,
         method: Callable[..., session_entity_type.ListSessionEntityTypesResponse],
@@ -72,26 +71,8 @@ class ListSessionEntityTypesPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[session_entity_type.ListSessionEntityTypesResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[session_entity_type.SessionEntityType]:
-        for page in self.pages:
-            yield from page.session_entity_types
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
 
-class ListSessionEntityTypesAsyncPager:
+class ListSessionEntityTypesAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_session_entity_types`` requests.
 
     This class thinly wraps an initial
@@ -109,6 +90,8 @@ class ListSessionEntityTypesAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "session_entity_types"
+
     def __init__(
         self,
         method: Callable[
@@ -135,27 +118,3 @@ class ListSessionEntityTypesAsyncPager:
         self._request = session_entity_type.ListSessionEntityTypesRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(
-        self,
-    ) -> AsyncIterable[session_entity_type.ListSessionEntityTypesResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[session_entity_type.SessionEntityType]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.session_entity_types:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
@@ -16,20 +16,17 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2beta1.types import agent
 
 
-class SearchAgentsPager:
+class SearchAgentsPager(dialogflow_common.Pager):
     """A pager for iterating through ``search_agents`` requests.
 
     This class thinly wraps an initial
@@ -47,6 +44,8 @@ class SearchAgentsPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "agents"
+
     def __init__(
         self,
         method: Callable[..., agent.SearchAgentsResponse],
@@ -72,26 +71,8 @@ class SearchAgentsPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[agent.SearchAgentsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[agent.Agent]:
-        for page in self.pages:
-            yield from page.agents
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class SearchAgentsAsyncPager:
+class SearchAgentsAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``search_agents`` requests.
 
     This class thinly wraps an initial
@@ -109,6 +90,8 @@ class SearchAgentsAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "agents"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[agent.SearchAgentsResponse]],
@@ -133,25 +116,3 @@ class SearchAgentsAsyncPager:
         self._request = agent.SearchAgentsRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[agent.SearchAgentsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[agent.Agent]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.agents:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
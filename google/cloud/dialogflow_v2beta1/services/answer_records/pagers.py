@@ -16,20 +16,17 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2beta1.types import answer_record
 
 
-class ListAnswerRecordsPager:
+class ListAnswerRecordsPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_answer_records`` requests.
 
     This class thinly wraps an initial
@@ -47,6 +44,8 @@ class ListAnswerRecordsPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "answer_records"
+
     def __init__(
         self,
         method: Callable[..., answer_record.ListAnswerRecordsResponse],
@@ -72,26 +71,8 @@ class ListAnswerRecordsPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[answer_record.ListAnswerRecordsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[answer_record.AnswerRecord]:
-        for page in self.pages:
-            yield from page.answer_records
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class ListAnswerRecordsAsyncPager:
+class ListAnswerRecordsAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_answer_records`` requests.
 
     This class thinly wraps an initial
@@ -109,6 +90,8 @@ class ListAnswerRecordsAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "answer_records"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[answer_record.ListAnswerRecordsResponse]],
@@ -133,25 +116,3 @@ class ListAnswerRecordsAsyncPager:
         self._request = answer_record.ListAnswerRecordsRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[answer_record.ListAnswerRecordsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[answer_record.AnswerRecord]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.answer_records:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
@@ -16,20 +16,17 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2beta1.types import context
 
 
-class ListContextsPager:
+class ListContextsPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_contexts`` requests.
 
     This class thinly wraps an initial
@@ -47,6 +44,8 @@ class ListContextsPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "contexts"
+
     def __init__(
         self,
         method: Callable[..., context.ListContextsResponse],
@@ -72,26 +71,8 @@ class ListContextsPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[context.ListContextsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[context.Context]:
-        for page in self.pages:
-            yield from page.contexts
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class ListContextsAsyncPager:
+class ListContextsAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_contexts`` requests.
 
     This class thinly wraps an initial
@@ -109,6 +90,8 @@ class ListContextsAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "contexts"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[context.ListContextsResponse]],
@@ -133,25 +116,3 @@ class ListContextsAsyncPager:
         self._request = context.ListContextsRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[context.ListContextsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[context.Context]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.contexts:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
@@ -16,20 +16,17 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2beta1.types import conversation_profile
 
 
-class ListConversationProfilesPager:
+class ListConversationProfilesPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_conversation_profiles`` requests.
 
     This class thinly wraps an initial
@@ -47,6 +44,8 @@ class ListConversationProfilesPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "conversation_profiles"
+
     def __init__(
         self,
         method: Callable[..., conversation_profile.ListConversationProfilesResponse],
@@ -72,26 +71,8 @@ class ListConversationProfilesPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[conversation_profile.ListConversationProfilesResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[conversation_profile.ConversationProfile]:
-        for page in self.pages:
-            yield from page.conversation_profiles
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
 
-class ListConversationProfilesAsyncPager:
+class ListConversationProfilesAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_conversation_profiles`` requests.
 
     This class thinly wraps an initial
@@ -109,6 +90,8 @@ class ListConversationProfilesAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "conversation_profiles"
+
     def __init__(
         self,
         method: Callable[
@@ -135,27 +118,3 @@ class ListConversationProfilesAsyncPager:
         self._request = conversation_profile.ListConversationProfilesRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(
-        self,
-    ) -> AsyncIterable[conversation_profile.ListConversationProfilesResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[conversation_profile.ConversationProfile]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.conversation_profiles:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
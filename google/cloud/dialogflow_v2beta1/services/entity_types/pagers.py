@@ -16,20 +16,17 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2beta1.types import entity_type
 
 
-class ListEntityTypesPager:
+class ListEntityTypesPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_entity_types`` requests.
 
     This class thinly wraps an initial
@@ -47,6 +44,8 @@ class ListEntityTypesPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "entity_types"
+
     def __init__(
         self,
         method: Callable[..., entity_type.ListEntityTypesResponse],
@@ -72,26 +71,8 @@ class ListEntityTypesPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[entity_type.ListEntityTypesResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[entity_type.EntityType]:
-        for page in self.pages:
-            yield from page.entity_types
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class ListEntityTypesAsyncPager:
+class ListEntityTypesAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_entity_types`` requests.
 
     This class thinly wraps an initial
@@ -109,6 +90,8 @@ class ListEntityTypesAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "entity_types"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[entity_type.ListEntityTypesResponse]],
@@ -133,25 +116,3 @@ class ListEntityTypesAsyncPager:
         self._request = entity_type.ListEntityTypesRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[entity_type.ListEntityTypesResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[entity_type.EntityType]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.entity_types:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
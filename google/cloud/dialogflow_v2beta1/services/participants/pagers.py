@@ -16,20 +16,17 @@
 #
 
 from typing import (
-    Any,
-    AsyncIterable,
     Awaitable,
     Callable,
-    Iterable,
     Sequence,
     Tuple,
-    Optional,
 )
 
+from google.cloud import dialogflow_common
 from google.cloud.dialogflow_v2beta1.types import participant
 
 
-class ListParticipantsPager:
+class ListParticipantsPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_participants`` requests.
 
     This class thinly wraps an initial
@@ -47,6 +44,8 @@ class ListParticipantsPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "participants"
+
     def __init__(
         self,
         method: Callable[..., participant.ListParticipantsResponse],
@@ -72,26 +71,8 @@ class ListParticipantsPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[participant.ListParticipantsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[participant.Participant]:
-        for page in self.pages:
-            yield from page.participants
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class ListParticipantsAsyncPager:
+class ListParticipantsAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_participants`` requests.
 
     This class thinly wraps an initial
@@ -109,6 +90,8 @@ class ListParticipantsAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "participants"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[participant.ListParticipantsResponse]],
@@ -134,30 +117,8 @@ class ListParticipantsAsyncPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[participant.ListParticipantsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[participant.Participant]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.participants:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
 
-class ListSuggestionsPager:
+class ListSuggestionsPager(dialogflow_common.Pager):
     """A pager for iterating through ``list_suggestions`` requests.
 
     This class thinly wraps an initial
@@ -175,6 +136,8 @@ class ListSuggestionsPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "suggestions"
+
     def __init__(
         self,
         method: Callable[..., participant.ListSuggestionsResponse],
@@ -200,26 +163,8 @@ class ListSuggestionsPager:
         self._response = response
         self._metadata = metadata
 
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    def pages(self) -> Iterable[participant.ListSuggestionsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __iter__(self) -> Iterable[participant.Suggestion]:
-        for page in self.pages:
-            yield from page.suggestions
 
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
-
-
-class ListSuggestionsAsyncPager:
+class ListSuggestionsAsyncPager(dialogflow_common.AsyncPager):
     """A pager for iterating through ``list_suggestions`` requests.
 
     This class thinly wraps an initial
@@ -237,6 +182,8 @@ class ListSuggestionsAsyncPager:
     the most recent response is retained, and thus used for attribute lookup.
     """
 
+    _items_field = "suggestions"
+
     def __init__(
         self,
         method: Callable[..., Awaitable[participant.ListSuggestionsResponse]],
@@ -261,25 +208,3 @@ class ListSuggestionsAsyncPager:
         self._request = participant.ListSuggestionsRequest(request)
         self._response = response
         self._metadata = metadata
-
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._response, name)
-
-    @property
-    async def pages(self) -> AsyncIterable[participant.ListSuggestionsResponse]:
-        yield self._response
-        while self._response.next_page_token:
-            self._request.page_token = self._response.next_page_token
-            self._response = await self._method(self._request, metadata=self._metadata)
-            yield self._response
-
-    def __aiter__(self) -> AsyncIterable[participant.Suggestion]:
-        async def async_generator():
-            async for page in self.pages:
-                for response in page.suggestions:
-                    yield response
-
-        return async_generator()
-
-    def __repr__(self) -> str:
-        return "{0}<{1!r}>".format(self.__class__.__name__, self._response)
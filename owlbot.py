@@ -14,6 +14,8 @@
 
 """This script is used to synthesize generated parts of this library."""
 
+import re
+
 import synthtool as s
 from synthtool import gcp
 from synthtool.languages import python
@@ -27,6 +29,20 @@ for library in s.get_staging_dirs(default_version):
 
 s.remove_staging_dirs()
 
+# The generated keyword fixup scripts take their command line, with its
+# parallel, cached and in-place modes, from the hand-written
+# scripts/keyword_fixup.py.
+s.replace(
+    "scripts/fixup_dialogflow_*_keywords.py",
+    r"\nif __name__ == '__main__':\n.*",
+    "\nif __name__ == '__main__':\n"
+    "    # The command line is shared by the scripts of every API version.\n"
+    "    import keyword_fixup\n"
+    "\n"
+    "    keyword_fixup.main(dialogflowCallTransformer())\n",
+    flags=re.DOTALL,
+)
+
 # # ----------------------------------------------------------------------------
 # # Add templated files
 # # ----------------------------------------------------------------------------
@@ -46,4 +62,8 @@ s.replace(
     "",
 )
 
+# Share the client, transport and pager machinery of every service through
+# google.cloud.dialogflow_common instead of a copy per service.
+s.shell.run(["python", "scripts/use_common_runtime.py"], hide_output=False)
+
 s.shell.run(["nox", "-s", "blacken"], hide_output=False)
\ No newline at end of file
@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""DialogFlow API load generator for Detect Intent.
+
+Sends text queries through ``detect_intent`` and ``streaming_detect_intent``
+at a target rate, with Poisson arrivals, and reports the latency
+percentiles of each method. Every call goes over the one channel of a
+single ``SessionsAsyncClient``, so the calls in flight are multiplexed on
+the same connection.
+
+The arrivals are open-loop: a request is sent when it is due, whether or
+not the earlier ones have completed. Latency is measured from the time the
+request was due rather than the time it was sent, so the time a request
+spends waiting behind a slow sender is counted too (the correction for
+coordinated omission). The uncorrected service times are reported as well.
+
+Without ``--project-id``, the load goes to a local stand-in for the
+Sessions service, whose response times are exponentially distributed.
+
+Examples:
+  python load_generator.py -h
+  python load_generator.py --qps 200 --duration 10
+  python load_generator.py --project-id PROJECT_ID \
+  --qps 20 --duration 60 --streaming-fraction 0.5 "hello" "book a room"
+"""
+
+import argparse
+import asyncio
+import collections
+import math
+import random
+import time
+import uuid
+
+import grpc
+
+
+class Histogram(object):
+    """A log-linear histogram of latencies, in the manner of HdrHistogram.
+
+    Values are kept with a relative precision of ``significant_figures``
+    decimal digits, whatever their magnitude, in memory proportional to the
+    logarithm of the largest value.
+    """
+
+    def __init__(self, significant_figures=3, unit=1e-6):
+        # Values below 2 ** bits are recorded exactly; above that, each
+        # power of two is split in 2 ** (bits - 1) buckets.
+        self._bits = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self._half = 1 << (self._bits - 1)
+        self._unit = unit
+        self._counts = collections.Counter()
+        self.total = 0
+        self.max = 0.0
+
+    def _index(self, value):
+        shift = max(0, value.bit_length() - self._bits)
+        return shift * self._half + (value >> shift)
+
+    def _highest(self, index):
+        if index < 2 * self._half:
+            return index
+        shift = index // self._half - 1
+        return ((index - shift * self._half) << shift) + (1 << shift) - 1
+
+    def record(self, seconds):
+        """Add a latency, in seconds."""
+        self._counts[self._index(max(0, int(seconds / self._unit)))] += 1
+        self.total += 1
+        self.max = max(self.max, seconds)
+
+    def add(self, other):
+        """Add the latencies of another histogram of the same precision."""
+        self._counts.update(other._counts)
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """Return the latency, in seconds, under which ``percent`` of them fall."""
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100.0 * self.total))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(self._highest(index) * self._unit, self.max)
+        return self.max
+
+
+class MethodStats(object):
+    """The latencies and errors of one method."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.service_time = Histogram()
+        self.errors = collections.Counter()
+
+
+class StandInSessions(object):
+    """A local server answering Detect Intent like the Sessions service.
+
+    Each query is answered after an exponentially distributed delay with
+    a mean of ``service_time`` seconds.
+    """
+
+    def __init__(self, service_time=0.01, version="v2"):
+        self.service_time = service_time
+        self.version = version
+        self.address = None
+        self._server = None
+
+    def _types(self):
+        from google.cloud import dialogflow_v2, dialogflow_v2beta1
+
+        return {"v2": dialogflow_v2, "v2beta1": dialogflow_v2beta1}[self.version]
+
+    def _result(self, request):
+        types = self._types()
+        text = request.query_input.text.text
+        return types.QueryResult(
+            query_text=text,
+            language_code=request.query_input.text.language_code,
+            fulfillment_text="You said: {}".format(text),
+            intent_detection_confidence=1.0,
+        )
+
+    async def _delay(self):
+        await asyncio.sleep(random.expovariate(1.0 / self.service_time))
+
+    async def detect_intent(self, request, context):
+        await self._delay()
+        return self._types().DetectIntentResponse(
+            response_id=str(uuid.uuid4()), query_result=self._result(request)
+        )
+
+    async def streaming_detect_intent(self, request_iterator, context):
+        first = None
+        async for request in request_iterator:
+            first = first or request
+        await self._delay()
+        yield self._types().StreamingDetectIntentResponse(
+            response_id=str(uuid.uuid4()), query_result=self._result(first)
+        )
+
+    async def start(self, port=0):
+        """Start serving on localhost, and return the address."""
+        types = self._types()
+        handler = grpc.method_handlers_generic_handler(
+            "google.cloud.dialogflow.{}.Sessions".format(self.version),
+            {
+                "DetectIntent": grpc.unary_unary_rpc_method_handler(
+                    self.detect_intent,
+                    request_deserializer=types.DetectIntentRequest.deserialize,
+                    response_serializer=types.DetectIntentResponse.serialize,
+                ),
+                "StreamingDetectIntent": grpc.stream_stream_rpc_method_handler(
+                    self.streaming_detect_intent,
+                    request_deserializer=types.StreamingDetectIntentRequest.deserialize,
+                    response_serializer=types.StreamingDetectIntentResponse.serialize,
+                ),
+            },
+        )
+        self._server = grpc.aio.server()
+        self._server.add_generic_rpc_handlers((handler,))
+        port = self._server.add_insecure_port("localhost:{}".format(port))
+        await self._server.start()
+        self.address = "localhost:{}".format(port)
+        return self.address
+
+    async def stop(self):
+        await self._server.stop(None)
+
+
+def stand_in_client(address):
+    """Return a Sessions client talking to the stand-in at ``address``."""
+    from google.cloud import dialogflow
+    from google.cloud.dialogflow_v2.services.sessions.transports import (
+        SessionsGrpcAsyncIOTransport,
+    )
+
+    channel = grpc.aio.insecure_channel(address)
+    return dialogflow.SessionsAsyncClient(
+        transport=SessionsGrpcAsyncIOTransport(channel=channel)
+    )
+
+
+async def _detect_intent(client, session, query_input):
+    await client.detect_intent(request={"session": session, "query_input": query_input})
+
+
+async def _streaming_detect_intent(client, session, query_input):
+    from google.cloud import dialogflow
+
+    async def requests():
+        yield dialogflow.StreamingDetectIntentRequest(
+            session=session, query_input=query_input
+        )
+
+    responses = await client.streaming_detect_intent(requests=requests())
+    async for _ in responses:
+        pass
+
+
+_METHODS = {
+    "detect_intent": _detect_intent,
+    "streaming_detect_intent": _streaming_detect_intent,
+}
+
+
+async def generate_load(
+    client,
+    project_id,
+    texts,
+    qps,
+    duration,
+    streaming_fraction=0.0,
+    sessions=100,
+    language_code="en-US",
+    timeout=30.0,
+):
+    """Send queries at ``qps`` for ``duration`` seconds.
+
+    Returns:
+        Dict[str, MethodStats]: The statistics of each method.
+    """
+    from google.cloud import dialogflow
+
+    stats = {name: MethodStats() for name in _METHODS}
+    session_paths = [
+        client.session_path(project_id, str(uuid.uuid4())) for _ in range(sessions)
+    ]
+    query_inputs = [
+        dialogflow.QueryInput(
+            text=dialogflow.TextInput(text=text, language_code=language_code)
+        )
+        for text in texts
+    ]
+
+    async def call(name, due):
+        method_stats = stats[name]
+        sent = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                _METHODS[name](
+                    client, random.choice(session_paths), random.choice(query_inputs)
+                ),
+                timeout,
+            )
+        except Exception as e:
+            method_stats.errors[type(e).__name__] += 1
+            return
+        done = time.monotonic()
+        method_stats.latency.record(done - due)
+        method_stats.service_time.record(done - sent)
+
+    tasks = []
+    start = time.monotonic()
+    due = start
+    while True:
+        due += random.expovariate(qps)
+        if due - start >= duration:
+            break
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if random.random() < streaming_fraction:
+            name = "streaming_detect_intent"
+        else:
+            name = "detect_intent"
+        tasks.append(asyncio.ensure_future(call(name, due)))
+
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def report(stats, elapsed=None):
+    """Return the latency percentiles of each method, as a table."""
+    lines = []
+    columns = "{:<24} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9}"
+    for title, attr in (
+        ("latency (from the time each request was due)", "latency"),
+        ("service time (from the time each request was sent)", "service_time"),
+    ):
+        lines.append(title)
+        lines.append(
+            columns.format(
+                "method", "count", "errors", "p50 ms", "p99 ms", "p99.9 ms", "max ms"
+            )
+        )
+        for name, method_stats in sorted(stats.items()):
+            histogram = getattr(method_stats, attr)
+            if not histogram.total and not method_stats.errors:
+                continue
+            lines.append(
+                columns.format(
+                    name,
+                    histogram.total,
+                    sum(method_stats.errors.values()),
+                    *(
+                        "{:.2f}".format(1e3 * value)
+                        for value in (
+                            histogram.percentile(50),
+                            histogram.percentile(99),
+                            histogram.percentile(99.9),
+                            histogram.max,
+                        )
+                    )
+                )
+            )
+        lines.append("")
+    for name, method_stats in sorted(stats.items()):
+        for error, count in method_stats.errors.most_common():
+            lines.append("{}: {} x {}".format(name, count, error))
+    if elapsed:
+        total = sum(s.latency.total for s in stats.values())
+        lines.append("achieved {:.1f} successful calls/s".format(total / elapsed))
+    return "\n".join(lines)
+
+
+async def main(args):
+    from google.cloud import dialogflow
+
+    stand_in = None
+    if args.project_id:
+        client = dialogflow.SessionsAsyncClient()
+        project_id = args.project_id
+    else:
+        stand_in = StandInSessions(service_time=args.stand_in_service_time)
+        client = stand_in_client(await stand_in.start())
+        project_id = "stand-in"
+
+    try:
+        start = time.monotonic()
+        stats = await generate_load(
+            client,
+            project_id,
+            args.texts,
+            args.qps,
+            args.duration,
+            streaming_fraction=args.streaming_fraction,
+            sessions=args.sessions,
+            language_code=args.language_code,
+        )
+        print(report(stats, time.monotonic() - start))
+    finally:
+        if stand_in:
+            await stand_in.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--project-id",
+        help="Project/agent id. Defaults to sending the load to a local stand-in.",
+    )
+    parser.add_argument(
+        "--qps", type=float, default=50.0, help="Mean arrival rate, in calls/s."
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="Length of the run, in seconds."
+    )
+    parser.add_argument(
+        "--streaming-fraction",
+        type=float,
+        default=0.0,
+        help="Fraction of the calls made through streaming_detect_intent.",
+    )
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        default=100,
+        help="Number of sessions the queries are spread across.",
+    )
+    parser.add_argument(
+        "--language-code",
+        help='Language code of the queries. Defaults to "en-US".',
+        default="en-US",
+    )
+    parser.add_argument(
+        "--stand-in-service-time",
+        type=float,
+        default=0.01,
+        help="Mean response time of the local stand-in, in seconds.",
+    )
+    parser.add_argument(
+        "texts", nargs="*", default=["hello"], help="Text queries to send."
+    )
+
+    # asyncio.run() needs Python 3.7; these samples still run on 3.6.
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
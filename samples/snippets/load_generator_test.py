@@ -0,0 +1,60 @@
+# Copyright 2021, Google LLC
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import asyncio
+
+from load_generator import (
+    Histogram,
+    StandInSessions,
+    generate_load,
+    report,
+    stand_in_client,
+)
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(significant_figures=2)
+    for ms in range(1, 1001):
+        histogram.record(ms / 1e3)
+
+    assert histogram.total == 1000
+    assert abs(histogram.percentile(50) - 0.5) < 0.5 * 0.01
+    assert abs(histogram.percentile(99) - 0.99) < 0.99 * 0.01
+    assert histogram.percentile(100) == histogram.max == 1.0
+
+
+def test_generate_load_against_stand_in():
+    async def run():
+        stand_in = StandInSessions(service_time=0.001)
+        client = stand_in_client(await stand_in.start())
+        try:
+            return await generate_load(
+                client, "stand-in", ["hello"], 200, 0.5, streaming_fraction=0.5
+            )
+        finally:
+            await stand_in.stop()
+
+    # asyncio.run() needs Python 3.7; these samples still run on 3.6.
+    loop = asyncio.new_event_loop()
+    try:
+        stats = loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+    for method_stats in stats.values():
+        assert not method_stats.errors
+        assert method_stats.latency.total > 0
+        assert method_stats.latency.max >= method_stats.service_time.max
+    assert "streaming_detect_intent" in report(stats)
@@ -0,0 +1,392 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Run the generated keyword fixup scripts over large trees.
+
+The generated ``fixup_dialogflow_<version>_keywords.py`` scripts only
+provide the call transformer of their API version. Their command line is
+this module's :func:`main`, which adds parallel, pre-filtered, cached and
+in-place modes. ``owlbot.py`` points the scripts back at it after each
+regeneration.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import re
+import shutil
+import sys
+import tempfile
+from typing import Dict, FrozenSet, NamedTuple, Optional, Union
+
+import libcst as cst
+
+
+DESCRIPTION = """Fix up source that uses the {library} client library.
+
+The existing sources are NOT overwritten but are copied to output_dir with changes made,
+unless --in-place is given.
+
+Note: This tool operates at a best-effort level at converting positional
+      parameters in client method calls to keyword based parameters.
+      Cases where it WILL FAIL include
+      A) * or ** expansion in a method call.
+      B) Calls via function or method alias (includes free function calls)
+      C) Indirect or dispatched calls (e.g. the method is looked up dynamically)
+
+      These all constitute false negatives. The tool will also detect false
+      positives when an API method shares a name with another method.
+"""
+
+
+class _CallSiteCounter(cst.CSTTransformer):
+    """Wrap a generated call transformer, counting the calls it rewrites."""
+
+    def __init__(self, transformer):
+        super().__init__()
+        self._transformer = transformer
+        self.call_sites = collections.Counter()
+
+    def leave_Call(self, original: cst.Call, updated: cst.Call) -> cst.CSTNode:
+        result = self._transformer.leave_Call(original, updated)
+        # The generated transformer hands back the node it was given for
+        # calls it leaves alone.
+        if result is not updated:
+            self.call_sites[original.func.attr.value] += 1
+        return result
+
+
+@functools.lru_cache(maxsize=None)
+def _method_name_pattern(names: FrozenSet[str]):
+    """A pattern matching any of the method names as a whole word."""
+    return re.compile(
+        rb"\b(?:" + b"|".join(re.escape(n.encode()) for n in sorted(names)) + rb")\b"
+    )
+
+
+def _cache_key(src: bytes, transformer) -> str:
+    """A digest of a file's content and of what the transformer does to it."""
+    digest = hashlib.sha256()
+    digest.update(type(transformer).__qualname__.encode())
+    digest.update(repr(sorted(transformer.METHOD_TO_PARAMS.items())).encode())
+    digest.update(repr(transformer.CTRL_PARAMS).encode())
+    digest.update(b"\0")
+    digest.update(src)
+    return digest.hexdigest()
+
+
+def _write_atomic(
+    path: pathlib.Path, data: Union[str, bytes], *, like: Optional[pathlib.Path] = None
+):
+    """Replace the file at path by one holding data, all at once.
+
+    The new file gets the permissions of the file at like, if given.
+    """
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+        if like is not None:
+            shutil.copymode(str(like), tmp)
+        os.replace(tmp, str(path))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _pass_through(
+    fpath: pathlib.Path, updated_path: Optional[pathlib.Path], unchanged: str
+):
+    """Give the output dir its copy of a file that needs no changes."""
+    if updated_path is None or unchanged == "skip":
+        return
+    if unchanged == "link":
+        try:
+            os.link(str(fpath), str(updated_path))
+            return
+        except OSError:
+            # Across filesystems, or not supported there.
+            pass
+    shutil.copyfile(str(fpath), str(updated_path))
+
+
+class FixResult(NamedTuple):
+    """How one file was handled.
+
+    status is 'skipped' when the file mentions none of the API's method
+    names and was not parsed, 'unchanged' when it was parsed but no call
+    needed fixing, and 'fixed' otherwise. call_sites counts the calls
+    rewritten, by method name.
+    """
+
+    status: str
+    cached: bool
+    call_sites: Dict[str, int]
+
+
+class FixSummary(NamedTuple):
+    """What fix_files did to a tree."""
+
+    files: Dict[str, int]
+    cache_hits: int
+    call_sites: Dict[str, int]
+
+
+def fix_file(
+    fpath: pathlib.Path,
+    in_dir: pathlib.Path,
+    out_dir: Optional[pathlib.Path],
+    *,
+    transformer,
+    cache_dir: Optional[pathlib.Path] = None,
+    unchanged: str = "copy",
+) -> FixResult:
+    """Fix the method calls of one file.
+
+    With an output dir, the file is written to its place there, fixed if
+    needed. Without one, the file is fixed in place: it is only written
+    if some call changed, and then replaced atomically.
+
+    Files that do not mention any of the API's method names are not
+    parsed. With a cache dir, the result for each distinct file content
+    is remembered there and reused on later runs.
+
+    Args:
+        transformer: The call transformer of a generated fixup script.
+        unchanged: What to put in the output dir for files that need no
+            changes: a 'copy', a hard 'link' (falling back to a copy), or
+            nothing at all ('skip').
+    """
+    with open(fpath, "rb") as f:
+        src = f.read()
+
+    updated_path = None
+    if out_dir is not None:
+        # Create the path and directory structure for the new file.
+        updated_path = out_dir.joinpath(fpath.relative_to(in_dir))
+        updated_path.parent.mkdir(parents=True, exist_ok=True)
+
+    names = frozenset(transformer.METHOD_TO_PARAMS)
+    if not _method_name_pattern(names).search(src):
+        _pass_through(fpath, updated_path, unchanged)
+        return FixResult("skipped", False, {})
+
+    code = None
+    call_sites = None
+    if cache_dir is not None:
+        key = _cache_key(src, transformer)
+        entry = cache_dir.joinpath(key[:2], key + ".json")
+        if entry.exists():
+            with open(entry, "r") as f:
+                result = json.load(f)
+            code, call_sites = result["code"], result["call_sites"]
+
+    cached = call_sites is not None
+    if not cached:
+        with open(fpath, "r") as f:
+            text = f.read()
+
+        # Parse the code and insert method call fixes.
+        counter = _CallSiteCounter(transformer)
+        updated = cst.parse_module(text).visit(counter)
+        call_sites = dict(counter.call_sites)
+        code = updated.code if updated.code != text else None
+
+        if cache_dir is not None:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(entry, json.dumps({"code": code, "call_sites": call_sites}))
+
+    if code is None:
+        _pass_through(fpath, updated_path, unchanged)
+        return FixResult("unchanged", cached, call_sites)
+
+    # Generate the updated source file at the corresponding path.
+    _write_atomic(updated_path or fpath, code, like=fpath)
+    return FixResult("fixed", cached, call_sites)
+
+
+def fix_files(
+    in_dir: pathlib.Path,
+    out_dir: Optional[pathlib.Path],
+    *,
+    transformer,
+    jobs: int = 1,
+    cache_dir: Optional[pathlib.Path] = None,
+    unchanged: str = "copy",
+) -> FixSummary:
+    """Duplicate the input dir to the output dir, fixing file method calls.
+
+    Without an output dir, the files of the input dir are fixed in place.
+
+    Preconditions:
+    * in_dir is a real directory
+    * out_dir, if given, is a real, empty directory
+
+    Args:
+        transformer: The call transformer of a generated fixup script.
+        jobs: The number of processes fixing files in parallel.
+        cache_dir: A directory remembering the result for each file
+            content across runs.
+        unchanged: What to do with files needing no changes in the
+            output dir (see fix_file).
+    """
+    pyfile_gen = (
+        pathlib.Path(os.path.join(root, f))
+        for root, _, files in os.walk(in_dir)
+        for f in files
+        if os.path.splitext(f)[1] == ".py"
+    )
+    fix = functools.partial(
+        fix_file,
+        in_dir=in_dir,
+        out_dir=out_dir,
+        transformer=transformer,
+        cache_dir=cache_dir,
+        unchanged=unchanged,
+    )
+
+    files = collections.Counter()
+    cache_hits = 0
+    call_sites = collections.Counter()
+
+    def add(results):
+        nonlocal cache_hits
+        for result in results:
+            files[result.status] += 1
+            cache_hits += result.cached
+            call_sites.update(result.call_sites)
+
+    if jobs <= 1:
+        add(map(fix, pyfile_gen))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            add(executor.map(fix, pyfile_gen, chunksize=32))
+    return FixSummary(files, cache_hits, call_sites)
+
+
+def print_summary(summary: FixSummary, file=None):
+    """Print what fix_files did, to stderr by default."""
+    if file is None:
+        file = sys.stderr
+    files = summary.files
+    print(
+        "rewrote {} call sites in {} files; {} files needed no changes and "
+        "{} mention no API method ({} results from the cache)".format(
+            sum(summary.call_sites.values()),
+            files["fixed"],
+            files["unchanged"],
+            files["skipped"],
+            summary.cache_hits,
+        ),
+        file=file,
+    )
+    for method, count in sorted(
+        summary.call_sites.items(), key=lambda mc: (-mc[1], mc[0])
+    ):
+        print("  {:6d}  {}".format(count, method), file=file)
+
+
+def main(transformer, argv=None, *, library: str = "dialogflow"):
+    """The command line of a generated fixup script.
+
+    Args:
+        transformer: The call transformer of the script.
+        argv: The arguments; by default those of the process.
+        library: The name of the client library, for the help text.
+    """
+    parser = argparse.ArgumentParser(
+        description=DESCRIPTION.format(library=library),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "-d",
+        "--input-directory",
+        required=True,
+        dest="input_dir",
+        help="the input directory to walk for python files to fix up",
+    )
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument(
+        "-o",
+        "--output-directory",
+        dest="output_dir",
+        help="the directory to output files fixed via un-flattening",
+    )
+    output.add_argument(
+        "--in-place",
+        action="store_true",
+        help="rewrite the files of the input directory that need fixing, and only those",
+    )
+    parser.add_argument(
+        "--unchanged",
+        choices=("copy", "link", "skip"),
+        default="copy",
+        help="how files needing no changes reach the output directory: "
+        "copied, hard linked (where possible), or left out (default: copy)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="the number of processes fixing files in parallel (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        help="a directory caching results by file content, to speed up reruns",
+    )
+    args = parser.parse_args(argv)
+    input_dir = pathlib.Path(args.input_dir)
+    output_dir = pathlib.Path(args.output_dir) if args.output_dir else None
+    if not input_dir.is_dir():
+        sys.exit(
+            "input directory '{}' does not exist or is not a directory".format(
+                input_dir
+            )
+        )
+
+    if output_dir is not None and not output_dir.is_dir():
+        sys.exit(
+            "output directory '{}' does not exist or is not a directory".format(
+                output_dir
+            )
+        )
+
+    if output_dir is not None and os.listdir(output_dir):
+        sys.exit("output directory '{}' is not empty".format(output_dir))
+
+    cache_dir = pathlib.Path(args.cache_dir) if args.cache_dir else None
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    summary = fix_files(
+        input_dir,
+        output_dir,
+        transformer=transformer,
+        jobs=args.jobs,
+        cache_dir=cache_dir,
+        unchanged=args.unchanged,
+    )
+    print_summary(summary)
+    return summary
@@ -0,0 +1,259 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Rewrite the generated services to use ``google.cloud.dialogflow_common``.
+
+The generator emits the same client, transport and pager machinery into
+every service of every API version. This script replaces those copies
+with the shared implementation. It is run by ``owlbot.py`` after each
+regeneration, before formatting, and leaves already rewritten files
+alone. It fails if the generated code no longer has the expected shape.
+"""
+
+import argparse
+import pathlib
+import re
+import sys
+
+IMPORT = "from google.cloud import dialogflow_common\n"
+
+CLIENT_INFO_RE = re.compile(
+    r"try:\n"
+    r"    DEFAULT_CLIENT_INFO = gapic_v1\.client_info\.ClientInfo\(\n"
+    r"        gapic_version=pkg_resources\.get_distribution\(\n"
+    r'            "google-cloud-dialogflow",\n'
+    r"        \)\.version,\n"
+    r"    \)\n"
+    r"except pkg_resources\.DistributionNotFound:\n"
+    r"    DEFAULT_CLIENT_INFO = gapic_v1\.client_info\.ClientInfo\(\)\n"
+)
+CLIENT_INFO = "DEFAULT_CLIENT_INFO = dialogflow_common.default_client_info()\n"
+
+CLIENT_CLASS_RE = re.compile(r"^class (\w+Client)\(metaclass=(\w+)\):$", re.M)
+MTLS_ENDPOINT_RE = re.compile(
+    r"    @staticmethod\n    def _get_default_mtls_endpoint\(api_endpoint\):\n"
+    r".*?\n(?=    DEFAULT_ENDPOINT = )",
+    re.S,
+)
+DEFAULT_MTLS_ENDPOINT_RE = re.compile(
+    r"    DEFAULT_MTLS_ENDPOINT = _get_default_mtls_endpoint\.__func__\(  # type: ignore\n"
+    r"        DEFAULT_ENDPOINT\n"
+    r"    \)\n"
+)
+DEFAULT_MTLS_ENDPOINT = "    DEFAULT_MTLS_ENDPOINT = dialogflow_common.default_mtls_endpoint(DEFAULT_ENDPOINT)\n"
+SERVICE_ACCOUNT_RE = re.compile(
+    r"    @classmethod\n    def from_service_account_info\(.*?"
+    r"    from_service_account_json = from_service_account_file\n\n",
+    re.S,
+)
+COMMON_PATHS_RE = re.compile(
+    r"    @staticmethod\n    def common_billing_account_path\(.*?"
+    r"(?=    def __init__\()",
+    re.S,
+)
+TRANSPORT_RE = re.compile(
+    r"        if isinstance\(client_options, dict\):\n.*?"
+    r"                client_info=client_info,\n"
+    r"            \)\n",
+    re.S,
+)
+TRANSPORT = """\
+        self._transport = self._create_transport(
+            {transport},
+            credentials=credentials,
+            transport=transport,
+            client_options=client_options,
+            client_info=client_info,
+        )
+"""
+
+# Imports only used by the code moved to the runtime, and the names they bind.
+UNUSED_IMPORTS = (
+    ("from distutils import util\n", "util"),
+    ("import os\n", "os"),
+    ("import pkg_resources\n", "pkg_resources"),
+    ("from google.auth.transport import mtls  # type: ignore\n", "mtls"),
+    (
+        "from google.auth.exceptions import MutualTLSChannelError  # type: ignore\n",
+        "MutualTLSChannelError",
+    ),
+    ("from google.oauth2 import service_account  # type: ignore\n", "service_account"),
+)
+
+PAGER_METHODS = {
+    False: ["__getattr__", "pages", "__iter__", "__repr__"],
+    True: ["__getattr__", "pages", "__aiter__", "__repr__"],
+}
+ITEMS_RE = re.compile(r"(?:yield from|for response in) page\.(\w+)")
+TYPING_RE = re.compile(r"^from typing import \(\n((?:    \w+,\n)+)\)\n", re.M)
+
+
+class ShapeError(Exception):
+    """The generated code does not have the expected shape."""
+
+
+def _sub_once(pattern, replacement, text, path, what):
+    text, count = pattern.subn(replacement, text)
+    if count != 1:
+        raise ShapeError("{}: expected one {}, found {}.".format(path, what, count))
+    return text
+
+
+def _add_import(text, path):
+    match = re.search(r"^from google\.cloud\.dialogflow_v\w+\.", text, re.M)
+    if match is None:
+        raise ShapeError("{}: no import of the API version.".format(path))
+    return text[: match.start()] + IMPORT + text[match.start() :]
+
+
+def _drop_unused_imports(text):
+    for line, name in UNUSED_IMPORTS:
+        if line in text:
+            rest = text.replace(line, "", 1)
+            if not re.search(r"\b{}\b".format(re.escape(name)), rest):
+                text = rest
+    return text
+
+
+def _rewrite_client_info(text, path):
+    return _sub_once(CLIENT_INFO_RE, CLIENT_INFO, text, path, "client info block")
+
+
+def _rewrite_client(text, path):
+    match = CLIENT_CLASS_RE.search(text)
+    if match is None:
+        raise ShapeError("{}: no client class.".format(path))
+    transport = match.group(1)[: -len("Client")] + "Transport"
+    text = _sub_once(
+        CLIENT_CLASS_RE,
+        r"class \1(dialogflow_common.ClientBase, metaclass=\2):",
+        text,
+        path,
+        "client class",
+    )
+    text = _sub_once(MTLS_ENDPOINT_RE, "", text, path, "mTLS endpoint helper")
+    text = _sub_once(
+        DEFAULT_MTLS_ENDPOINT_RE, DEFAULT_MTLS_ENDPOINT, text, path, "mTLS endpoint"
+    )
+    text = _sub_once(SERVICE_ACCOUNT_RE, "", text, path, "service account helpers")
+    text = _sub_once(COMMON_PATHS_RE, "", text, path, "common path helpers")
+    text = _sub_once(
+        TRANSPORT_RE,
+        TRANSPORT.format(transport=transport),
+        text,
+        path,
+        "transport creation",
+    )
+    return text
+
+
+def _rewrite_pager(chunk, path):
+    name = re.match(r"class (\w+):", chunk).group(1)
+    is_async = name.endswith("AsyncPager")
+    start = chunk.index("\n    def __getattr__(")
+    methods = re.findall(r"^    (?:async )?def (\w+)", chunk[start:], re.M)
+    if methods != PAGER_METHODS[is_async]:
+        raise ShapeError("{}: unexpected members of {}.".format(path, name))
+    items = ITEMS_RE.search(chunk[start:]).group(1)
+    chunk = chunk[:start] + "\n"
+    chunk = chunk.replace(
+        "class {}:".format(name),
+        "class {}(dialogflow_common.{}):".format(
+            name, "AsyncPager" if is_async else "Pager"
+        ),
+        1,
+    )
+    return _sub_once(
+        re.compile(r'    """\n\n    def __init__\('),
+        '    """\n\n    _items_field = "{}"\n\n    def __init__('.format(items),
+        chunk,
+        path,
+        "constructor of {}".format(name),
+    )
+
+
+def _rewrite_pagers(text, path):
+    head, *classes = re.split(r"(?=^class )", text, flags=re.M)
+    if not classes:
+        raise ShapeError("{}: no pagers.".format(path))
+    body = "".join(
+        _rewrite_pager(chunk.rstrip("\n"), path) + "\n\n" for chunk in classes
+    )
+    match = TYPING_RE.search(head)
+    if match is None:
+        raise ShapeError("{}: no typing import.".format(path))
+    names = re.findall(r"(\w+),", match.group(1))
+    used = [n for n in names if re.search(r"\b{}\b".format(n), body)]
+    typing = "from typing import (\n{})\n".format(
+        "".join("    {},\n".format(n) for n in used)
+    )
+    head = head[: match.start()] + typing + head[match.end() :]
+    return head + body.rstrip("\n") + "\n"
+
+
+REWRITES = (
+    ("client.py", (_rewrite_client_info, _rewrite_client)),
+    ("async_client.py", (_rewrite_client_info,)),
+    ("transports/base.py", (_rewrite_client_info,)),
+    ("pagers.py", (_rewrite_pagers,)),
+)
+
+
+def rewrite_service(service_dir: pathlib.Path) -> int:
+    """Rewrite the modules of one service; return how many changed."""
+    changed = 0
+    for name, steps in REWRITES:
+        path = service_dir / name
+        if not path.exists():
+            continue
+        text = path.read_text()
+        if "dialogflow_common" in text:
+            continue
+        for step in steps:
+            text = step(text, path)
+        text = _drop_unused_imports(_add_import(text, path))
+        path.write_text(text)
+        changed += 1
+    return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "root",
+        nargs="?",
+        default=str(pathlib.Path(__file__).resolve().parent.parent),
+        help="The repository root.",
+    )
+    args = parser.parse_args(argv)
+
+    root = pathlib.Path(args.root)
+    changed = 0
+    for services in sorted(root.glob("google/cloud/dialogflow_v*/services")):
+        for service_dir in sorted(p for p in services.iterdir() if p.is_dir()):
+            if service_dir.name.startswith("__"):
+                continue
+            changed += rewrite_service(service_dir)
+    print("Rewrote {} modules.".format(changed))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ShapeError as e:
+        sys.exit(str(e))
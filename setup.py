@@ -53,10 +53,17 @@ setuptools.setup(
     ],
     platforms="Posix; MacOS X; Windows",
     packages=packages,
-    extras={"libcst": "libcst >=0.2.5"},
+    extras_require={
+        "libcst": "libcst >=0.2.5",
+        "export": "pyarrow >= 1.0.0",
+        "evaluation": "numpy >= 1.16.0",
+        "audio": "numpy >= 1.16.0",
+    },
     scripts=[
         "scripts/fixup_dialogflow_v2_keywords.py",
         "scripts/fixup_dialogflow_v2beta1_keywords.py",
+        # Imported by the two scripts above, which are installed next to it.
+        "scripts/keyword_fixup.py",
     ],
     install_requires=dependencies,
     python_requires=">=3.6",
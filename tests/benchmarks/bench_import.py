@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Benchmark the import time and memory of the API versions.
+
+Each measurement runs in a fresh interpreter, after the dependencies
+(grpc, google-api-core, proto-plus) are imported, so only the cost of the
+Dialogflow packages themselves is counted::
+
+    python -m tests.benchmarks.bench_import --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_SCENARIOS = (
+    ("v2", ["google.cloud.dialogflow_v2"]),
+    ("v2beta1", ["google.cloud.dialogflow_v2beta1"]),
+    ("v2 + v2beta1", ["google.cloud.dialogflow_v2", "google.cloud.dialogflow_v2beta1"]),
+)
+
+_PROBE = """
+import importlib, json, resource, sys, time
+import grpc, proto
+from google.api_core import gapic_v1, operations_v1
+
+def rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+before = rss()
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "rss": rss() - before}))
+"""
+
+
+def measure(modules):
+    """Return the import time and resident memory added by ``modules``."""
+    output = subprocess.check_output([sys.executable, "-c", _PROBE] + modules)
+    return json.loads(output.decode("utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print("median of {} runs".format(args.runs))
+    for name, modules in _SCENARIOS:
+        results = [measure(modules) for _ in range(args.runs)]
+        seconds = statistics.median(r["seconds"] for r in results)
+        rss = statistics.median(r["rss"] for r in results)
+        print("{:<14} {:8.3f} s {:8.1f} MB".format(name, seconds, rss / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Benchmark Struct <-> dict conversion of a rich response payload.
+
+Compares the default proto-plus marshal, ``json_format`` and the codec in
+``google.cloud.dialogflow_helpers.structs``::
+
+    python -m tests.benchmarks.bench_struct_codec --items 500
+"""
+
+import argparse
+import timeit
+
+from google.protobuf import json_format
+from google.protobuf import struct_pb2
+
+from google.cloud.dialogflow_helpers import structs
+from google.cloud.dialogflow_v2.types import session
+
+
+def rich_payload(items):
+    """Return a payload shaped like a rich response with ``items`` entries."""
+    return {
+        "richContent": [
+            [
+                {
+                    "type": "list",
+                    "title": "Item {}".format(i),
+                    "subtitle": "Description of item {}".format(i),
+                    "event": {"name": "SELECT", "parameters": {"index": i}},
+                    "image": {
+                        "src": {"rawUrl": "https://example.com/{}.png".format(i)}
+                    },
+                    "available": i % 2 == 0,
+                    "tags": ["a", "b", "c"],
+                    "price": i * 1.5,
+                    "discount": None,
+                }
+                for i in range(items)
+            ]
+        ]
+    }
+
+
+def _marshal_to_python(value):
+    # Deep conversion through the lazy proto-plus views.
+    if hasattr(value, "items"):
+        return {k: _marshal_to_python(v) for k, v in value.items()}
+    if hasattr(value, "__iter__") and not isinstance(value, str):
+        return [_marshal_to_python(v) for v in value]
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    payload = rich_payload(args.items)
+    result = session.QueryResult(parameters=payload)
+    struct = session.QueryResult.pb(result).parameters
+    assert structs.struct_to_dict(struct) == json_format.MessageToDict(struct)
+
+    def decode_proto_plus():
+        _marshal_to_python(result.parameters)
+
+    def decode_json_format():
+        json_format.MessageToDict(struct)
+
+    def decode_codec():
+        structs.struct_to_dict(struct)
+
+    def encode_proto_plus():
+        session.QueryResult(parameters=payload)
+
+    def encode_json_format():
+        json_format.ParseDict(payload, struct_pb2.Struct())
+
+    def encode_codec():
+        structs.dict_to_struct(payload)
+
+    print("{} items, best of {} x {} runs".format(args.items, args.repeat, args.number))
+    for name, function in (
+        ("Struct -> dict, proto-plus", decode_proto_plus),
+        ("Struct -> dict, json_format", decode_json_format),
+        ("Struct -> dict, structs codec", decode_codec),
+        ("dict -> Struct, proto-plus", encode_proto_plus),
+        ("dict -> Struct, json_format", encode_json_format),
+        ("dict -> Struct, structs codec", encode_codec),
+    ):
+        best = min(
+            timeit.repeat(function, repeat=args.repeat, number=args.number)
+        ) / float(args.number)
+        print("{:<32} {:10.3f} ms".format(name, best * 1e3))
+
+
+if __name__ == "__main__":
+    main()
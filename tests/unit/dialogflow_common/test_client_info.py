@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+
+import pkg_resources
+
+from google.cloud.dialogflow_common import client_info
+from google.cloud.dialogflow_v2.services.contexts import ContextsClient
+from google.cloud.dialogflow_v2.services.contexts.transports import base
+
+
+def test_version_looked_up_once():
+    client_info.gapic_version.cache_clear()
+    try:
+        with mock.patch.object(pkg_resources, "get_distribution") as get:
+            get.return_value.version = "1.2.3"
+            first = client_info.default_client_info()
+            second = client_info.default_client_info()
+        get.assert_called_once_with("google-cloud-dialogflow")
+        assert first is not second
+        assert first.gapic_version == second.gapic_version == "1.2.3"
+    finally:
+        client_info.gapic_version.cache_clear()
+
+
+def test_version_not_installed():
+    client_info.gapic_version.cache_clear()
+    try:
+        with mock.patch.object(pkg_resources, "get_distribution") as get:
+            get.side_effect = pkg_resources.DistributionNotFound()
+            assert client_info.default_client_info().gapic_version is None
+    finally:
+        client_info.gapic_version.cache_clear()
+
+
+def test_generated_modules_share_version():
+    assert base.DEFAULT_CLIENT_INFO.gapic_version == client_info.gapic_version()
+    assert ContextsClient.DEFAULT_MTLS_ENDPOINT == "dialogflow.mtls.googleapis.com"
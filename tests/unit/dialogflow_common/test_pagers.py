@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import pytest
+
+from google.cloud.dialogflow_v2.services.intents import pagers
+from google.cloud.dialogflow_v2.types import intent
+
+
+def _pages(count, size):
+    pages = []
+    for p in range(count):
+        pages.append(
+            intent.ListIntentsResponse(
+                intents=[
+                    {"display_name": "intent-{}-{}".format(p, i)} for i in range(size)
+                ],
+                next_page_token=str(p + 1) if p + 1 < count else "",
+            )
+        )
+    return pages
+
+
+def _method(pages):
+    def method(request, metadata=()):
+        return pages[int(request.page_token)]
+
+    return method
+
+
+def test_stream_releases_pages():
+    pages = _pages(3, 4)
+    pager = pagers.ListIntentsPager(
+        _method(pages), intent.ListIntentsRequest(), pages[0]
+    )
+
+    items = list(pager.stream())
+
+    assert [i.display_name for i in items][:2] == ["intent-0-0", "intent-0-1"]
+    assert len(items) == 12
+    assert all(isinstance(i, intent.Intent) for i in items)
+    assert [len(p.intents) for p in pages] == [0, 0, 0]
+    assert pager.next_page_token == ""
+    # Items kept by the caller survive the release of their page.
+    assert items[-1].display_name == "intent-2-3"
+
+
+def test_stream_raw():
+    pages = _pages(2, 3)
+    pager = pagers.ListIntentsPager(
+        _method(pages), intent.ListIntentsRequest(), pages[0]
+    )
+
+    items = list(pager.stream(raw=True))
+
+    assert all(isinstance(i, intent.Intent.pb()) for i in items)
+    assert [i.display_name for i in items] == [
+        "intent-{}-{}".format(p, i) for p in range(2) for i in range(3)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_stream():
+    pages = _pages(2, 2)
+
+    async def method(request, metadata=()):
+        return pages[int(request.page_token)]
+
+    pager = pagers.ListIntentsAsyncPager(method, intent.ListIntentsRequest(), pages[0])
+
+    items = [i async for i in pager.stream(raw=True)]
+
+    assert len(items) == 4
+    assert [len(p.intents) for p in pages] == [0, 0]
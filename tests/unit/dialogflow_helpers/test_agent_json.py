@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import zipfile
+
+import pytest
+
+from google.cloud.dialogflow_helpers import agent_json
+from google.cloud.dialogflow_v2.types import entity_type
+from google.cloud.dialogflow_v2.types import intent
+from google.cloud.dialogflow_v2beta1.types import intent as intent_v2beta1
+
+
+def _intents(count):
+    return [
+        intent.Intent(
+            name="projects/p/agent/intents/{}".format(i),
+            display_name="order/pizza {}".format(i % 3),
+            training_phrases=[
+                {"parts": [{"text": "I want pizza "}, {"text": str(n)}]}
+                for n in range(3)
+            ],
+            parameters=[{"display_name": "size", "mandatory": True}],
+            messages=[{"payload": {"items": [1, "two"]}}],
+        )
+        for i in range(count)
+    ]
+
+
+def test_to_json():
+    message = intent.Intent(display_name="Ä", priority=0)
+
+    assert agent_json.to_json(message) == '{"displayName":"Ä"}'
+    assert agent_json.to_json(intent.Intent.pb(message)) == '{"displayName":"Ä"}'
+
+
+@pytest.mark.parametrize("processes", [None, 2])
+def test_ndjson_roundtrip(tmp_path, processes):
+    path = str(tmp_path / "intents.ndjson")
+    intents = _intents(7)
+
+    count = agent_json.write_ndjson(
+        iter(intents), path, processes=processes, chunk_size=2
+    )
+    read = list(
+        agent_json.read_ndjson(path, intent.Intent, processes=processes, chunk_size=3)
+    )
+
+    assert count == 7
+    assert read == [intent.Intent.pb(i) for i in intents]
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 7
+    assert json.loads(lines[0])["parameters"][0]["mandatory"] is True
+
+
+def test_read_ndjson_other_version(tmp_path):
+    path = str(tmp_path / "intents.ndjson")
+    agent_json.write_ndjson(_intents(1), path)
+
+    (read,) = agent_json.read_ndjson(path, intent_v2beta1.Intent)
+
+    assert isinstance(read, intent_v2beta1.Intent.pb())
+    assert read.display_name == "order/pizza 0"
+
+
+@pytest.mark.parametrize("processes", [None, 2])
+def test_agent_zip_roundtrip(tmp_path, processes):
+    path = str(tmp_path / "agent.zip")
+    intents = _intents(5)
+    entities = [
+        entity_type.EntityType(
+            display_name="size", kind="KIND_MAP", entities=[{"value": "large"}]
+        )
+    ]
+
+    counts = agent_json.write_agent_zip(
+        path, intents=intents, entity_types=entities, processes=processes, chunk_size=2,
+    )
+
+    assert counts == (5, 1)
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == [
+            "intents/order_pizza 0.json",
+            "intents/order_pizza 1.json",
+            "intents/order_pizza 2.json",
+            "intents/order_pizza 0_2.json",
+            "intents/order_pizza 1_2.json",
+            "entities/size.json",
+        ]
+        assert archive.read("entities/size.json").decode().startswith('{\n  "')
+    assert list(
+        agent_json.read_agent_zip(path, intent.Intent, processes=processes)
+    ) == [intent.Intent.pb(i) for i in intents]
+    assert list(agent_json.read_agent_zip(path, entity_type.EntityType)) == [
+        entity_type.EntityType.pb(e) for e in entities
+    ]
+    with pytest.raises(ValueError):
+        list(agent_json.read_agent_zip(path, intent.Intent.Message))
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+
+import pytest
+
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import _utils
+from google.cloud.dialogflow_helpers import audio
+from google.cloud.dialogflow_v2beta1.services.sessions import SessionsClient
+
+np = pytest.importorskip("numpy")
+
+
+def _sine(frequency, rate, seconds=1.0, amplitude=0.5):
+    return amplitude * np.sin(
+        2 * np.pi * frequency * np.arange(int(rate * seconds)) / rate
+    )
+
+
+def _pcm(signal, channels=1):
+    frames = np.repeat(signal[:, None], channels, axis=1)
+    return np.rint(frames * 32767).astype("<i2").tobytes()
+
+
+def _chunks(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def test_choose_format():
+    assert audio.choose_format(
+        audio.AudioFormat(audio.LINEAR_16, 48000, 2)
+    ) == audio.AudioFormat(audio.LINEAR_16, 16000)
+    assert audio.choose_format(
+        audio.AudioFormat(audio.MULAW, 8000)
+    ) == audio.AudioFormat(audio.MULAW, 8000)
+    assert audio.choose_format(
+        audio.AudioFormat(audio.LINEAR_16, 44100), compact=True
+    ) == audio.AudioFormat(audio.MULAW, 16000)
+    with pytest.raises(ValueError):
+        audio.choose_format(audio.AudioFormat("AUDIO_ENCODING_FLAC", 16000))
+
+
+def test_mulaw_round_trip():
+    samples = np.arange(-32768, 32768, 3, dtype=np.int16)
+    decoded = audio.mulaw_decode(audio.mulaw_encode(samples)).astype(np.int64)
+
+    assert audio.mulaw_encode(np.array([0, -1, 32767, -32768])) == b"\xff\x7e\x80\x00"
+    assert audio.mulaw_decode(b"\xff\x7f").tolist() == [0, 0]
+    # Mu-law keeps about 4 significant bits of every sample.
+    samples = samples.astype(np.int64)
+    assert np.all(np.abs(decoded - samples) <= np.abs(samples) / 16 + 8)
+
+
+def test_passthrough_needs_no_numpy():
+    source = audio.AudioFormat(audio.MULAW, 8000)
+    with mock.patch.object(_utils, "import_optional", side_effect=ImportError):
+        converter = audio.AudioConverter(source)
+        assert converter.convert(b"\x01\x02\x03") == b"\x01\x02\x03"
+        assert converter.flush() == b""
+
+
+def test_downmix_and_resample_stream():
+    source = audio.AudioFormat(audio.LINEAR_16, 48000, channels=2)
+    # 10 kHz is above the 8 kHz Nyquist rate of the output.
+    pcm = _pcm(_sine(440, 48000) + _sine(10000, 48000, amplitude=0.2), channels=2)
+
+    converter = audio.AudioConverter(source)
+    # Chunks split frames and samples at odd byte offsets.
+    out = b"".join(converter.convert_stream(_chunks(pcm, 3001)))
+
+    assert converter.target == audio.AudioFormat(audio.LINEAR_16, 16000)
+    assert len(out) == len(pcm) // 6
+    y = np.frombuffer(out, "<i2") / 32767
+    expected = _sine(440, 16000)
+    assert np.abs(y - expected)[50:-50].max() < 1e-3
+
+
+@pytest.mark.parametrize(
+    "rate_in,rate_out", [(44100, 16000), (8000, 16000), (22050, 16000)]
+)
+def test_resample_rates(rate_in, rate_out):
+    converter = audio.AudioConverter(
+        audio.AudioFormat(audio.LINEAR_16, rate_in),
+        audio.AudioFormat(audio.LINEAR_16, rate_out),
+    )
+    out = b"".join(converter.convert_stream(_chunks(_pcm(_sine(300, rate_in)), 777)))
+
+    y = np.frombuffer(out, "<i2") / 32767
+    assert len(y) == rate_out
+    assert np.abs(y - _sine(300, rate_out))[50:-50].max() < 1e-3
+
+
+def test_mulaw_to_linear():
+    source = audio.AudioFormat(audio.MULAW, 8000)
+    target = audio.AudioFormat(audio.LINEAR_16, 8000)
+    signal = np.rint(_sine(300, 8000) * 32767).astype(np.int16)
+
+    out = audio.AudioConverter(source, target).convert(audio.mulaw_encode(signal))
+
+    assert np.array_equal(
+        np.frombuffer(out, "<i2"), audio.mulaw_decode(audio.mulaw_encode(signal))
+    )
+
+
+def test_streaming_requests():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    pcm = _pcm(_sine(440, 48000, seconds=0.5), channels=2)
+
+    requests = list(
+        audio.streaming_requests(
+            client,
+            "projects/p/agent/sessions/s",
+            _chunks(pcm, 19200),
+            audio.AudioFormat(audio.LINEAR_16, 48000, channels=2),
+            language_code="en-US",
+            single_utterance=True,
+        )
+    )
+
+    config = requests[0].query_input.audio_config
+    assert type(requests[0]).__module__.startswith("google.cloud.dialogflow_v2beta1")
+    assert requests[0].session == "projects/p/agent/sessions/s"
+    assert config.audio_encoding.name == audio.LINEAR_16
+    assert config.sample_rate_hertz == 16000
+    assert config.single_utterance
+    assert sum(len(r.input_audio) for r in requests[1:]) == len(pcm) // 6
+
+
+def _speech_in_silence(rate):
+    noise = np.random.RandomState(0).normal(0, 0.001, int(rate * 5.0))
+    signal = noise.copy()
+    signal[rate : rate * 2] += _sine(200, rate, seconds=1.0)
+    return _pcm(signal)
+
+
+@pytest.mark.parametrize("chunk_size", [320, 1234, 1 << 20])
+def test_voice_activity_detector(chunk_size):
+    pcm = _speech_in_silence(16000)
+    vad = audio.VoiceActivityDetector(
+        audio.AudioFormat(audio.LINEAR_16, 16000), padding=0.2, trailing_silence=0.5
+    )
+
+    trimmed = b"".join(vad.trim(_chunks(pcm, chunk_size)))
+
+    assert vad.started and vad.ended
+    # The padding, the speech and the trailing silence.
+    assert len(trimmed) == 2 * int(16000 * (0.2 + 1.0 + 0.5))
+    assert trimmed == pcm[2 * int(16000 * 0.8) :][: len(trimmed)]
+    assert vad.process(pcm) == b""
+
+
+def test_voice_activity_detector_mulaw():
+    pcm = np.frombuffer(_speech_in_silence(8000), dtype="<i2")
+    vad = audio.VoiceActivityDetector(
+        audio.AudioFormat(audio.MULAW, 8000), padding=0.0, trailing_silence=None
+    )
+
+    trimmed = vad.process(audio.mulaw_encode(pcm))
+
+    assert vad.started and not vad.ended
+    assert len(trimmed) == 4 * 8000
+
+
+def test_streaming_requests_vad():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    pcm = _speech_in_silence(16000)
+
+    requests = list(
+        audio.streaming_requests(
+            client,
+            "projects/p/agent/sessions/s",
+            _chunks(pcm, 3200),
+            audio.AudioFormat(audio.LINEAR_16, 16000),
+            language_code="en-US",
+            vad={"padding": 0.0, "trailing_silence": 0.5},
+        )
+    )
+
+    assert sum(len(r.input_audio) for r in requests[1:]) == 2 * 16000 * 3 // 2
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+
+import mock
+
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import audio_cache
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+from google.cloud.dialogflow_v2.types import audio_config
+from google.cloud.dialogflow_v2.types import intent
+from google.cloud.dialogflow_v2.types import session
+
+SESSION = "projects/p/agent/sessions/s"
+MP3 = {"audio_encoding": "OUTPUT_AUDIO_ENCODING_MP3"}
+EFFECTIVE = audio_config.OutputAudioConfig(
+    audio_encoding="OUTPUT_AUDIO_ENCODING_MP3",
+    sample_rate_hertz=24000,
+    synthesize_speech_config={"voice": {"name": "en-US-Wavenet-D"}},
+)
+
+
+def _request(text):
+    return {
+        "session": SESSION,
+        "query_input": {"text": {"text": text, "language_code": "en"}},
+        "output_audio_config": MP3,
+    }
+
+
+class _Backend(object):
+    def __init__(self):
+        self.prompts = {"hold": "Please hold while I check."}
+        self.requests = []
+
+    def __call__(self, request, **kwargs):
+        self.requests.append(request)
+        query = request.query_input.text.text or request.query_input.event.name
+        prompt = self.prompts[query]
+        response = session.DetectIntentResponse(
+            query_result={
+                "fulfillment_text": prompt,
+                "fulfillment_messages": [
+                    intent.Intent.Message(text={"text": [prompt]}),
+                    intent.Intent.Message(
+                        platform="GOOGLE_HANGOUTS", text={"text": ["ignored"]}
+                    ),
+                ],
+            }
+        )
+        if "output_audio_config" in request:
+            response.output_audio = ("audio:" + prompt).encode()
+            response.output_audio_config = EFFECTIVE
+        return response
+
+
+def test_prompt_text():
+    result = session.QueryResult(
+        fulfillment_messages=[
+            intent.Intent.Message(text={"text": ["a", "b"]}),
+            intent.Intent.Message(platform="SLACK", text={"text": ["c"]}),
+            intent.Intent.Message(image={"image_uri": "gs://x"}),
+        ]
+    )
+    assert audio_cache.prompt_text(result) == "a\nb"
+
+
+def test_caching_client_serves_repeated_prompts():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    caching = audio_cache.AudioCachingSessionsClient(client)
+    backend = _Backend()
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = backend
+        first = caching.detect_intent(request=_request("hold"))
+        assert caching.last_audio == audio_cache.SynthesizedAudio()
+        second = caching.detect_intent(request=_request("hold"))
+        assert caching.last_audio.cached
+
+    assert "output_audio_config" in backend.requests[0]
+    assert "output_audio_config" not in backend.requests[1]
+    assert (
+        second.output_audio == first.output_audio == b"audio:Please hold while I check."
+    )
+    assert second.output_audio_config == EFFECTIVE
+    assert caching.cache.stats().hits == 1
+
+
+def test_caching_client_misprediction():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    caching = audio_cache.AudioCachingSessionsClient(client)
+    backend = _Backend()
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = backend
+        caching.detect_intent(request=_request("hold"))
+        backend.prompts["hold"] = "Still checking."
+        response = caching.detect_intent(request=_request("hold"))
+        assert caching.last_audio.mispredicted
+        assert not response.output_audio
+
+        # The prediction follows the new prompt, whose audio is fetched.
+        response = caching.detect_intent(request=_request("hold"))
+        assert not caching.last_audio.mispredicted
+        assert response.output_audio == b"audio:Still checking."
+        assert "output_audio_config" in backend.requests[-1]
+
+
+def test_caching_client_predicts_text_per_session():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    caching = audio_cache.AudioCachingSessionsClient(client)
+    backend = _Backend()
+    backend.prompts["WELCOME"] = "Hello."
+    other = SESSION[:-1] + "other"
+
+    def event(session_name):
+        return {
+            "session": session_name,
+            "query_input": {"event": {"name": "WELCOME", "language_code": "en"}},
+            "output_audio_config": MP3,
+        }
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = backend
+        caching.detect_intent(request=_request("hold"))
+        caching.detect_intent(request=dict(_request("hold"), session=other))
+        caching.detect_intent(request=event(SESSION))
+        caching.detect_intent(request=event(other))
+
+    assert ["output_audio_config" in r for r in backend.requests] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert caching.last_audio.cached
+
+
+def test_caching_client_synthesizes_mispredicted_prompts():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    synthesizer = mock.Mock(return_value=b"local:Still checking.")
+    caching = audio_cache.AudioCachingSessionsClient(client, synthesizer=synthesizer)
+    backend = _Backend()
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = backend
+        caching.detect_intent(request=_request("hold"))
+        backend.prompts["hold"] = "Still checking."
+        response = caching.detect_intent(request=_request("hold"))
+
+    synthesizer.assert_called_once_with("Still checking.", EFFECTIVE)
+    assert caching.last_audio == audio_cache.SynthesizedAudio(
+        mispredicted=True, synthesized=True
+    )
+    assert response.output_audio == b"local:Still checking."
+    assert response.output_audio_config == EFFECTIVE
+    assert caching.cache.get(caching.cache.key("Still checking.", EFFECTIVE))
+
+
+def test_caching_client_ignores_corrupt_entries(tmpdir):
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    # Nothing fits in memory: every entry is read from disk.
+    cache = audio_cache.AudioCache(str(tmpdir), max_bytes=0)
+    caching = audio_cache.AudioCachingSessionsClient(client, cache)
+    backend = _Backend()
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = backend
+        caching.detect_intent(request=_request("hold"))
+        (path,) = [
+            os.path.join(root, f)
+            for root, _, files in os.walk(str(tmpdir.join("audio")))
+            for f in files
+        ]
+        with open(path, "wb") as f:
+            f.write(b"truncated")
+        key = cache.key("Please hold while I check.", EFFECTIVE)
+        assert key not in cache
+
+        response = caching.detect_intent(request=_request("hold"))
+        assert not caching.last_audio.mispredicted
+        # The refill replaced the corrupt file.
+        caching.detect_intent(request=_request("hold"))
+        assert caching.last_audio.cached
+
+    assert "output_audio_config" in backend.requests[1]
+    assert "output_audio_config" not in backend.requests[2]
+    assert response.output_audio == b"audio:Please hold while I check."
+
+
+def test_caching_client_bounds_audio_configs():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    caching = audio_cache.AudioCachingSessionsClient(client, max_configs=1)
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = _Backend()
+        caching.detect_intent(request=_request("hold"))
+        caching.detect_intent(
+            request=dict(
+                _request("hold"), output_audio_config={"sample_rate_hertz": 8000}
+            )
+        )
+
+    assert len(caching._effective_configs) == 1
+
+
+def test_caching_client_passes_through_without_audio_config():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    caching = audio_cache.AudioCachingSessionsClient(client)
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = _Backend()
+        request = _request("hold")
+        del request["output_audio_config"]
+        caching.detect_intent(request=request)
+        caching.detect_intent(request=request)
+
+    assert caching.cache.stats().fills == 0
+
+
+def test_disk_cache_is_shared_and_content_addressed(tmpdir):
+    directory = str(tmpdir)
+    cache = audio_cache.AudioCache(directory)
+    cache.put(cache.key("hello", EFFECTIVE), b"audio")
+    cache.put(cache.key("hello!", EFFECTIVE), b"audio")
+
+    other = audio_cache.AudioCache(directory)
+    assert other.key("hello", EFFECTIVE) in other
+    assert other.get(other.key("hello!", EFFECTIVE)) == b"audio"
+    assert other.get(other.key("hello", audio_config.OutputAudioConfig())) is None
+    audio_files = [f for _, _, files in os.walk(tmpdir.join("audio")) for f in files]
+    assert len(audio_files) == 1
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = audio_cache.AudioCache(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"
+    cache.put("c", b"12345")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    stats = cache.stats()
+    assert (stats.evictions, stats.entries, stats.size) == (1, 2, 10)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+
+import grpc
+import pytest
+
+from google.api_core import grpc_helpers
+from google.api_core.gapic_v1 import client_info as client_info_lib
+from google.api_core import grpc_helpers_async
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import channels
+from google.cloud.dialogflow_v2.services.intents import IntentsClient
+from google.cloud.dialogflow_v2.services.sessions import SessionsAsyncClient
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+from google.cloud.dialogflow_v2.services.sessions.transports import (
+    SessionsGrpcAsyncIOTransport,
+)
+from google.cloud.dialogflow_v2.services.sessions.transports import (
+    SessionsGrpcTransport,
+)
+from google.cloud.dialogflow_v2beta1.services.contexts import ContextsClient
+
+
+def test_channel_options():
+    options = channels.TransportOptions(
+        keepalive_time=30,
+        keepalive_timeout=5.5,
+        keepalive_permit_without_calls=True,
+        max_send_message_length=1024,
+    )
+
+    assert dict(options.channel_options()) == {
+        "grpc.max_send_message_length": 1024,
+        "grpc.max_receive_message_length": -1,
+        "grpc.keepalive_time_ms": 30000,
+        "grpc.keepalive_timeout_ms": 5500,
+        "grpc.keepalive_permit_without_calls": 1,
+    }
+    assert "compression" not in options.channel_kwargs()
+    assert (
+        channels.TransportOptions(compression="gzip").channel_kwargs()["compression"]
+        == grpc.Compression.Gzip
+    )
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"keepalive_time": 0},
+        {"keepalive_timeout": -1},
+        {"max_send_message_length": 0},
+        {"max_receive_message_length": -2},
+        {"compression": "brotli"},
+    ],
+)
+def test_invalid_options(kwargs):
+    with pytest.raises(ValueError):
+        channels.TransportOptions(**kwargs).channel_kwargs()
+
+
+def test_default_options():
+    assert channels.default_options(SessionsClient).keepalive_time == 60.0
+    assert channels.default_options(SessionsAsyncClient).keepalive_time == 60.0
+    assert channels.default_options(IntentsClient).compression == "gzip"
+    assert channels.default_options(ContextsClient) == channels.TransportOptions()
+
+
+def test_create_client():
+    creds = credentials.AnonymousCredentials()
+    with mock.patch.object(grpc_helpers, "create_channel") as create_channel:
+        client = channels.create_client(
+            IntentsClient,
+            credentials=creds,
+            client_options={"api_endpoint": "example.com"},
+        )
+
+    assert isinstance(client, IntentsClient)
+    assert client.transport.grpc_channel is create_channel.return_value
+    assert client.transport._credentials is creds
+    create_channel.assert_called_once()
+    args, kwargs = create_channel.call_args
+    assert args == ("example.com:443",)
+    assert kwargs["credentials"] is creds
+    assert kwargs["compression"] == grpc.Compression.Gzip
+    assert kwargs["scopes"] == SessionsGrpcTransport.AUTH_SCOPES
+
+
+def test_create_client_sends_client_info():
+    info = client_info_lib.ClientInfo(user_agent="my-app/1.0")
+    with mock.patch.object(grpc_helpers, "create_channel"):
+        client = channels.create_client(
+            IntentsClient,
+            credentials=credentials.AnonymousCredentials(),
+            client_info=info,
+        )
+
+    with mock.patch.object(type(client.transport.get_intent), "__call__") as call:
+        client.get_intent(name="projects/p/agent/intents/i")
+
+    metadata = dict(call.call_args[1]["metadata"])
+    assert metadata["x-goog-api-client"].startswith("my-app/1.0")
+
+
+def test_create_transport_sessions():
+    creds = credentials.AnonymousCredentials()
+    with mock.patch.object(grpc_helpers, "create_channel") as create_channel:
+        transport = channels.create_transport(SessionsClient, credentials=creds)
+
+    assert isinstance(transport, SessionsGrpcTransport)
+    kwargs = create_channel.call_args[1]
+    assert "compression" not in kwargs
+    assert ("grpc.keepalive_time_ms", 60000) in kwargs["options"]
+
+
+def test_create_transport_async():
+    creds = credentials.AnonymousCredentials()
+    options = channels.TransportOptions(keepalive_time=120)
+    with mock.patch.object(grpc_helpers_async, "create_channel") as create_channel:
+        transport = channels.create_transport(
+            SessionsAsyncClient, options=options, credentials=creds
+        )
+
+    assert isinstance(transport, SessionsGrpcAsyncIOTransport)
+    kwargs = create_channel.call_args[1]
+    assert ("grpc.keepalive_time_ms", 120000) in kwargs["options"]
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import mock
+
+import pytest
+
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import clients
+from google.cloud.dialogflow_v2.services.intents import IntentsClient
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+from google.oauth2 import service_account
+
+
+def _factory(**kwargs):
+    return clients.ClientFactory(
+        credentials=credentials.AnonymousCredentials(), **kwargs
+    )
+
+
+def test_get_caches_per_service():
+    factory = _factory(client_options={"api_endpoint": "localhost:8080"})
+
+    sessions = factory.get(SessionsClient)
+
+    assert factory.get(SessionsClient) is sessions
+    assert factory.get(IntentsClient) is not sessions
+    assert sessions.transport._host == "localhost:8080"
+    assert sessions.transport._credentials is factory.credentials
+
+    factory.clear()
+    assert factory.get(SessionsClient) is not sessions
+
+
+def test_get_rebuilds_after_pid_change():
+    factory = _factory()
+    parent = factory.get(SessionsClient)
+
+    with mock.patch("os.getpid", return_value=os.getpid() + 1):
+        child = factory.get(SessionsClient)
+        assert factory.get(SessionsClient) is child
+
+    assert child is not parent
+    assert child.transport.grpc_channel is not parent.transport.grpc_channel
+    # The parent's client is kept alive, but not reused.
+    assert factory._inherited == [{SessionsClient: parent}]
+
+
+def test_fork_hook_resets_factories():
+    factory = _factory()
+    parent = factory.get(SessionsClient)
+
+    with mock.patch("os.getpid", return_value=os.getpid() + 1):
+        clients._after_fork_in_child()
+        assert factory._pid == os.getpid()
+        child = factory.get(SessionsClient)
+
+    assert child is not parent
+    assert factory._inherited == [{SessionsClient: parent}]
+
+
+def test_from_service_account_info():
+    creds = credentials.AnonymousCredentials()
+    with mock.patch.object(
+        service_account.Credentials, "from_service_account_info", return_value=creds
+    ) as factory_method:
+        factory = clients.ClientFactory.from_service_account_info(
+            {"type": "service_account"}, transport="grpc"
+        )
+        factory.get(SessionsClient)
+        with mock.patch("os.getpid", return_value=os.getpid() + 1):
+            factory.get(SessionsClient)
+
+    factory_method.assert_called_once_with({"type": "service_account"})
+    assert factory.credentials is creds
+
+
+def test_transport_instance_rejected():
+    transport = SessionsClient.get_transport_class()(
+        credentials=credentials.AnonymousCredentials()
+    )
+    with pytest.raises(ValueError):
+        clients.ClientFactory(transport=transport)
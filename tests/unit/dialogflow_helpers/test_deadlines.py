@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+import mock
+
+import pytest
+
+from google.api_core import exceptions
+from google.api_core import grpc_helpers_async
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import deadlines
+from google.cloud.dialogflow_v2.services.contexts import ContextsClient
+from google.cloud.dialogflow_v2.services.sessions import SessionsAsyncClient
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+from google.cloud.dialogflow_v2.types import context
+from google.cloud.dialogflow_v2.types import session
+
+SESSION = "projects/p/agent/sessions/s"
+
+
+def _client(client_class=SessionsClient):
+    return deadlines.install(
+        client_class(credentials=credentials.AnonymousCredentials())
+    )
+
+
+def test_budget_nesting():
+    assert deadlines.remaining() is None
+    with deadlines.budget(10):
+        assert 9 < deadlines.remaining() <= 10
+        with deadlines.budget(60):
+            assert deadlines.remaining() <= 10
+        with deadlines.budget(1):
+            assert deadlines.remaining() <= 1
+    assert deadlines.remaining() is None
+
+
+def test_timeout_trimmed_to_budget():
+    client = _client()
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.return_value = session.DetectIntentResponse()
+        client.detect_intent(session=SESSION)
+        assert call.call_args[1].get("timeout", 220.0) > 1.5
+
+        with deadlines.budget(1.5):
+            client.detect_intent(session=SESSION)
+        assert 0 < call.call_args[1]["timeout"] <= 1.5
+
+        with deadlines.budget(1.5):
+            client.detect_intent(session=SESSION, timeout=0.5)
+        assert call.call_args[1]["timeout"] == 0.5
+
+
+def test_budget_shared_across_services():
+    sessions = _client()
+    contexts = _client(ContextsClient)
+
+    def slow_detect_intent(request, **kwargs):
+        time.sleep(0.2)
+        return session.DetectIntentResponse()
+
+    with mock.patch.object(
+        type(sessions.transport.detect_intent), "__call__"
+    ) as call, deadlines.budget(1.0):
+        call.side_effect = slow_detect_intent
+        sessions.detect_intent(session=SESSION)
+        call.side_effect = None
+        call.return_value = context.ListContextsResponse()
+        list(contexts.list_contexts(parent=SESSION))
+
+    assert call.call_args[1]["timeout"] <= 0.8
+
+
+def test_spent_budget_fails_fast():
+    client = _client()
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        with deadlines.budget(0), pytest.raises(exceptions.DeadlineExceeded):
+            client.detect_intent(session=SESSION)
+    call.assert_not_called()
+
+
+def test_retry_deadline_trimmed_to_budget():
+    client = _client()
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = exceptions.ServiceUnavailable("down")
+        started = time.monotonic()
+        with deadlines.budget(0.5), pytest.raises(
+            (exceptions.RetryError, exceptions.DeadlineExceeded)
+        ):
+            client.detect_intent(session=SESSION)
+
+    assert call.call_count >= 1
+    assert time.monotonic() - started < 2.0
+
+
+@pytest.mark.asyncio
+async def test_async_timeout_trimmed_to_budget():
+    client = SessionsAsyncClient(credentials=credentials.AnonymousCredentials())
+    stub = client.transport.detect_intent
+    deadlines.install(client)
+    with mock.patch.object(type(stub), "__call__") as call:
+        call.return_value = grpc_helpers_async.FakeUnaryUnaryCall(
+            session.DetectIntentResponse()
+        )
+        with deadlines.budget(1.5):
+            await client.detect_intent(session=SESSION)
+        assert 0 < call.call_args[1]["timeout"] <= 1.5
+
+        with deadlines.budget(0), pytest.raises(exceptions.DeadlineExceeded):
+            await client.detect_intent(session=SESSION)
+    assert call.call_count == 1
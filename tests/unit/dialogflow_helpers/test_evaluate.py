@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+
+import pytest
+
+from google.api_core import exceptions
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import evaluate
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+from google.cloud.dialogflow_v2.types import session
+
+np = pytest.importorskip("numpy")
+
+PREFIX = "projects/p/agent/sessions/"
+
+# text -> predicted intent
+AGENT = {
+    "hello": "greet",
+    "hi there": "greet",
+    "bye": "greet",
+    "see you": "leave",
+    "what?": "",
+}
+
+
+def _fake_agent(fail=()):
+    def call(request, **kwargs):
+        text = request.query_input.text.text
+        if text in fail:
+            raise exceptions.InternalServerError("down")
+        return session.DetectIntentResponse(
+            query_result={
+                "intent": {"display_name": AGENT[text]},
+                "intent_detection_confidence": 0.5,
+            }
+        )
+
+    return call
+
+
+def _write_utterances(path):
+    path.write_text(
+        "text,intent,language_code\n"
+        "hello,greet,\n"
+        "hi there,greet,en-GB\n"
+        "bye,leave,\n"
+        "see you,leave,\n"
+        "what?,,\n"
+    )
+
+
+def _client():
+    return SessionsClient(credentials=credentials.AnonymousCredentials(),)
+
+
+def test_read_utterances(tmp_path):
+    path = tmp_path / "utterances.csv"
+    _write_utterances(path)
+
+    utterances = list(evaluate.read_utterances(str(path)))
+
+    assert utterances[1] == evaluate.Utterance("2", "hi there", "greet", "en-GB")
+    assert utterances[4] == evaluate.Utterance("5", "what?", "", "")
+
+    path.write_text("query,label\nhi,greet\n")
+    with pytest.raises(ValueError):
+        list(evaluate.read_utterances(str(path)))
+
+
+def test_run_evaluation_resumes(tmp_path):
+    utterances_path = tmp_path / "utterances.csv"
+    _write_utterances(utterances_path)
+    results_path = str(tmp_path / "results.csv")
+    client = _client()
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = _fake_agent(fail=("bye",))
+        evaluated = evaluate.run_evaluation(
+            client,
+            evaluate.read_utterances(str(utterances_path)),
+            results_path,
+            session_prefix=PREFIX,
+            queries_per_second=1000,
+            max_workers=2,
+        )
+    assert evaluated == 5
+    requests = sorted((c[1][0] for c in call.mock_calls), key=lambda r: r.session)
+    assert requests[0].session == PREFIX + "eval-1"
+    assert requests[1].query_input.text.language_code == "en-GB"
+    assert requests[0].query_input.text.language_code == "en"
+
+    # Simulate an interrupted write of the last line.
+    with open(results_path, "a") as f:
+        f.write("9,partial")
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = _fake_agent()
+        evaluated = evaluate.run_evaluation(
+            client,
+            evaluate.read_utterances(str(utterances_path)),
+            results_path,
+            session_prefix=PREFIX,
+        )
+    # Only the failed utterance is retried.
+    assert evaluated == 1
+    (retried,) = [c[1][0] for c in call.mock_calls]
+    assert retried.query_input.text.text == "bye"
+
+    results = list(evaluate.read_results(results_path))
+    assert len(results) == 6
+    assert [r.id for r in results if r.error] == ["3"]
+    assert results[-1].id == "3" and results[-1].predicted == "greet"
+    assert results[0].confidence == 0.5
+
+
+def test_evaluation_report():
+    def result(id, expected, predicted, error=""):
+        return evaluate.EvaluationResult(id, "", expected, predicted, 0, 0, error)
+
+    report = evaluate.EvaluationReport.from_results(
+        [
+            result("1", "greet", "greet"),
+            result("2", "greet", "greet"),
+            result("3", "leave", "greet", error="down"),
+            result("3", "leave", "greet"),
+            result("4", "leave", "leave"),
+            result("5", "", ""),
+            result("6", "help", "", error="down"),
+        ]
+    )
+
+    assert report.labels == ["", "greet", "leave"]
+    np.testing.assert_array_equal(
+        report.matrix, [[1, 0, 0], [0, 2, 0], [0, 1, 1]],
+    )
+    assert report.errors == 1
+    np.testing.assert_allclose(report.precision, [1, 2 / 3, 1])
+    np.testing.assert_allclose(report.recall, [1, 1, 0.5])
+    np.testing.assert_allclose(report.f1, [1, 0.8, 2 / 3])
+    np.testing.assert_array_equal(report.support, [1, 2, 2])
+    assert report.accuracy == 0.8
+
+    lines = report.format().splitlines()
+    assert lines[1].split() == ["(no", "intent)", "1.000", "1.000", "1.000", "1"]
+    assert lines[-1] == "accuracy 0.800 over 5 utterances, 1 errors"
+
+
+def test_evaluation_report_empty():
+    report = evaluate.EvaluationReport.from_results([])
+
+    assert report.labels == []
+    assert report.accuracy == 0.0
+    assert report.precision.shape == (0,)
+
+
+def test_rate_limiter():
+    limiter = evaluate.RateLimiter(10)
+
+    with mock.patch("time.sleep") as sleep:
+        for _ in range(3):
+            limiter.wait()
+
+    delays = [c[1][0] for c in sleep.mock_calls]
+    assert len(delays) == 2
+    assert delays[1] == pytest.approx(0.2, abs=0.05)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+
+import mock
+
+import pytest
+
+from google.api_core import exceptions
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import export
+from google.cloud.dialogflow_v2.services.conversations import ConversationsClient
+from google.cloud.dialogflow_v2.types import conversation
+from google.cloud.dialogflow_v2.types import participant
+from google.cloud.dialogflow_v2beta1.types import participant as participant_v2beta1
+from google.protobuf import struct_pb2 as struct  # type: ignore
+
+pa = pytest.importorskip("pyarrow")
+
+
+def _message(name, content, parts=()):
+    return participant.Message(
+        name=name,
+        content=content,
+        participant_role=participant.Participant.Role.END_USER,
+        create_time={"seconds": 10},
+        message_annotation=participant.MessageAnnotation(
+            parts=list(parts), contain_entities=bool(parts)
+        ),
+    )
+
+
+def _fake_backend(messages_by_conversation, fail_on=None):
+    def call(request, **kwargs):
+        if isinstance(request, conversation.ListConversationsRequest):
+            return conversation.ListConversationsResponse(
+                conversations=[
+                    conversation.Conversation(name=name)
+                    for name in sorted(messages_by_conversation)
+                ],
+            )
+        if request.parent == fail_on:
+            raise exceptions.InternalServerError("boom")
+        messages = messages_by_conversation[request.parent]
+        # Serve two messages per page to exercise the pagers.
+        start = int(request.page_token or 0)
+        token = str(start + 2) if start + 2 < len(messages) else ""
+        return conversation.ListMessagesResponse(
+            messages=messages[start : start + 2], next_page_token=token,
+        )
+
+    return call
+
+
+def test_message_columns():
+    names = [column.name for column in export.message_columns(participant.Message)]
+
+    assert names[0] == "conversation"
+    assert "content" in names
+    assert "participant_role" in names
+    assert "message_annotation_contain_entities" in names
+    assert "message_annotation_parts_text" in names
+    assert "message_annotation_parts_formatted_value" in names
+
+
+def test_message_columns_v2beta1():
+    names = [
+        column.name for column in export.message_columns(participant_v2beta1.Message)
+    ]
+
+    assert "send_time" in names
+    assert "sentiment_analysis_query_text_sentiment_score" in names
+
+
+def test_message_schema():
+    schema = export.message_schema(participant.Message)
+
+    assert schema.field("create_time").type == pa.timestamp("us", tz="UTC")
+    assert schema.field("participant_role").type == pa.string()
+    assert schema.field("message_annotation_parts_entity_type").type == pa.list_(
+        pa.string()
+    )
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_export_messages(tmp_path, file_format):
+    client = ConversationsClient(credentials=credentials.AnonymousCredentials(),)
+    part = participant.AnnotatedMessagePart(
+        text="tomorrow",
+        entity_type="sys.date",
+        formatted_value=struct.Value(string_value="2021-01-02"),
+    )
+    backend = {
+        "projects/p/conversations/a": [
+            _message("a/m{}".format(i), "hi {}".format(i)) for i in range(5)
+        ],
+        "projects/p/conversations/b": [_message("b/m0", "tomorrow", [part])],
+        "projects/p/conversations/c": [],
+    }
+    path = str(tmp_path / "messages")
+
+    with mock.patch.object(type(client.transport.list_messages), "__call__") as call:
+        call.side_effect = _fake_backend(backend)
+        result = export.export_messages(
+            client,
+            "projects/p",
+            path,
+            file_format=file_format,
+            max_workers=2,
+            batch_size=2,
+        )
+
+    assert result == export.ExportResult(conversations=3, messages=6)
+
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+    else:
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+
+    rows = sorted(table.to_pylist(), key=lambda row: row["name"])
+    assert [row["name"] for row in rows] == [
+        "a/m0",
+        "a/m1",
+        "a/m2",
+        "a/m3",
+        "a/m4",
+        "b/m0",
+    ]
+    assert rows[0]["conversation"] == "projects/p/conversations/a"
+    assert rows[0]["participant_role"] == "END_USER"
+    assert rows[0]["create_time"].timestamp() == 10
+    assert rows[0]["message_annotation_parts_text"] == []
+    assert rows[5]["message_annotation_contain_entities"] is True
+    assert rows[5]["message_annotation_parts_entity_type"] == ["sys.date"]
+    assert rows[5]["message_annotation_parts_formatted_value"] == ['"2021-01-02"']
+
+
+def test_export_messages_filter(tmp_path):
+    client = ConversationsClient(credentials=credentials.AnonymousCredentials(),)
+
+    with mock.patch.object(type(client.transport.list_messages), "__call__") as call:
+        call.side_effect = _fake_backend({})
+        result = export.export_messages(
+            client,
+            "projects/p",
+            str(tmp_path / "empty.parquet"),
+            filter='lifecycle_state = "COMPLETED"',
+        )
+
+    request = call.call_args_list[0][0][0]
+    assert request.filter == 'lifecycle_state = "COMPLETED"'
+    assert result == export.ExportResult(conversations=0, messages=0)
+
+
+def test_export_messages_error(tmp_path):
+    client = ConversationsClient(credentials=credentials.AnonymousCredentials(),)
+    backend = {
+        "projects/p/conversations/{}".format(i): [_message("m", "hi")]
+        for i in range(10)
+    }
+
+    with mock.patch.object(type(client.transport.list_messages), "__call__") as call:
+        call.side_effect = _fake_backend(backend, fail_on="projects/p/conversations/3")
+        with pytest.raises(exceptions.InternalServerError):
+            export.export_messages(
+                client, "projects/p", str(tmp_path / "out.parquet"), max_workers=2,
+            )
+
+
+def test_export_messages_bad_format(tmp_path):
+    client = ConversationsClient(credentials=credentials.AnonymousCredentials(),)
+
+    with pytest.raises(ValueError):
+        export.export_messages(
+            client, "projects/p", str(tmp_path / "out"), file_format="csv"
+        )
+
+
+def test_export_messages_listing_error_with_full_queue(tmp_path):
+    client = ConversationsClient(credentials=credentials.AnonymousCredentials(),)
+    backend = {
+        "projects/p/conversations/{}".format(i): [
+            _message("m{}".format(j), "hi") for j in range(20)
+        ]
+        for i in range(4)
+    }
+    fake = _fake_backend(backend)
+
+    def call(request, **kwargs):
+        # The second page of conversations fails once the queue is full.
+        if isinstance(request, conversation.ListConversationsRequest):
+            if request.page_token:
+                time.sleep(0.3)
+                raise exceptions.InternalServerError("boom")
+            response = fake(request)
+            response.next_page_token = "more"
+            return response
+        return fake(request)
+
+    open_writer = export._open_writer
+
+    def slow_writer(*args):
+        writer = open_writer(*args)
+        write_table = writer.write_table
+
+        def write(table):
+            time.sleep(0.3)
+            write_table(table)
+
+        writer.write_table = write
+        return writer
+
+    outcome = []
+
+    def run():
+        try:
+            export.export_messages(
+                client,
+                "projects/p",
+                str(tmp_path / "out.parquet"),
+                max_workers=2,
+                batch_size=10,
+            )
+        except Exception as exc:
+            outcome.append(exc)
+
+    with mock.patch.object(
+        type(client.transport.list_messages), "__call__"
+    ) as call_stub, mock.patch.object(export, "_open_writer", slow_writer):
+        call_stub.side_effect = call
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(10)
+
+    assert not thread.is_alive()
+    assert len(outcome) == 1
+    assert isinstance(outcome[0], exceptions.InternalServerError)
@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import json
+import mock
+
+import pytest
+
+from google.api_core import exceptions
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import knowledge
+from google.cloud.dialogflow_v2.services.documents import DocumentsClient
+from google.cloud.dialogflow_v2.types import document
+from google.cloud.dialogflow_v2beta1.services.documents import (
+    DocumentsClient as DocumentsClientV2beta1,
+)
+from google.cloud.dialogflow_v2beta1.types import document as document_v2beta1
+from google.longrunning import operations_pb2
+from google.protobuf import any_pb2 as any_  # type: ignore
+from google.protobuf import empty_pb2 as empty  # type: ignore
+from google.rpc import status_pb2 as status  # type: ignore
+
+KB = "projects/p/knowledgeBases/kb"
+
+
+class FakeDocuments(object):
+    """A fake Documents backend whose operations finish after one poll."""
+
+    def __init__(self, documents=(), fail=()):
+        self.documents = {d.name: d for d in documents}
+        self.fail = fail
+        self.operations = {}
+        self.requests = []
+        self.max_pending = 0
+        self.created = 0
+
+    def _operation(self, name, response=None, error=None):
+        self.operations[name] = (response, error)
+        self.max_pending = max(self.max_pending, len(self.operations))
+        return operations_pb2.Operation(name=name)
+
+    def __call__(self, request, **kwargs):
+        self.requests.append(request)
+        if isinstance(request, document.ListDocumentsRequest):
+            return document.ListDocumentsResponse(
+                documents=list(self.documents.values())
+            )
+        if isinstance(request, document.CreateDocumentRequest):
+            doc = document.Document(request.document)
+            if doc.display_name in self.fail:
+                return self._operation(
+                    "operations/" + doc.display_name,
+                    error=status.Status(code=3, message="bad document"),
+                )
+            self.created += 1
+            doc.name = "{}/documents/{}".format(KB, self.created)
+            self.documents[doc.name] = doc
+            return self._operation("operations/" + doc.name, document.Document.pb(doc))
+        if isinstance(request, document.ReloadDocumentRequest):
+            doc = self.documents[request.name]
+            return self._operation("operations/r" + doc.name, document.Document.pb(doc))
+        if isinstance(request, document.DeleteDocumentRequest):
+            del self.documents[request.name]
+            return self._operation("operations/d" + request.name, empty.Empty())
+        if isinstance(request, operations_pb2.GetOperationRequest):
+            response, error = self.operations.pop(request.name)
+            if error is not None:
+                return operations_pb2.Operation(
+                    name=request.name, done=True, error=error
+                )
+            packed = any_.Any()
+            packed.Pack(response)
+            return operations_pb2.Operation(
+                name=request.name, done=True, response=packed
+            )
+        raise AssertionError(request)
+
+    def sent(self, request_type):
+        return [r for r in self.requests if isinstance(r, request_type)]
+
+
+def _write(root, files):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+
+def _client():
+    return DocumentsClient(credentials=credentials.AnonymousCredentials(),)
+
+
+def test_scan_directory(tmp_path):
+    _write(
+        tmp_path,
+        {
+            "faq.csv": b"q,a\n",
+            "guides/setup.HTML": b"<p>setup</p>",
+            "guides/manual.pdf": b"%PDF",
+            "notes.md": b"ignored",
+        },
+    )
+
+    sources = knowledge.scan_directory(str(tmp_path))
+
+    assert [s.display_name for s in sources] == [
+        "faq.csv",
+        "guides/manual.pdf",
+        "guides/setup.HTML",
+    ]
+    assert sources[0].mime_type == "text/csv"
+    assert sources[0].knowledge_types == ("FAQ",)
+    assert sources[0].sha256 == hashlib.sha256(b"q,a\n").hexdigest()
+    assert sources[2].mime_type == "text/html"
+    assert sources[2].knowledge_types == ("EXTRACTIVE_QA",)
+
+
+def test_manifest(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = knowledge.Manifest(path)
+    manifest.record("faq.csv", "docs/1", "abc")
+    manifest.record("old.csv", "docs/2", "def")
+    manifest.forget("old.csv")
+    manifest.save()
+
+    reloaded = knowledge.Manifest(path)
+    assert reloaded.sha256("faq.csv", "docs/1") == "abc"
+    assert reloaded.sha256("faq.csv", "docs/9") is None
+    assert reloaded.sha256("old.csv", "docs/2") is None
+
+    with open(path, "w") as f:
+        json.dump({"version": 99, "documents": {}}, f)
+    with pytest.raises(ValueError):
+        knowledge.Manifest(path)
+
+
+def test_load_creates_documents(tmp_path):
+    _write(tmp_path / "src", {"a.csv": b"a", "b.html": b"b", "c.txt": b"c"})
+    client = _client()
+    backend = FakeDocuments()
+    manifest_path = str(tmp_path / "manifest.json")
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        loader = knowledge.BulkDocumentLoader(
+            client, KB, manifest_path=manifest_path, max_in_flight=2, poll_interval=0,
+        )
+        result = loader.load(knowledge.scan_directory(str(tmp_path / "src")))
+
+    assert sorted(result.created) == ["a.csv", "b.html", "c.txt"]
+    assert result.skipped == [] and result.failed == {}
+    assert backend.max_pending <= 2
+    created = {
+        r.document.display_name: r for r in backend.sent(document.CreateDocumentRequest)
+    }
+    assert created["a.csv"].parent == KB
+    assert created["a.csv"].document.raw_content == b"a"
+    assert created["a.csv"].document.knowledge_types == [
+        document.Document.KnowledgeType.FAQ
+    ]
+
+    with open(manifest_path) as f:
+        recorded = json.load(f)["documents"]
+    assert recorded["a.csv"]["sha256"] == hashlib.sha256(b"a").hexdigest()
+
+
+def test_load_skips_unchanged_and_replaces_changed(tmp_path):
+    _write(tmp_path / "src", {"a.csv": b"a", "b.html": b"b"})
+    client = _client()
+    backend = FakeDocuments()
+    manifest_path = str(tmp_path / "manifest.json")
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        knowledge.BulkDocumentLoader(
+            client, KB, manifest_path=manifest_path, poll_interval=0
+        ).load(knowledge.scan_directory(str(tmp_path / "src")))
+
+        # The listing does not return raw content; the manifest is used.
+        for doc in backend.documents.values():
+            doc.raw_content = b""
+        _write(tmp_path / "src", {"b.html": b"b2"})
+        old_names = {d.display_name: d.name for d in backend.documents.values()}
+        backend.requests = []
+
+        result = knowledge.BulkDocumentLoader(
+            client, KB, manifest_path=manifest_path, poll_interval=0
+        ).load(knowledge.scan_directory(str(tmp_path / "src")))
+
+    assert result.skipped == ["a.csv"]
+    assert result.replaced == ["b.html"]
+    (created,) = backend.sent(document.CreateDocumentRequest)
+    assert created.document.raw_content == b"b2"
+    (deleted,) = backend.sent(document.DeleteDocumentRequest)
+    assert deleted.name == old_names["b.html"]
+    assert sorted(d.display_name for d in backend.documents.values()) == [
+        "a.csv",
+        "b.html",
+    ]
+
+
+def test_load_uses_remote_raw_content(tmp_path):
+    _write(tmp_path, {"a.csv": b"a"})
+    remote = document.Document(
+        name=KB + "/documents/x", display_name="a.csv", raw_content=b"a"
+    )
+    client = _client()
+    backend = FakeDocuments([remote])
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        result = knowledge.BulkDocumentLoader(client, KB, poll_interval=0).load(
+            knowledge.scan_directory(str(tmp_path))
+        )
+
+    assert result.skipped == ["a.csv"]
+    assert backend.sent(document.CreateDocumentRequest) == []
+
+
+def test_load_reloads_with_content_uri(tmp_path):
+    _write(tmp_path, {"a.html": b"new", "b.html": b"b"})
+    remote = document.Document(
+        name=KB + "/documents/x",
+        display_name="a.html",
+        content_uri="gs://bucket/kb/a.html",
+    )
+    client = _client()
+    backend = FakeDocuments([remote])
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        result = knowledge.BulkDocumentLoader(
+            client, KB, content_uri_prefix="gs://bucket/kb/", poll_interval=0
+        ).load(knowledge.scan_directory(str(tmp_path)))
+
+    assert result.reloaded == ["a.html"]
+    assert result.created == ["b.html"]
+    (reloaded,) = backend.sent(document.ReloadDocumentRequest)
+    assert reloaded.name == KB + "/documents/x"
+    assert reloaded.content_uri == "gs://bucket/kb/a.html"
+    (created,) = backend.sent(document.CreateDocumentRequest)
+    assert created.document.content_uri == "gs://bucket/kb/b.html"
+    assert not created.document.raw_content
+
+
+def test_load_reports_failures(tmp_path):
+    _write(tmp_path, {"a.csv": b"a", "bad.csv": b"bad"})
+    client = _client()
+    backend = FakeDocuments(fail=("bad.csv",))
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        loader = knowledge.BulkDocumentLoader(client, KB, poll_interval=0)
+        result = loader.load(knowledge.scan_directory(str(tmp_path)))
+
+    assert result.created == ["a.csv"]
+    assert isinstance(result.failed["bad.csv"], exceptions.InvalidArgument)
+    assert loader.manifest.sha256("bad.csv", "") is None
+
+
+def test_load_reloads_v2beta1(tmp_path):
+    _write(tmp_path, {"a.html": b"new"})
+    client = DocumentsClientV2beta1(credentials=credentials.AnonymousCredentials(),)
+    remote = document_v2beta1.Document(
+        name=KB + "/documents/x",
+        display_name="a.html",
+        content_uri="gs://bucket/kb/a.html",
+    )
+    operation = mock.Mock()
+    operation.done.return_value = True
+    operation.exception.return_value = None
+    operation.result.return_value = remote
+
+    with mock.patch.object(
+        client, "list_documents", return_value=[remote]
+    ), mock.patch.object(client, "reload_document", return_value=operation) as reload:
+        result = knowledge.BulkDocumentLoader(
+            client, KB, content_uri_prefix="gs://bucket/kb/", poll_interval=0
+        ).load(knowledge.scan_directory(str(tmp_path)))
+
+    assert result.reloaded == ["a.html"]
+    request = reload.call_args[1]["request"]
+    assert isinstance(request, document_v2beta1.ReloadDocumentRequest)
+    assert request.gcs_source.uri == "gs://bucket/kb/a.html"
+
+
+def test_load_reports_local_errors(tmp_path):
+    _write(tmp_path, {"a.csv": b"a", "gone.csv": b"gone"})
+    sources = knowledge.scan_directory(str(tmp_path))
+    (tmp_path / "gone.csv").unlink()
+    client = _client()
+    backend = FakeDocuments()
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        result = knowledge.BulkDocumentLoader(client, KB, poll_interval=0).load(sources)
+
+    assert result.created == ["a.csv"]
+    assert isinstance(result.failed["gone.csv"], FileNotFoundError)
+
+
+def test_load_deletes_duplicates(tmp_path):
+    _write(tmp_path, {"a.csv": b"v2"})
+    remote = [
+        document.Document(
+            name=KB + "/documents/old", display_name="a.csv", raw_content=b"v1"
+        ),
+        document.Document(
+            name=KB + "/documents/new", display_name="a.csv", raw_content=b"v2"
+        ),
+    ]
+    client = _client()
+    backend = FakeDocuments(remote)
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        loader = knowledge.BulkDocumentLoader(client, KB, poll_interval=0)
+        loader.manifest.record("a.csv", KB + "/documents/new", "sha")
+        result = loader.load(knowledge.scan_directory(str(tmp_path)))
+
+    assert result.skipped == ["a.csv"]
+    assert result.deleted == ["a.csv"]
+    assert list(backend.documents) == [KB + "/documents/new"]
+    assert loader.manifest.sha256("a.csv", KB + "/documents/new") == "sha"
+
+
+def test_sync_plan_and_dry_run(tmp_path):
+    _write(tmp_path, {"same.csv": b"same", "changed.csv": b"v2", "new/moved.csv": b"m"})
+    remote = [
+        document.Document(
+            name=KB + "/documents/1", display_name="same.csv", raw_content=b"same"
+        ),
+        document.Document(
+            name=KB + "/documents/2", display_name="changed.csv", raw_content=b"v1"
+        ),
+        document.Document(
+            name=KB + "/documents/3", display_name="old/moved.csv", raw_content=b"m"
+        ),
+        document.Document(
+            name=KB + "/documents/4", display_name="gone.csv", raw_content=b"g"
+        ),
+    ]
+    client = _client()
+    backend = FakeDocuments(remote)
+    sources = knowledge.scan_directory(str(tmp_path))
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        loader = knowledge.BulkDocumentLoader(client, KB, poll_interval=0)
+        plan = loader.plan(sources, delete_missing=True)
+        result = loader.sync(sources, dry_run=True)
+
+    assert [(a.kind, a.display_name) for a in plan.actions] == [
+        ("replace", "changed.csv"),
+        ("skip", "same.csv"),
+        ("rename", "new/moved.csv"),
+        ("delete", "gone.csv"),
+    ]
+    assert plan.report().splitlines() == [
+        "~ replace changed.csv",
+        "> rename new/moved.csv (was old/moved.csv)",
+        "- delete gone.csv",
+        "1 replace, 1 rename, 1 delete, 1 skip",
+    ]
+    assert result.renamed == ["new/moved.csv"]
+    assert result.deleted == ["gone.csv"]
+    assert result.skipped == ["same.csv"]
+    # Planning only lists documents.
+    assert {type(r) for r in backend.requests} == {document.ListDocumentsRequest}
+
+    # Without deletion, the moved file is created and nothing is removed.
+    with mock.patch.object(type(client.transport.create_document), "__call__") as call:
+        call.side_effect = backend
+        plan = loader.plan(sources)
+    assert [a.kind for a in plan.actions] == ["replace", "skip", "create"]
+
+
+def test_sync_applies_plan(tmp_path):
+    _write(tmp_path, {"new/moved.csv": b"m"})
+    remote = [
+        document.Document(
+            name=KB + "/documents/3", display_name="old/moved.csv", content_uri="gs://b"
+        ),
+        document.Document(
+            name=KB + "/documents/4", display_name="gone.csv", raw_content=b"g"
+        ),
+    ]
+    manifest_path = str(tmp_path / "manifest.json")
+    manifest = knowledge.Manifest(manifest_path)
+    manifest.record(
+        "old/moved.csv", KB + "/documents/3", hashlib.sha256(b"m").hexdigest()
+    )
+    manifest.record("gone.csv", KB + "/documents/4", "x")
+    manifest.save()
+    client = _client()
+    backend = FakeDocuments(remote)
+
+    def call(request, **kwargs):
+        if isinstance(request, document.UpdateDocumentRequest):
+            backend.requests.append(request)
+            doc = backend.documents[request.document.name]
+            doc.display_name = request.document.display_name
+            return backend._operation("operations/u", document.Document.pb(doc))
+        return backend(request, **kwargs)
+
+    with mock.patch.object(type(client.transport.create_document), "__call__") as stub:
+        stub.side_effect = call
+        loader = knowledge.BulkDocumentLoader(
+            client, KB, manifest_path=manifest_path, poll_interval=0
+        )
+        result = loader.sync(
+            knowledge.scan_directory(
+                str(tmp_path), file_types={".csv": ("text/csv", ("FAQ",))}
+            )
+        )
+
+    assert result.renamed == ["new/moved.csv"]
+    assert result.deleted == ["gone.csv"]
+    assert result.created == [] and result.failed == {}
+    (update,) = backend.sent(document.UpdateDocumentRequest)
+    assert update.document.name == KB + "/documents/3"
+    assert update.update_mask.paths == ["display_name"]
+    (deleted,) = backend.sent(document.DeleteDocumentRequest)
+    assert deleted.name == KB + "/documents/4"
+
+    reloaded = knowledge.Manifest(manifest_path)
+    assert reloaded.sha256("new/moved.csv", KB + "/documents/3")
+    assert reloaded.sha256("old/moved.csv", KB + "/documents/3") is None
+    assert reloaded.sha256("gone.csv", KB + "/documents/4") is None
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+
+import mock
+import pytest
+
+from google.api_core import exceptions
+from google.api_core import grpc_helpers_async
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import pagers
+from google.cloud.dialogflow_v2.services.contexts import ContextsAsyncClient
+from google.cloud.dialogflow_v2.types import context
+
+
+def _parent(i):
+    return "projects/p/agent/sessions/{}".format(i)
+
+
+class _Backend(object):
+    """Lists ``i`` contexts under session ``i``, two per page."""
+
+    def __init__(self, failing=(), cancelled=()):
+        self.failing = failing
+        self.cancelled = cancelled
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.page_sizes = set()
+        self.timeouts = []
+
+    def __call__(self, request, **kwargs):
+        self.timeouts.append(kwargs.get("timeout"))
+        loop = asyncio.get_event_loop()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.page_sizes.add(request.page_size)
+        call = grpc_helpers_async.FakeUnaryUnaryCall()
+        call._future = loop.create_future()
+        loop.call_later(0.001, self._answer, request, call._future)
+        return call
+
+    def _answer(self, request, future):
+        self.in_flight -= 1
+        if request.parent in self.failing:
+            future.set_exception(exceptions.NotFound("gone"))
+            return
+        if request.parent in self.cancelled:
+            future.cancel()
+            return
+        count = int(request.parent.rsplit("/", 1)[1])
+        start = int(request.page_token or 0)
+        end = min(start + 2, count)
+        future.set_result(
+            context.ListContextsResponse(
+                contexts=[
+                    context.Context(name="{}/contexts/{}".format(request.parent, j))
+                    for j in range(start, end)
+                ],
+                next_page_token=str(end) if end < count else "",
+            )
+        )
+
+
+@pytest.mark.asyncio
+async def test_gather_items():
+    client = ContextsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend()
+    parents = [_parent(i) for i in range(10)]
+
+    with mock.patch.object(type(client.transport.list_contexts), "__call__") as stub:
+        stub.side_effect = backend
+        pairs = [
+            pair
+            async for pair in pagers.gather_items(
+                client.list_contexts, iter(parents), concurrency=3, raw=True
+            )
+        ]
+
+    assert len(pairs) == sum(range(10))
+    for parent in parents:
+        names = [item.name for p, item in pairs if p == parent]
+        assert names == ["{}/contexts/{}".format(parent, j) for j in range(len(names))]
+        assert len(names) == int(parent.rsplit("/", 1)[1])
+    assert 1 < backend.max_in_flight <= 3
+
+
+@pytest.mark.asyncio
+async def test_gather_items_errors():
+    client = ContextsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend(failing={_parent(3)})
+    parents = [_parent(i) for i in range(6)]
+
+    with mock.patch.object(type(client.transport.list_contexts), "__call__") as stub:
+        stub.side_effect = backend
+        pairs = [
+            pair
+            async for pair in pagers.gather_items(
+                client.list_contexts, parents, return_exceptions=True
+            )
+        ]
+        with pytest.raises(exceptions.NotFound):
+            async for _ in pagers.gather_items(client.list_contexts, parents):
+                pass
+
+    failures = [(p, item) for p, item in pairs if isinstance(item, Exception)]
+    assert [p for p, _ in failures] == [_parent(3)]
+    assert isinstance(failures[0][1], exceptions.NotFound)
+    assert len(pairs) == sum(range(6)) - 3 + 1
+
+
+@pytest.mark.asyncio
+async def test_gather_items_cancelled_calls_are_not_failures():
+    client = ContextsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend(cancelled={_parent(3)})
+    parents = [_parent(i) for i in range(6)]
+
+    with mock.patch.object(type(client.transport.list_contexts), "__call__") as stub:
+        stub.side_effect = backend
+        pairs = [
+            pair
+            async for pair in pagers.gather_items(
+                client.list_contexts, parents, return_exceptions=True
+            )
+        ]
+
+    assert not [item for _, item in pairs if isinstance(item, BaseException)]
+    assert _parent(3) not in {p for p, _ in pairs}
+    assert len(pairs) == sum(range(6)) - 3
+
+
+@pytest.mark.asyncio
+async def test_gather_items_timeout_applies_to_every_page():
+    client = ContextsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend()
+
+    with mock.patch.object(type(client.transport.list_contexts), "__call__") as stub:
+        stub.side_effect = backend
+        pairs = [
+            pair
+            async for pair in pagers.gather_items(
+                client.list_contexts, [_parent(5)], timeout=7.0
+            )
+        ]
+
+    assert len(pairs) == 5
+    # Three pages of two contexts.
+    assert backend.timeouts == [7.0, 7.0, 7.0]
+
+
+@pytest.mark.asyncio
+async def test_collect_items():
+    client = ContextsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend()
+    parents = [_parent(i) for i in (4, 0, 1)]
+
+    with mock.patch.object(type(client.transport.list_contexts), "__call__") as stub:
+        stub.side_effect = backend
+        items = await pagers.collect_items(
+            client.list_contexts, parents, request={"page_size": 2}
+        )
+
+    assert list(items) == parents
+    assert [len(contexts) for contexts in items.values()] == [4, 0, 1]
+    assert isinstance(items[_parent(4)][0], context.Context)
+    assert backend.page_sizes == {2}
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+
+import pytest
+
+from google.api_core import exceptions
+from google.api_core import grpc_helpers_async
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import participants
+from google.cloud.dialogflow_v2.services.participants import (
+    ParticipantsClient as ParticipantsClientV2,
+)
+from google.cloud.dialogflow_v2beta1.services.participants import (
+    ParticipantsAsyncClient,
+)
+from google.cloud.dialogflow_v2beta1.services.participants import ParticipantsClient
+from google.cloud.dialogflow_v2beta1.types import conversation_profile
+from google.cloud.dialogflow_v2beta1.types import participant
+
+END_USER = "projects/p/conversations/c/participants/user"
+AGENT = "projects/p/conversations/c/participants/agent"
+
+
+def _fake_backend(fail=()):
+    def call(request, **kwargs):
+        if isinstance(request, participant.AnalyzeContentRequest):
+            return participant.AnalyzeContentResponse(
+                reply_text="reply",
+                message=participant.Message(name="projects/p/conversations/c/m/1"),
+            )
+        if type(request).__name__ in fail:
+            raise exceptions.InternalServerError("boom")
+        if isinstance(request, participant.SuggestArticlesRequest):
+            return participant.SuggestArticlesResponse(latest_message="articles")
+        if isinstance(request, participant.SuggestFaqAnswersRequest):
+            return participant.SuggestFaqAnswersResponse(latest_message="faq")
+        if isinstance(request, participant.SuggestSmartRepliesRequest):
+            return participant.SuggestSmartRepliesResponse(latest_message="smart")
+        raise AssertionError(request)
+
+    return call
+
+
+def _requests(call, request_type):
+    return [c[1][0] for c in call.mock_calls if isinstance(c[1][0], request_type)]
+
+
+def test_enabled_features():
+    feature_config = (
+        conversation_profile.HumanAgentAssistantConfig.SuggestionFeatureConfig
+    )
+    profile = conversation_profile.ConversationProfile(
+        human_agent_assistant_config={
+            "human_agent_suggestion_config": {
+                "feature_configs": [
+                    feature_config(suggestion_feature={"type_": "FAQ"}),
+                    feature_config(suggestion_feature={"type_": "ARTICLE_SUGGESTION"}),
+                    feature_config(suggestion_feature={"type_": "FAQ"}),
+                ]
+            },
+            "end_user_suggestion_config": {
+                "feature_configs": [
+                    feature_config(suggestion_feature={"type_": "SMART_REPLY"})
+                ]
+            },
+        }
+    )
+
+    assert participants.enabled_features(profile) == ["FAQ", "ARTICLE_SUGGESTION"]
+    assert participants.enabled_features(profile, role="END_USER") == ["SMART_REPLY"]
+    with pytest.raises(ValueError):
+        participants.enabled_features(profile, role="AUTOMATED_AGENT")
+
+
+def test_analyze_content_result_errors_not_shared():
+    first = participants.AnalyzeContentResult(None)
+    first.errors["ARTICLE_SUGGESTION"] = ValueError()
+
+    assert participants.AnalyzeContentResult(None).errors == {}
+    assert first._replace(articles=1).errors is first.errors
+
+
+def test_pipeline_unsupported_feature():
+    client = ParticipantsClientV2(credentials=credentials.AnonymousCredentials(),)
+
+    with pytest.raises(ValueError):
+        participants.AnalyzeContentPipeline(client, ["SMART_REPLY"])
+    with pytest.raises(ValueError):
+        participants.AnalyzeContentPipeline(client, ["SMART_COMPOSE"])
+
+
+def test_pipeline_analyze_content():
+    client = ParticipantsClient(credentials=credentials.AnonymousCredentials(),)
+    features = [
+        participant.SuggestionFeature.Type.ARTICLE_SUGGESTION,
+        "FAQ",
+        "SMART_REPLY",
+    ]
+
+    with mock.patch.object(type(client.transport.analyze_content), "__call__") as call:
+        call.side_effect = _fake_backend()
+        with participants.AnalyzeContentPipeline(
+            client, features, context_size=5
+        ) as pipeline:
+            request = {"participant": END_USER, "text_input": {"text": "hi"}}
+            result = pipeline.analyze_content(request, suggestion_participant=AGENT)
+
+    assert "request_id" not in request
+    assert result.response.reply_text == "reply"
+    assert result.articles.latest_message == "articles"
+    assert result.faq_answers.latest_message == "faq"
+    assert result.smart_replies.latest_message == "smart"
+    assert result.errors == {}
+
+    (analyze,) = _requests(call, participant.AnalyzeContentRequest)
+    assert len(analyze.request_id) == 36
+    for request_type in (
+        participant.SuggestArticlesRequest,
+        participant.SuggestFaqAnswersRequest,
+        participant.SuggestSmartRepliesRequest,
+    ):
+        (suggestion,) = _requests(call, request_type)
+        assert suggestion.parent == AGENT
+        assert suggestion.latest_message == "projects/p/conversations/c/m/1"
+        assert suggestion.context_size == 5
+
+
+def test_pipeline_keeps_request_id_and_retries():
+    client = ParticipantsClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _fake_backend()
+    attempts = []
+
+    def flaky(request, **kwargs):
+        if isinstance(request, participant.AnalyzeContentRequest) and not attempts:
+            attempts.append(request.request_id)
+            raise exceptions.DeadlineExceeded("slow")
+        return backend(request, **kwargs)
+
+    with mock.patch.object(type(client.transport.analyze_content), "__call__") as call:
+        call.side_effect = flaky
+        with participants.AnalyzeContentPipeline(client, []) as pipeline:
+            result = pipeline.analyze_content(
+                participant.AnalyzeContentRequest(participant=END_USER)
+            )
+
+    assert result.response.reply_text == "reply"
+    analyze = _requests(call, participant.AnalyzeContentRequest)
+    assert len(analyze) == 2
+    assert analyze[0].request_id == analyze[1].request_id == attempts[0]
+    assert analyze[1].participant == END_USER
+
+
+def test_pipeline_suggestion_error():
+    client = ParticipantsClient(credentials=credentials.AnonymousCredentials(),)
+
+    with mock.patch.object(type(client.transport.analyze_content), "__call__") as call:
+        call.side_effect = _fake_backend(fail=("SuggestFaqAnswersRequest",))
+        with participants.AnalyzeContentPipeline(
+            client, ["ARTICLE_SUGGESTION", "FAQ"]
+        ) as pipeline:
+            result = pipeline.analyze_content(
+                {"participant": END_USER, "request_id": "fixed"}
+            )
+
+    assert _requests(call, participant.AnalyzeContentRequest)[0].request_id == "fixed"
+    assert result.articles.latest_message == "articles"
+    assert result.faq_answers is None
+    assert isinstance(result.errors["FAQ"], exceptions.InternalServerError)
+
+
+def test_pipeline_submit():
+    client = ParticipantsClient(credentials=credentials.AnonymousCredentials(),)
+
+    with mock.patch.object(type(client.transport.analyze_content), "__call__") as call:
+        call.side_effect = _fake_backend()
+        with participants.AnalyzeContentPipeline(
+            client, ["FAQ"], max_turns=2
+        ) as pipeline:
+            futures = [
+                pipeline.submit({"participant": END_USER}, suggestion_participant=AGENT)
+                for _ in range(5)
+            ]
+            results = [future.result() for future in futures]
+
+    assert [r.faq_answers.latest_message for r in results] == ["faq"] * 5
+    ids = {r.request_id for r in _requests(call, participant.AnalyzeContentRequest)}
+    assert len(ids) == 5
+
+
+@pytest.mark.asyncio
+async def test_analyze_content_async():
+    client = ParticipantsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _fake_backend(fail=("SuggestSmartRepliesRequest",))
+
+    def call_async(request, **kwargs):
+        return grpc_helpers_async.FakeUnaryUnaryCall(backend(request, **kwargs))
+
+    with mock.patch.object(type(client.transport.analyze_content), "__call__") as call:
+        call.side_effect = call_async
+        result = await participants.analyze_content_async(
+            client,
+            {"participant": END_USER},
+            ["FAQ", "SMART_REPLY"],
+            suggestion_participant=AGENT,
+        )
+
+    assert result.response.reply_text == "reply"
+    assert result.faq_answers.latest_message == "faq"
+    assert result.smart_replies is None
+    assert isinstance(result.errors["SMART_REPLY"], exceptions.InternalServerError)
+    (analyze,) = _requests(call, participant.AnalyzeContentRequest)
+    assert analyze.request_id
+
+
+def test_suggestion_cache():
+    cache = participants.SuggestionCache(max_entries=2)
+    request = participant.SuggestFaqAnswersRequest(
+        parent=AGENT, latest_message="m/1", context_size=3
+    )
+    key = cache.key("FAQ", request)
+    response = participant.SuggestFaqAnswersResponse(latest_message="m/1")
+
+    assert key[0] == AGENT and key[2] == "FAQ"
+    assert key == cache.key("FAQ", participant.SuggestFaqAnswersRequest(request))
+    assert key != cache.key("ARTICLE_SUGGESTION", request)
+    assert key != cache.key(
+        "FAQ", participant.SuggestFaqAnswersRequest(request, context_size=4)
+    )
+    assert cache.get(key) is None
+    cache.put(key, response)
+    cached = cache.get(key)
+    assert cached == response
+    assert cached is not response
+
+    other = "projects/p/conversations/other/participants/agent"
+    cache.put((other, "", 0, "FAQ"), response)
+    cache.put((other, "", 0, "ARTICLE_SUGGESTION"), response)
+    assert cache.get(key) is None
+    assert cache.stats() == participants.CacheStats(
+        hits=1, misses=2, invalidations=0, evictions=1, size=2
+    )
+
+    cache.invalidate("projects/p/conversations/other")
+    assert cache.stats().size == 0
+    assert cache.stats().invalidations == 2
+
+
+def test_suggestion_cache_key_smart_replies():
+    first, second = (
+        participant.SuggestSmartRepliesRequest(
+            parent=AGENT,
+            latest_message="m/1",
+            current_text_input={"text": text, "language_code": "en"},
+        )
+        for text in ("hi", "bye")
+    )
+
+    cache = participants.SuggestionCache()
+    assert cache.key("SMART_REPLY", first) != cache.key("SMART_REPLY", second)
+
+
+def test_suggestion_cache_drops_stale_puts():
+    cache = participants.SuggestionCache(max_entries=1)
+    key = (AGENT, "", "FAQ")
+    response = participant.SuggestFaqAnswersResponse()
+
+    generation = cache.generation()
+    cache.invalidate(AGENT)
+    cache.put(key, response, generation)
+    assert cache.get(key) is None
+
+    cache.put(key, response, cache.generation())
+    assert cache.get(key) is not None
+
+    # Conversations forgotten beyond max_entries count as invalidated.
+    generation = cache.generation()
+    cache.invalidate(AGENT)
+    cache.invalidate("projects/p/conversations/other")
+    cache.put(key, response, generation)
+    assert cache.get(key) is None
+
+
+def test_suggestion_cache_max_age():
+    cache = participants.SuggestionCache(max_age=10)
+    key = (AGENT, "m/1", 0, "FAQ")
+
+    with mock.patch("time.monotonic", return_value=100.0):
+        cache.put(key, participant.SuggestFaqAnswersResponse())
+    with mock.patch("time.monotonic", return_value=105.0):
+        assert cache.get(key) is not None
+    with mock.patch("time.monotonic", return_value=111.0):
+        assert cache.get(key) is None
+    assert cache.stats().size == 0
+
+
+def test_caching_client():
+    client = participants.CachingParticipantsClient(
+        ParticipantsClient(credentials=credentials.AnonymousCredentials(),)
+    )
+
+    with mock.patch.object(type(client.transport.analyze_content), "__call__") as call:
+        call.side_effect = _fake_backend()
+        first = client.suggest_faq_answers(
+            request={"parent": AGENT, "latest_message": "m/1"}
+        )
+        second = client.suggest_faq_answers(
+            request={"parent": AGENT, "latest_message": "m/1"}
+        )
+        client.suggest_faq_answers(parent=AGENT)
+        client.suggest_smart_replies(parent=AGENT)
+        client.suggest_smart_replies(parent=AGENT)
+        client.suggest_articles(parent=AGENT)
+        assert client.cache.stats().size == 4
+
+        client.analyze_content(participant=END_USER)
+        assert client.cache.stats().size == 0
+        client.suggest_faq_answers(parent=AGENT)
+
+    assert first == second
+    assert len(_requests(call, participant.SuggestFaqAnswersRequest)) == 3
+    assert len(_requests(call, participant.SuggestSmartRepliesRequest)) == 1
+    assert client.cache.stats() == participants.CacheStats(
+        hits=2, misses=5, invalidations=4, evictions=0, size=1
+    )
+    with pytest.raises(ValueError):
+        client.suggest_articles(request={"parent": AGENT}, parent=AGENT)
+
+
+def test_caching_client_invalidated_during_call():
+    client = participants.CachingParticipantsClient(
+        ParticipantsClient(credentials=credentials.AnonymousCredentials(),)
+    )
+
+    def call(request, **kwargs):
+        # A message lands while the suggestion is computed.
+        client.cache.invalidate(END_USER)
+        return participant.SuggestFaqAnswersResponse()
+
+    with mock.patch.object(type(client.transport.analyze_content), "__call__") as stub:
+        stub.side_effect = call
+        client.suggest_faq_answers(parent=AGENT)
+
+    assert client.cache.stats().size == 0
+
+
+def test_caching_client_v2():
+    client = participants.CachingParticipantsClient(
+        ParticipantsClientV2(credentials=credentials.AnonymousCredentials(),)
+    )
+
+    assert client.transport is client._client.transport
+    assert not hasattr(client, "suggest_smart_replies")
+    with pytest.raises(ValueError):
+        participants.AnalyzeContentPipeline(client, ["SMART_REPLY"])
+
+
+def test_caching_client_in_pipeline():
+    client = participants.CachingParticipantsClient(
+        ParticipantsClient(credentials=credentials.AnonymousCredentials(),)
+    )
+    client.cache.put((AGENT, "old", 0, "FAQ"), participant.SuggestFaqAnswersResponse())
+
+    with mock.patch.object(type(client.transport.analyze_content), "__call__") as call:
+        call.side_effect = _fake_backend()
+        with participants.AnalyzeContentPipeline(client, ["FAQ"]) as pipeline:
+            result = pipeline.analyze_content(
+                {"participant": END_USER}, suggestion_participant=AGENT
+            )
+
+    assert result.faq_answers.latest_message == "faq"
+    # The posted message invalidated the stale entry.
+    assert client.cache.get((AGENT, "old", 0, "FAQ")) is None
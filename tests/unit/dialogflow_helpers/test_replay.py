@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+
+import pytest
+
+from google.api_core import exceptions
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import replay
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+from google.cloud.dialogflow_v2.services.sessions.transports import (
+    SessionsGrpcTransport,
+)
+from google.cloud.dialogflow_v2.types import session
+
+SESSION = "projects/p/agent/sessions/s"
+
+
+def _request(text, session_name=SESSION):
+    return session.DetectIntentRequest(
+        session=session_name,
+        query_input={"text": {"text": text, "language_code": "en"}},
+        query_params={"payload": {"b": 1, "a": 2}},
+    )
+
+
+def _response(intent):
+    return session.DetectIntentResponse(
+        response_id=intent, query_result={"intent": {"display_name": intent}}
+    )
+
+
+def _fake_agent(intents):
+    def call(request, **kwargs):
+        text = request.query_input.text.text
+        if text not in intents:
+            raise exceptions.NotFound("no agent")
+        return _response(intents[text])
+
+    return call
+
+
+def _record(path, texts, intents):
+    with replay.LogWriter(path) as writer:
+        transport = replay.recording_transport(
+            SessionsGrpcTransport,
+            writer,
+            credentials=credentials.AnonymousCredentials(),
+        )
+        client = SessionsClient(transport=transport)
+        transport.detect_intent
+        stub = transport._stubs["detect_intent"]
+        with mock.patch.object(type(stub), "__call__") as call:
+            call.side_effect = _fake_agent(intents)
+            for text in texts:
+                try:
+                    client.detect_intent(request=_request(text))
+                except exceptions.NotFound:
+                    pass
+    return list(replay.read_log(path))
+
+
+def test_record_and_read_log(tmp_path):
+    path = str(tmp_path / "traffic.dfrl")
+
+    exchanges = _record(path, ["hi", "bye", "???"], {"hi": "greet", "bye": "leave"})
+
+    assert [e.request.query_input.text.text for e in exchanges] == [
+        "hi",
+        "bye",
+        "???",
+    ]
+    assert exchanges[0].request == _request("hi")
+    assert exchanges[1].response == _response("leave")
+    assert exchanges[2].response is None
+    assert exchanges[2].error.code == 5
+    assert all(e.latency >= 0 for e in exchanges)
+    assert exchanges[0].offset <= exchanges[1].offset <= exchanges[2].offset
+
+
+def test_read_log_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"PK\x03\x04")
+    with pytest.raises(ValueError):
+        list(replay.read_log(str(path)))
+
+    path.write_bytes(b"")
+    assert list(replay.read_log(str(path))) == []
+
+
+def test_replay_transport(tmp_path):
+    exchanges = _record(
+        str(tmp_path / "traffic.dfrl"),
+        ["hi", "hi", "???"],
+        {"hi": "greet", "???": "fallback"},
+    )
+    exchanges[1] = exchanges[1]._replace(response=_response("greet again"))
+    client = SessionsClient(transport=replay.replay_transport(exchanges))
+
+    assert client.detect_intent(request=_request("hi")) == _response("greet")
+    assert client.detect_intent(request=_request("hi")) == _response("greet again")
+    assert client.detect_intent(request=_request("hi")) == _response("greet again")
+    assert client.detect_intent(request=_request("???")) == _response("fallback")
+    with pytest.raises(replay.ReplayMissError):
+        client.detect_intent(request=_request("hi", SESSION + "2"))
+
+    client = SessionsClient(
+        transport=replay.replay_transport(exchanges, ignore_session=True)
+    )
+    response = client.detect_intent(request=_request("hi", SESSION + "2"))
+    assert response == _response("greet")
+
+
+def test_replay_transport_raises_recorded_errors(tmp_path):
+    exchanges = _record(str(tmp_path / "traffic.dfrl"), ["???"], {})
+    client = SessionsClient(transport=replay.replay_transport(exchanges))
+
+    with pytest.raises(exceptions.NotFound):
+        client.detect_intent(request=_request("???"))
+    with pytest.raises(ValueError):
+        replay.replay_transport([])
+
+
+def test_resend_report(tmp_path):
+    exchanges = _record(
+        str(tmp_path / "traffic.dfrl"),
+        ["hi", "bye", "help"],
+        {"hi": "greet", "bye": "leave", "help": "help"},
+    )
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    sent = []
+
+    def rewrite(request):
+        request.session = SESSION.replace("sessions/s", "sessions/replay")
+        sent.append(request)
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.side_effect = _fake_agent({"hi": "greet", "bye": "goodbye"})
+        report = replay.resend(
+            client, exchanges, speedup=None, max_workers=2, rewrite=rewrite
+        )
+
+    assert [d.query for d in report.diffs] == ["hi", "bye", "help"]
+    assert report.intent_match_rate == pytest.approx(1 / 3)
+    (bye, help_) = report.mismatches()
+    assert (bye.recorded_intent, bye.replayed_intent) == ("leave", "goodbye")
+    assert isinstance(help_.error, exceptions.NotFound)
+    assert {r.session for r in sent} == {"projects/p/agent/sessions/replay"}
+    assert exchanges[0].request.session == SESSION
+
+    lines = report.format().splitlines()
+    assert lines[0] == "3 requests, 33.3% matched the recorded intent"
+    assert lines[1].startswith("p50: ")
+    assert lines[-2] == "{}: 'bye' leave -> goodbye".format(SESSION)
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import collections
+import concurrent.futures
+import random
+import threading
+import time
+
+import mock
+
+import pytest
+
+from google.api_core import exceptions
+from google.api_core import grpc_helpers_async
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import sessions
+from google.cloud.dialogflow_v2.services.sessions import SessionsAsyncClient
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+from google.cloud.dialogflow_v2.types import session as session_types
+
+SESSIONS = ["projects/p/agent/sessions/s{}".format(i) for i in range(6)]
+
+
+def _work(turns=5):
+    work = []
+    for turn in range(turns):
+        for name in SESSIONS:
+            work.append((name, {"text": {"text": str(turn), "language_code": "en"}}))
+    return work
+
+
+class _Backend(object):
+    """Records the order of the turns of each session and checks that no
+    session has two turns in flight."""
+
+    def __init__(self, fail=()):
+        self.lock = threading.Lock()
+        self.in_flight = collections.Counter()
+        self.max_in_flight = 0
+        self.turns = collections.defaultdict(list)
+        self.fail = fail
+
+    def start(self, request):
+        with self.lock:
+            assert not self.in_flight[request.session]
+            self.in_flight[request.session] += 1
+            self.max_in_flight = max(self.max_in_flight, sum(self.in_flight.values()))
+            self.turns[request.session].append(request.query_input.text.text)
+
+    def finish(self, request):
+        with self.lock:
+            self.in_flight[request.session] -= 1
+        if (request.session, request.query_input.text.text) in self.fail:
+            raise exceptions.InternalServerError("boom")
+        return session_types.DetectIntentResponse(
+            response_id=request.query_input.text.text
+        )
+
+
+def test_lane_of_is_stable():
+    assert sessions.lane_of("projects/p/agent/sessions/a", 8) == (
+        sessions.lane_of("projects/p/agent/sessions/a", 8)
+    )
+    lanes = {sessions.lane_of(name, 4) for name in SESSIONS}
+    assert lanes <= set(range(4))
+
+
+def test_scheduler_orders_turns_per_session():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend(fail={(SESSIONS[0], "1")})
+
+    def call(request, **kwargs):
+        backend.start(request)
+        time.sleep(random.uniform(0, 0.005))
+        return backend.finish(request)
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as stub:
+        stub.side_effect = call
+        with sessions.SessionScheduler(client, lanes=4, max_queue=2) as scheduler:
+            turns = list(scheduler.map(_work()))
+            stats = scheduler.stats()
+
+    assert [(t.session, t.query_input) for t in turns] == _work()
+    assert all(backend.turns[name] == ["0", "1", "2", "3", "4"] for name in SESSIONS)
+    assert backend.max_in_flight > 1
+    (failed,) = [t for t in turns if t.error]
+    assert failed.session == SESSIONS[0]
+    assert isinstance(failed.error, exceptions.InternalServerError)
+    assert turns[0].response.response_id == "0"
+
+    assert sum(s.submitted for s in stats) == len(_work())
+    assert sum(s.failed for s in stats) == 1
+    assert all(s.depth == 0 and s.completed == s.submitted for s in stats)
+    assert all(s.max_depth <= 2 + 1 for s in stats)
+
+
+def test_scheduler_on_shared_executor():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend()
+
+    def call(request, **kwargs):
+        backend.start(request)
+        time.sleep(0.001)
+        return backend.finish(request)
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as stub:
+        stub.side_effect = call
+        with concurrent.futures.ThreadPoolExecutor(3) as executor:
+            scheduler = sessions.SessionScheduler(client, lanes=3, executor=executor)
+            futures = [scheduler.submit(*item) for item in _work()]
+            scheduler.close()
+            assert all(future.done() for future in futures)
+            assert executor.submit(lambda: "still usable").result() == "still usable"
+
+    assert all(backend.turns[name] == ["0", "1", "2", "3", "4"] for name in SESSIONS)
+
+
+def test_scheduler_map_bounds_read_ahead():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend()
+    work = _work()
+    read = []
+
+    def call(request, **kwargs):
+        backend.start(request)
+        if (request.session, request.query_input.text.text) == (SESSIONS[0], "0"):
+            # Hold up the first turn while the others finish.
+            time.sleep(0.2)
+        return backend.finish(request)
+
+    def reader():
+        for item in work:
+            read.append(item)
+            yield item
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as stub:
+        stub.side_effect = call
+        with sessions.SessionScheduler(client, lanes=4) as scheduler:
+            turns = scheduler.map(reader(), read_ahead=3)
+            first = next(turns)
+            read_before_first = len(read)
+            turns = [first] + list(turns)
+
+    assert read_before_first == 3
+    assert [(t.session, t.query_input) for t in turns] == work
+
+    with pytest.raises(ValueError):
+        next(sessions.SessionScheduler(mock.Mock()).map(work, read_ahead=0))
+
+
+def test_scheduler_skips_cancelled_turns():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend()
+    release = threading.Event()
+
+    def call(request, **kwargs):
+        backend.start(request)
+        if request.query_input.text.text == "0":
+            release.wait(5)
+        return backend.finish(request)
+
+    (first, second, third) = [item for item in _work(3) if item[0] == SESSIONS[0]]
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as stub:
+        stub.side_effect = call
+        scheduler = sessions.SessionScheduler(client, lanes=1)
+        scheduler.submit(*first)
+        cancelled = scheduler.submit(*second)
+        assert cancelled.cancel()
+        release.set()
+        turn = scheduler.submit(*third).result(timeout=5)
+
+        closer = threading.Thread(target=scheduler.close)
+        closer.start()
+        closer.join(5)
+
+    assert not closer.is_alive()
+    assert turn.response.response_id == "2"
+    assert backend.turns[SESSIONS[0]] == ["0", "2"]
+    (stats,) = scheduler.stats()
+    assert (stats.depth, stats.completed, stats.failed) == (0, 3, 0)
+
+
+def test_scheduler_validates_arguments():
+    with pytest.raises(ValueError):
+        sessions.SessionScheduler(mock.Mock(), lanes=0)
+
+
+@pytest.mark.asyncio
+async def test_async_scheduler_orders_turns_per_session():
+    client = SessionsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend()
+    loop = asyncio.get_event_loop()
+
+    def call(request, **kwargs):
+        backend.start(request)
+        response = grpc_helpers_async.FakeUnaryUnaryCall()
+        response._future = loop.create_future()
+        loop.call_later(
+            random.uniform(0, 0.005),
+            lambda: response._future.set_result(backend.finish(request)),
+        )
+        return response
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as stub:
+        stub.side_effect = call
+        async with sessions.AsyncSessionScheduler(client, lanes=4) as scheduler:
+            turns = [turn async for turn in scheduler.map(_work())]
+
+    assert [(t.session, t.query_input) for t in turns] == _work()
+    assert not any(t.error for t in turns)
+    assert all(backend.turns[name] == ["0", "1", "2", "3", "4"] for name in SESSIONS)
+    assert backend.max_in_flight > 1
+    assert sum(s.completed for s in scheduler.stats()) == len(_work())
+
+
+@pytest.mark.asyncio
+async def test_async_scheduler_survives_cancelled_calls():
+    client = SessionsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    backend = _Backend()
+    loop = asyncio.get_event_loop()
+    cancelled = (SESSIONS[0], "1")
+
+    def call(request, **kwargs):
+        backend.start(request)
+        response = grpc_helpers_async.FakeUnaryUnaryCall()
+        response._future = loop.create_future()
+        if (request.session, request.query_input.text.text) == cancelled:
+            backend.finish(request)
+            response._future.cancel()
+        else:
+            loop.call_later(
+                0.001, lambda: response._future.set_result(backend.finish(request)),
+            )
+        return response
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as stub:
+        stub.side_effect = call
+        async with sessions.AsyncSessionScheduler(client, lanes=2) as scheduler:
+            turns = await asyncio.wait_for(_collect(scheduler.map(_work(3))), timeout=5)
+
+    assert [(t.session, t.query_input) for t in turns] == _work(3)
+    (failed,) = [t for t in turns if t.error]
+    assert (failed.session, failed.query_input["text"]["text"]) == cancelled
+    assert isinstance(failed.error, asyncio.CancelledError)
+    assert backend.turns[SESSIONS[0]] == ["0", "1", "2"]
+    assert sum(s.failed for s in scheduler.stats()) == 1
+
+
+async def _collect(turns):
+    return [turn async for turn in turns]
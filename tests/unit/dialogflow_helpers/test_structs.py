@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import collections
+
+import pytest
+
+from google.cloud.dialogflow_helpers import structs
+from google.cloud.dialogflow_v2.types import session
+from google.cloud.dialogflow_v2.types import webhook
+from google.cloud.dialogflow_v2beta1.types import session as session_v2beta1
+from google.protobuf import json_format
+from google.protobuf import struct_pb2
+
+PAYLOAD = {
+    "text": "hi",
+    "count": 3,
+    "ratio": 0.5,
+    "flag": False,
+    "missing": None,
+    "empty": {},
+    "none": [],
+    "items": [{"title": "a", "tags": ["x", "y"]}, [1, [2]], None, True],
+}
+
+
+@pytest.fixture
+def installed():
+    structs.install()
+    yield
+    structs.uninstall()
+
+
+def test_roundtrip_matches_json_format():
+    struct = structs.dict_to_struct(PAYLOAD)
+
+    assert struct == json_format.ParseDict(PAYLOAD, struct_pb2.Struct())
+    assert structs.struct_to_dict(struct) == json_format.MessageToDict(struct)
+    assert structs.struct_to_dict(struct) == dict(PAYLOAD, count=3.0)
+    assert isinstance(structs.struct_to_dict(struct)["count"], float)
+
+
+def test_values():
+    assert structs.value_to_python(structs.python_to_value(None)) is None
+    assert structs.value_to_python(struct_pb2.Value()) is None
+    assert structs.list_value_to_list(structs.list_to_list_value((1, "a"))) == [
+        1.0,
+        "a",
+    ]
+    ordered = collections.OrderedDict([("b", (1,))])
+    assert structs.struct_to_dict(structs.dict_to_struct(ordered)) == {"b": [1.0]}
+    value = struct_pb2.Value(string_value="kept")
+    assert structs.python_to_value({"v": value}).struct_value.fields["v"] == value
+    with pytest.raises(ValueError):
+        structs.dict_to_struct({"when": object()})
+
+
+def test_install(installed):
+    result = session.QueryResult(parameters=PAYLOAD)
+
+    assert type(result.parameters) is dict
+    assert result.parameters == structs.struct_to_dict(
+        session.QueryResult.pb(result).parameters
+    )
+    assert session.QueryResult().webhook_payload is None
+    assert type(session_v2beta1.QueryResult(parameters={"a": 1}).parameters) is dict
+
+    response = webhook.WebhookResponse(payload={"google": {"expectUserResponse": 1}})
+    assert webhook.WebhookResponse.pb(response).payload == structs.dict_to_struct(
+        {"google": {"expectUserResponse": 1}}
+    )
+    response.payload = {"replaced": []}
+    assert response.payload == {"replaced": []}
+
+
+def test_uninstall():
+    structs.install()
+    structs.install()
+    structs.uninstall()
+
+    result = session.QueryResult(parameters={"a": 1})
+    assert type(result.parameters) is not dict
+    assert result.parameters["a"] == 1.0
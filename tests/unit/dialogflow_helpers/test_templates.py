@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+
+import pytest
+
+from google.api_core import grpc_helpers_async
+from google.api_core.gapic_v1 import client_info as client_info_lib
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import templates
+from google.cloud.dialogflow_v2.services.sessions import SessionsAsyncClient
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+from google.cloud.dialogflow_v2.types import session
+from google.cloud.dialogflow_v2beta1.services.sessions import (
+    SessionsClient as SessionsClientV2beta1,
+)
+
+SESSION = "projects/p/agent/sessions/s"
+QUERY_PARAMS = {
+    "time_zone": "Europe/Paris",
+    "payload": {"channel": "web", "tags": ["a", "b"]},
+    "webhook_headers": {"x-tenant": "t1", "x-trace": "on"},
+    "sentiment_analysis_request_config": {"analyze_query_text_sentiment": True},
+}
+OUTPUT_AUDIO_CONFIG = {"audio_encoding": "OUTPUT_AUDIO_ENCODING_MP3"}
+QUERY_INPUT = {"text": {"text": "hello", "language_code": "en"}}
+
+
+def _template(client, **kwargs):
+    return templates.DetectIntentTemplate(
+        client,
+        query_params=QUERY_PARAMS,
+        output_audio_config=OUTPUT_AUDIO_CONFIG,
+        **kwargs
+    )
+
+
+def test_request_bytes_match_the_full_request():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    template = _template(client)
+
+    expected = session.DetectIntentRequest(
+        session=SESSION,
+        query_input=QUERY_INPUT,
+        query_params=QUERY_PARAMS,
+        output_audio_config=OUTPUT_AUDIO_CONFIG,
+        input_audio=b"\x00\x01",
+    )
+    assert template.request(SESSION, QUERY_INPUT, input_audio=b"\x00\x01") == expected
+
+
+def test_request_overrides_are_merged():
+    client = SessionsClientV2beta1(credentials=credentials.AnonymousCredentials(),)
+    template = _template(client)
+
+    request = template.request(
+        SESSION,
+        QUERY_INPUT,
+        overrides={
+            "query_params": {
+                "time_zone": "UTC",
+                "contexts": [{"name": SESSION + "/contexts/c"}],
+            }
+        },
+    )
+
+    assert type(request).__module__.startswith("google.cloud.dialogflow_v2beta1")
+    assert request.query_params.time_zone == "UTC"
+    assert request.query_params.payload["channel"] == "web"
+    assert [c.name for c in request.query_params.contexts] == [SESSION + "/contexts/c"]
+
+
+def test_detect_intent_sends_bytes():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials(),)
+    template = _template(client)
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.return_value = session.DetectIntentResponse(response_id="r")
+        response = template.detect_intent(SESSION, QUERY_INPUT)
+
+    assert response.response_id == "r"
+    _, args, kwargs = call.mock_calls[0]
+    assert args[0] == template.request_bytes(SESSION, QUERY_INPUT)
+    assert ("x-goog-request-params", "session=" + SESSION) in kwargs["metadata"]
+    assert kwargs["timeout"] == templates.DEFAULT_DETECT_INTENT_TIMEOUT
+
+
+def test_detect_intent_sends_client_info():
+    info = client_info_lib.ClientInfo(user_agent="my-app/1.0")
+    client = SessionsClient(
+        credentials=credentials.AnonymousCredentials(), client_info=info
+    )
+    template = _template(client)
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.return_value = session.DetectIntentResponse()
+        template.detect_intent(SESSION, QUERY_INPUT)
+        client.detect_intent(session=SESSION, query_input=QUERY_INPUT)
+
+    sent = [dict(c[2]["metadata"])["x-goog-api-client"] for c in call.mock_calls]
+    assert sent[0] == sent[1]
+    assert sent[0].startswith("my-app/1.0")
+
+
+@pytest.mark.asyncio
+async def test_detect_intent_async():
+    client = SessionsAsyncClient(credentials=credentials.AnonymousCredentials(),)
+    template = _template(client)
+
+    with mock.patch.object(type(client.transport.detect_intent), "__call__") as call:
+        call.return_value = grpc_helpers_async.FakeUnaryUnaryCall(
+            session.DetectIntentResponse(response_id="r")
+        )
+        response = await template.detect_intent(SESSION, QUERY_INPUT, timeout=5.0)
+
+    assert response.response_id == "r"
+    _, args, kwargs = call.mock_calls[0]
+    assert session.DetectIntentRequest.deserialize(args[0]).session == SESSION
+    assert kwargs["timeout"] == 5.0
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+
+from google.auth import credentials
+from google.cloud.dialogflow_helpers import training_phrases
+from google.cloud.dialogflow_v2.services.intents import IntentsClient
+from google.cloud.dialogflow_v2.types import intent
+from google.longrunning import operations_pb2
+
+
+def _phrase(*parts):
+    return intent.Intent.TrainingPhrase(
+        parts=[
+            intent.Intent.TrainingPhrase.Part(text=text, entity_type=entity_type)
+            for text, entity_type in parts
+        ]
+    )
+
+
+def _intent(name, *texts):
+    return intent.Intent(
+        name="projects/p/agent/intents/{}".format(name),
+        display_name=name,
+        training_phrases=[
+            text
+            if isinstance(text, intent.Intent.TrainingPhrase)
+            else _phrase((text, ""))
+            for text in texts
+        ],
+    )
+
+
+def _agent():
+    return [
+        _intent(
+            "book",
+            "book a flight to Paris",
+            _phrase(("book a flight to ", ""), ("Paris", "@sys.geo-city")),
+            "Book a  flight, to PARIS!",
+            "book a flight to Paris",
+            "I want to book a flight tomorrow",
+            "i want to book a flight tomorow",
+        ),
+        _intent("cancel", "cancel my booking", "I want to book a flight tomorrow"),
+    ]
+
+
+def test_normalize():
+    assert training_phrases.normalize(" Book a flight, to PARIS! ") == (
+        "book a flight to paris"
+    )
+    assert training_phrases.normalize("ＡＢＣ") == "abc"
+
+
+def test_find_duplicates():
+    plan = training_phrases.find_duplicates(_agent(), near=False)
+
+    kinds = [(group.kind, group.conflict) for group in plan.groups]
+    assert kinds == [("exact", False), ("exact", True), ("normalized", False)]
+    exact, conflict, normalized = plan.groups
+    assert [p.index for p in exact.removed] == [3]
+    # The annotated copy is the one kept.
+    assert [p.index for p in normalized.removed] == [0, 2]
+    assert conflict.removed == []
+    assert plan.summary() == {
+        "exact": 1,
+        "normalized": 2,
+        "near": 0,
+        "conflicts": 1,
+    }
+    assert plan.report().splitlines()[-1] == "1 exact, 2 normalized, 1 conflicts"
+
+    (book,) = plan.intents()
+    assert [training_phrases.phrase_text(p) for p in book.training_phrases] == [
+        "book a flight to Paris",
+        "I want to book a flight tomorrow",
+        "i want to book a flight tomorow",
+    ]
+    assert book.training_phrases[0].parts[1].entity_type == "@sys.geo-city"
+
+
+def test_find_duplicates_resolves_conflicts():
+    plan = training_phrases.find_duplicates(
+        _agent(), near=False, resolve_conflicts=True
+    )
+
+    conflict = plan.conflicts[0]
+    assert [(p.display_name, p.index) for p in conflict.removed] == [("cancel", 1)]
+    assert {i.display_name for i in plan.intents()} == {"book", "cancel"}
+
+
+def test_find_near_duplicates():
+    pytest.importorskip("numpy")
+
+    report_only = training_phrases.find_duplicates(_agent())
+    plan = training_phrases.find_duplicates(
+        _agent(), remove=training_phrases.KINDS, threshold=0.7
+    )
+
+    (near,) = [group for group in plan.groups if group.kind == "near"]
+    assert [(p.display_name, p.index) for p in near.phrases] == [
+        ("book", 4),
+        ("book", 5),
+        ("cancel", 1),
+    ]
+    assert [p.index for p in near.removed] == [5]
+    assert 0.7 <= near.similarity < 1.0
+    assert [g.kind for g in report_only.groups].count("near") == 1
+    assert report_only.summary()["near"] == 0
+    # The conflict of the exact pass is merged into the near group.
+    assert report_only.conflicts == [near._replace(removed=[])]
+    assert report_only.report().count("\n! ") == 1
+    with pytest.raises(ValueError):
+        training_phrases.find_duplicates(_agent(), remove=["fuzzy"])
+
+
+def test_apply():
+    client = IntentsClient(credentials=credentials.AnonymousCredentials(),)
+    plan = training_phrases.find_duplicates(_agent(), near=False, language_code="en")
+
+    with mock.patch.object(
+        type(client.transport.batch_update_intents), "__call__"
+    ) as call:
+        call.return_value = operations_pb2.Operation(name="operations/dedup")
+        plan.apply(client)
+
+    _, args, _ = call.mock_calls[0]
+    request = args[0]
+    assert request.parent == "projects/p/agent"
+    assert request.language_code == "en"
+    assert list(request.update_mask.paths) == ["training_phrases"]
+    assert [i.display_name for i in request.intent_batch_inline.intents] == ["book"]
+    assert len(request.intent_batch_inline.intents[0].training_phrases) == 3
+    assert training_phrases.CleanupPlan([], []).apply(client) is None
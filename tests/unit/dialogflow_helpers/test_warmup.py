@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import datetime
+import threading
+import mock
+
+import grpc
+import pytest
+
+from google.api_core import exceptions
+from google.auth import credentials
+from google.auth import exceptions as auth_exceptions
+from google.cloud.dialogflow_helpers import warmup
+from google.cloud.dialogflow_v2.services.sessions import SessionsAsyncClient
+from google.cloud.dialogflow_v2.services.sessions import SessionsClient
+
+
+class FakeCredentials(credentials.Credentials):
+    def __init__(self, lifetime=3600.0):
+        super().__init__()
+        self.lifetime = lifetime
+        self.refreshes = 0
+        self.refreshed = threading.Event()
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = "token-{}".format(self.refreshes)
+        self.expiry = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=self.lifetime
+        )
+        self.refreshed.set()
+
+
+def _ready_future(ready=True):
+    future = mock.Mock()
+    if ready:
+        future.result.return_value = None
+    else:
+        future.result.side_effect = grpc.FutureTimeoutError()
+    return future
+
+
+def test_refresh_credentials():
+    creds = FakeCredentials()
+
+    assert warmup.refresh_credentials(creds) is True
+    assert warmup.refresh_credentials(creds) is False
+    assert warmup.refresh_credentials(creds, margin=7200) is True
+    assert creds.refreshes == 2
+    assert warmup.refresh_credentials(credentials.AnonymousCredentials()) is False
+
+
+def test_warm_up():
+    creds = FakeCredentials()
+    client = SessionsClient(credentials=creds)
+
+    with mock.patch("grpc.channel_ready_future") as ready:
+        ready.return_value = _ready_future()
+        refresher = warmup.warm_up(client, timeout=5, refresh_in_background=False)
+
+    assert refresher is None
+    assert creds.token == "token-1"
+    ready.assert_called_once_with(client.transport.grpc_channel)
+    ready.return_value.result.assert_called_once_with(timeout=5)
+
+
+def test_warm_up_timeout():
+    client = SessionsClient(credentials=credentials.AnonymousCredentials())
+
+    with mock.patch("grpc.channel_ready_future") as ready:
+        ready.return_value = _ready_future(ready=False)
+        with pytest.raises(exceptions.DeadlineExceeded):
+            warmup.warm_up(client.transport, timeout=0.1)
+
+
+def test_warm_up_refreshes_in_background():
+    creds = FakeCredentials(lifetime=1.0)
+    client = SessionsClient(credentials=creds)
+
+    with mock.patch("grpc.channel_ready_future") as ready:
+        ready.return_value = _ready_future()
+        refresher = warmup.warm_up(client, refresh_margin=0.9)
+
+    try:
+        assert refresher.running
+        creds.refreshed.clear()
+        assert creds.refreshed.wait(5)
+        assert creds.refreshes >= 2
+    finally:
+        refresher.stop()
+    refresher._thread.join(5)
+    assert not refresher.running
+
+
+def _run_refresher(refresher, waits):
+    # Run the refresh loop inline, recording its waits and stopping it after
+    # ``waits`` of them.
+    delays = []
+
+    def wait(delay):
+        delays.append(delay)
+        return len(delays) > waits
+
+    refresher._stopped.wait = wait
+    refresher._run()
+    return delays
+
+
+def test_token_refresher_short_lived_tokens():
+    creds = FakeCredentials(lifetime=60.0)
+    creds.refresh(None)
+    refresher = warmup.TokenRefresher(creds, margin=300.0, min_interval=5.0)
+
+    delays = _run_refresher(refresher, 3)
+
+    # Tokens living less than the margin are refreshed halfway through.
+    assert all(25.0 < delay <= 30.0 for delay in delays)
+    assert creds.refreshes == 4
+
+    creds.lifetime = 0.0
+    creds.refresh(None)
+    assert refresher._delay() == 5.0
+
+
+def test_token_refresher_backs_off_on_errors():
+    creds = FakeCredentials(lifetime=0.0)
+    creds.refresh(None)
+    creds.refresh = mock.Mock(side_effect=auth_exceptions.RefreshError("down"))
+    refresher = warmup.TokenRefresher(
+        creds, min_interval=1.0, retry_interval=10.0, max_retry_interval=30.0
+    )
+
+    delays = _run_refresher(refresher, 8)
+
+    assert delays[1::2] == [10.0, 20.0, 30.0, 30.0]
+    assert delays[::2] == [1.0] * 5
+    assert creds.refresh.call_count == 4
+
+
+def test_warm_up_warns_about_unscoped_credentials():
+    creds = FakeCredentials()
+    client = SessionsClient(credentials=creds)
+
+    with mock.patch("grpc.channel_ready_future") as ready:
+        ready.return_value = _ready_future()
+        with mock.patch.object(
+            FakeCredentials, "requires_scopes", True, create=True
+        ), pytest.warns(RuntimeWarning):
+            warmup.warm_up(client, refresh_in_background=False)
+
+
+@pytest.mark.asyncio
+async def test_warm_up_async():
+    creds = FakeCredentials()
+    client = SessionsAsyncClient(credentials=creds)
+    channel = client.transport.grpc_channel
+
+    async def channel_ready():
+        return None
+
+    with mock.patch.object(type(channel), "channel_ready") as ready:
+        ready.side_effect = channel_ready
+        refresher = await warmup.warm_up_async(client, refresh_in_background=False)
+
+    assert refresher is None
+    assert creds.token == "token-1"
+    ready.assert_called_once_with()
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import pathlib
+import sys
+
+import mock
+import pytest
+
+pytest.importorskip("libcst")
+
+# The scripts are not part of the package; they import each other from
+# their own directory.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[3] / "scripts"))
+
+import fixup_dialogflow_v2_keywords  # noqa: E402
+import keyword_fixup  # noqa: E402
+
+
+CALL = "client.detect_intent(session, query_input)\n"
+FIXED = (
+    "client.detect_intent(request = {'session': session, 'query_input': query_input})\n"
+)
+
+
+@pytest.fixture
+def transformer():
+    return fixup_dialogflow_v2_keywords.dialogflowCallTransformer()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    in_dir = tmp_path / "in"
+    (in_dir / "pkg").mkdir(parents=True)
+    (in_dir / "pkg" / "calls.py").write_text(CALL + "client.get_intent(name)\n")
+    (in_dir / "pkg" / "fixed.py").write_text(FIXED)
+    (in_dir / "plain.py").write_text("x = 1\n")
+    (in_dir / "notes.txt").write_text(CALL)
+    return in_dir
+
+
+def test_fix_files(tree, tmp_path, transformer):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    summary = keyword_fixup.fix_files(tree, out_dir, transformer=transformer)
+
+    assert summary.files == {"fixed": 1, "unchanged": 1, "skipped": 1}
+    assert summary.call_sites == {"detect_intent": 1, "get_intent": 1}
+    assert summary.cache_hits == 0
+    assert (out_dir / "pkg" / "calls.py").read_text() == (
+        FIXED + "client.get_intent(request = {'name': name})\n"
+    )
+    assert (out_dir / "pkg" / "fixed.py").read_text() == FIXED
+    assert (out_dir / "plain.py").read_text() == "x = 1\n"
+    assert not (out_dir / "notes.txt").exists()
+
+
+def test_fix_files_parallel(tree, tmp_path, transformer):
+    serial_dir = tmp_path / "serial"
+    parallel_dir = tmp_path / "parallel"
+    serial_dir.mkdir()
+    parallel_dir.mkdir()
+
+    serial = keyword_fixup.fix_files(tree, serial_dir, transformer=transformer)
+    parallel = keyword_fixup.fix_files(
+        tree, parallel_dir, transformer=transformer, jobs=2
+    )
+
+    assert parallel == serial
+    for path in serial_dir.rglob("*.py"):
+        other = parallel_dir / path.relative_to(serial_dir)
+        assert other.read_text() == path.read_text()
+
+
+def test_fix_files_cache(tree, tmp_path, transformer):
+    cache_dir = tmp_path / "cache"
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+
+    keyword_fixup.fix_files(tree, first, transformer=transformer, cache_dir=cache_dir)
+    with mock.patch.object(keyword_fixup.cst, "parse_module") as parse_module:
+        summary = keyword_fixup.fix_files(
+            tree, second, transformer=transformer, cache_dir=cache_dir
+        )
+
+    # Both parsed files come from the cache; the skipped one is not parsed.
+    parse_module.assert_not_called()
+    assert summary.cache_hits == 2
+    assert summary.call_sites == {"detect_intent": 1, "get_intent": 1}
+    assert (second / "pkg" / "calls.py").read_text() == (
+        first / "pkg" / "calls.py"
+    ).read_text()
+
+    # A changed file is a cache miss.
+    (tree / "pkg" / "fixed.py").write_text(CALL)
+    third = tmp_path / "third"
+    third.mkdir()
+    summary = keyword_fixup.fix_files(
+        tree, third, transformer=transformer, cache_dir=cache_dir
+    )
+    assert summary.cache_hits == 1
+    assert (third / "pkg" / "fixed.py").read_text() == FIXED
+
+
+def test_fix_files_in_place(tree, transformer):
+    calls = tree / "pkg" / "calls.py"
+    calls.chmod(0o750)
+    fixed = tree / "pkg" / "fixed.py"
+    fixed_mtime = fixed.stat().st_mtime_ns
+
+    summary = keyword_fixup.fix_files(tree, None, transformer=transformer)
+
+    assert summary.files["fixed"] == 1
+    assert calls.read_text().startswith(FIXED)
+    assert calls.stat().st_mode & 0o777 == 0o750
+    # Files needing no changes are not rewritten.
+    assert fixed.stat().st_mtime_ns == fixed_mtime
+    assert not [p for p in tree.rglob(".*") if p.is_file()]
+
+
+def test_fix_files_link_unchanged(tree, tmp_path, transformer):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    keyword_fixup.fix_files(tree, out_dir, transformer=transformer, unchanged="link")
+
+    assert os.path.samefile(str(out_dir / "plain.py"), str(tree / "plain.py"))
+    assert not os.path.samefile(
+        str(out_dir / "pkg" / "calls.py"), str(tree / "pkg" / "calls.py")
+    )
+
+
+def test_main_in_place(tree, transformer, capsys):
+    summary = keyword_fixup.main(
+        transformer, ["-d", str(tree), "--in-place", "-j", "1"]
+    )
+
+    assert summary.files["fixed"] == 1
+    assert (tree / "pkg" / "calls.py").read_text().startswith(FIXED)
+    assert "rewrote 2 call sites in 1 files" in capsys.readouterr().err
+
+
+def test_main_rejects_non_empty_output(tree, tmp_path, transformer):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    (out_dir / "x.py").write_text("")
+
+    with pytest.raises(SystemExit) as exc_info:
+        keyword_fixup.main(transformer, ["-d", str(tree), "-o", str(out_dir)])
+
+    assert "is not empty" in str(exc_info.value)